@@ -1,3 +1,4 @@
 from .player import Player
 from .alien import Alien
-from .director import Director
\ No newline at end of file
+from .director import Director
+from .perception import Perception
\ No newline at end of file
@@ -221,7 +221,7 @@ class Alien(Entity):
 
     def update_path(self, player, current_map):
         player_pos = player.rect.centerx, player.rect.centery
-        self.is_on_unaccessible_tile, path = current_map.nav_mesh.compute_path(self, player_pos)
+        self.is_on_unaccessible_tile, path = current_map.nav_mesh.compute_path(self, player_pos, chase=True)
         if path != None: 
             self.current_path = path
             self.next_position = self.current_path.pop()
@@ -230,22 +230,11 @@ class Alien(Entity):
             return None
 
     def follow_path(self, current_map, dt):
-        corner_tolerance = 0 #current_map.nav_mesh.density*2*math.sqrt(2) # allows the enemy to cur corners if next way point is under this distance
-
+        # the path only holds the corners of the string-pulled path (see NavMesh.compute_path),
+        # each one can be walked to in a straight line from the previous one
         if not self.current_path and euclidian_distance((self.x_pos, self.y_pos), self.next_position) < self.size[0]//2:
             raise ValueError
         
-        if self.is_on_unaccessible_tile:
-            while self.current_path and (self.can_see_point(self.current_path[-1], current_map) 
-                                        and euclidian_distance((self.x_pos, self.y_pos), self.current_path[-1]) < corner_tolerance):
-                self.next_position = self.current_path.pop()
-        else:
-            while self.current_path and ((self.can_see_point(self.current_path[-1], current_map) 
-                                          and euclidian_distance((self.x_pos, self.y_pos), self.current_path[-1]) < corner_tolerance) 
-                                         or (self.can_go_to_point(self.current_path[-1], current_map) 
-                                    and euclidian_distance((self.x_pos, self.y_pos), self.current_path[-1]) < 500)):
-                self.next_position = self.current_path.pop()
-        
         if self.current_path and euclidian_distance((self.x_pos, self.y_pos), self.next_position) < self.size[0]//2:
             self.next_position = self.current_path.pop()
 
@@ -272,7 +261,7 @@ class Alien(Entity):
             self.switch_state('COMPUTE_SEARCH')
 
     def update_compute_chase(self, player, current_map, dt):
-        self.is_on_unaccessible_tile, path = current_map.nav_mesh.compute_path(self, (player.x_pos, player.y_pos)) 
+        self.is_on_unaccessible_tile, path = current_map.nav_mesh.compute_path(self, (player.x_pos, player.y_pos), chase=True)
         
         if path: # Check for truthiness of path (not None)
             self.current_path = path
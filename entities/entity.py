@@ -1,8 +1,6 @@
 import pygame
 import math
-from utilities.geometry import intersects, angle, angle_entity
-from numpy import cos, sin
-import bisect
+from utilities.visibility import visibility_polygon
 
 class Entity(pygame.sprite.Sprite):
     def __init__(self, x, y):
@@ -67,61 +65,23 @@ class Entity(pygame.sprite.Sprite):
         self.resolve_collision_y(current_map, dy)
 
     def can_see_entity(self, entity, current_map):
-        ray = (self.rect.center, entity.rect.center)
-
-        for wall in current_map.walls:
-            A = (wall.rect.left, wall.rect.top)
-            B = (wall.rect.right, wall.rect.top)
-            C = (wall.rect.right, wall.rect.bottom)
-            D = (wall.rect.left, wall.rect.bottom)
-
-            wall_edges = [(A, B), (B, C), (C, D), (D, A)]
-
-            for edge in wall_edges:
-                if intersects(ray, edge):
-                    return False
-                
-        return True
+        return self.can_see_point(entity.rect.center, current_map)
     
     def can_see_point(self, point, current_map):
-        ray = (self.rect.center, point)
-
-        for wall in current_map.walls:
-            A = (wall.rect.left, wall.rect.top)
-            B = (wall.rect.right, wall.rect.top)
-            C = (wall.rect.right, wall.rect.bottom)
-            D = (wall.rect.left, wall.rect.bottom)
-
-            wall_edges = [(A, B), (B, C), (C, D), (D, A)]
-
-            for edge in wall_edges:
-                if intersects(ray, edge):
-                    return False
-                
-        return True
+        return not current_map.wall_index.segment_blocked(self.rect.center, point)
 
     def can_go_to_point(self, point, current_map):
-        ray = (self.rect.center, point)
-
-        for wall in current_map.nav_mesh_walls:
-            A = (wall.rect.left, wall.rect.top)
-            B = (wall.rect.right, wall.rect.top)
-            C = (wall.rect.right, wall.rect.bottom)
-            D = (wall.rect.left, wall.rect.bottom)
-
-            wall_edges = [(A, B), (B, C), (C, D), (D, A)]
-
-            for edge in wall_edges:
-                if intersects(ray, edge):
-                    return False
-                
-        return True
+        # the nav mesh walls are merged tiles: a segment can go through one without crossing any of its
+        # edges (ending inside it, or between two points of its border), so its inside is tested instead
+        return not current_map.nav_mesh_wall_index.segment_enters(self.rect.center, point)
     
     def resolve_collision_x(self, current_map, dx):
         if not self.is_in_frontstage: 
             return
 
-        for wall in current_map.walls:
+        # walls the rect can reach while being pushed back along x
+        search_rect = self.rect.inflate(2*self.rect.width, 0)
+        for wall in current_map.wall_index.candidates_rect(search_rect):
             if wall.rect.colliderect(self.rect):
                 if dx < 0 and self.rect.left < wall.rect.right:
                     self.rect.left = wall.rect.right
@@ -136,7 +96,9 @@ class Entity(pygame.sprite.Sprite):
         if not self.is_in_frontstage: 
             return
         
-        for wall in current_map.walls:
+        # walls the rect can reach while being pushed back along y
+        search_rect = self.rect.inflate(0, 2*self.rect.height)
+        for wall in current_map.wall_index.candidates_rect(search_rect):
             if wall.rect.colliderect(self.rect):
                 if dy < 0 and self.rect.top < wall.rect.bottom:
                     self.rect.top = wall.rect.bottom
@@ -151,20 +113,22 @@ class Entity(pygame.sprite.Sprite):
 
     @staticmethod
     def furthest_point_in_direction(point, angle, current_map):
+        """
+        Returns the point where the ray cast from point in the given direction (degrees) first enters a wall,
+        or None if the ray starts inside a wall (or hits nothing).
+        """
         x, y = point
-        
-        step = 1
-        x += step*cos(angle*math.pi/180)
-        y += step*sin(angle*math.pi/180)
+        direction = (math.cos(angle*math.pi/180), math.sin(angle*math.pi/180))
 
-        if current_map.point_collidelist((x, y)):
+        hit = current_map.wall_index.raycast(point, direction)
+        if hit == None:
             return None
 
-        while not current_map.point_collidelist((x, y)):
-            x += step*cos(angle*math.pi/180)
-            y += step*sin(angle*math.pi/180)
+        t, _ = hit
+        if t <= 0:
+            return None
 
-        return x, y
+        return x + t*direction[0], y + t*direction[1]
     
     @staticmethod
     def in_fov(angle, orientation, fov):
@@ -174,76 +138,17 @@ class Entity(pygame.sprite.Sprite):
     
     def entity_in_fov(self, entity, current_map):
         now = pygame.time.get_ticks()
-        if not self.is_in_frontstage:
-            return False
-        
-        angle = angle_entity(self, entity)
-        if self.in_fov(angle, self.look_orientation, self.fov) and self.can_see_entity(entity, current_map):
+        if current_map.perception.entity_in_fov(self, entity): # cached for the current tick
             self.last_time_seen = now
             return True
         return False
 
     def cast_rays(self, orientation, fov, current_map):
         """
-        Casts ray in an angle, and returns a list of triangles formed by the player and successive corners
+        Returns the visible part of the cone of vision as a list of triangles (position, point1, point2),
+        computed with an angular sweep over the map's visibility segments
         """
-
-        pos = self.x_pos, self.y_pos
-        corner_angles = []
-        triangles_list = []
-
-        pixel_eps = 1e-9
-        angle_eps = 1e-9
-
-        right_limit = (orientation-fov/2)%360
-        left_limit = (orientation+fov/2)%360
-
-        furthest_right = 0, right_limit, self.furthest_point_in_direction((self.x_pos, self.y_pos), right_limit, current_map) # relative_angle, abs_angle, point
-        bisect.insort_left(corner_angles, furthest_right)
-        furthest_left = (left_limit-right_limit)%360, left_limit, self.furthest_point_in_direction((self.x_pos, self.y_pos), left_limit, current_map)
-        bisect.insort_left(corner_angles, furthest_left)
-
-        for wall in current_map.wall_corners.keys():
-            corners = current_map.wall_corners[wall]
-
-            for corner in corners:
-                if self.can_see_point(corner, current_map):
-                    corner_angle = angle(pos, corner)%360
-                    vision_angle = (corner_angle-right_limit)%360, corner_angle, corner
-
-                    if not furthest_right[0] <= vision_angle[0] <= furthest_left[0]: #self.in_fov(vision_angle[0], orientation, fov): #checks if point is within cone of vision
-                        continue
-
-                    bisect.insort_left(corner_angles, vision_angle)
-
-                    x = corner[0]-self.x_pos
-                    y = corner[1]-self.y_pos
-                    norm = math.sqrt(x**2 + y**2)
-                    dx_orth, dy_orth = -y/norm*pixel_eps, x/norm*pixel_eps
-
-                    ray_collides_right = wall.rect.collidepoint(corner[0]+dx_orth, corner[1]+dy_orth)
-                    ray_collides_left = wall.rect.collidepoint(corner[0]-dx_orth, corner[1]-dy_orth)
-
-                    if ray_collides_right and not ray_collides_left: # we determine in which direction the corner ends
-                        furthest = self.furthest_point_in_direction(corner, vision_angle[1], current_map)
-                        if furthest == None:
-                           continue
-                        furthest_point = (vision_angle[0]-angle_eps)%360, (vision_angle[1]+angle_eps)%360, furthest
-                        bisect.insort_left(corner_angles, furthest_point)
-
-                    elif ray_collides_left and not ray_collides_right:
-                        furthest = self.furthest_point_in_direction(corner, vision_angle[1], current_map)
-                        if furthest == None:
-                            continue
-                        furthest_point = (vision_angle[0]+angle_eps)%360, (vision_angle[1]+angle_eps)%360, furthest
-                        bisect.insort_left(corner_angles, furthest_point)
-
-        
-        n = len(corner_angles)
-        for i in range(n-1):
-            triangles_list.append((pos, corner_angles[i][2], corner_angles[(i+1)%n][2])) # i%n so the last triangle that loops back is included
-
-        return triangles_list
+        return visibility_polygon((self.x_pos, self.y_pos), orientation, fov, current_map.visibility_segments)
     
     def fov_rays(self, current_map):
         right_limit = (self.look_orientation-self.fov/2)%360
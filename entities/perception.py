@@ -0,0 +1,55 @@
+from utilities.geometry import angle_entity
+
+
+class Perception():
+    """
+    Line of sight results between entities, computed at most once per simulation tick.
+
+    Every consumer (alien state machine, director, renderer) asks through Entity.entity_in_fov;
+    a result is reused as long as the observer's position, look orientation, fov and
+    frontstage status and the target's position are unchanged within the tick.
+    """
+    def __init__(self, current_map):
+        self.map = current_map
+        self.results = {} # keys: (id(observer), id(target)), values: (inputs, visible, needed_raycast)
+        self.tick = 0
+
+        # Counters, totals since the map was loaded and for the current tick
+        self.queries = 0
+        self.raycasts = 0
+        self.raycasts_saved = 0
+        self.tick_queries = 0
+        self.tick_raycasts = 0
+        self.tick_raycasts_saved = 0
+
+    def new_tick(self):
+        self.tick += 1
+        self.results.clear()
+        self.tick_queries = 0
+        self.tick_raycasts = 0
+        self.tick_raycasts_saved = 0
+
+    def entity_in_fov(self, observer, target):
+        self.queries += 1
+        self.tick_queries += 1
+
+        inputs = (observer.x_pos, observer.y_pos, observer.rect.center, observer.look_orientation, observer.fov,
+                  observer.is_in_frontstage, target.x_pos, target.y_pos, target.rect.center)
+        key = (id(observer), id(target))
+
+        cached = self.results.get(key)
+        if cached != None and cached[0] == inputs:
+            if cached[2]:
+                self.raycasts_saved += 1
+                self.tick_raycasts_saved += 1
+            return cached[1]
+
+        visible = observer.is_in_frontstage and observer.in_fov(angle_entity(observer, target), observer.look_orientation, observer.fov)
+        needed_raycast = visible
+        if needed_raycast:
+            self.raycasts += 1
+            self.tick_raycasts += 1
+            visible = observer.can_see_entity(target, self.map)
+
+        self.results[key] = (inputs, visible, needed_raycast)
+        return visible
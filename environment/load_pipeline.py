@@ -0,0 +1,65 @@
+import time
+import tracemalloc
+
+
+class LoadPipeline():
+    """
+    Runs the stages of Map.load in order, each one at most once per load. A stage is skipped,
+    and its previous result returned, when the key of its inputs is the same as the last time it ran.
+
+    The wall-clock time of every stage of the last load is kept in self.report, with the memory
+    it allocated (and its allocation peak) when tracemalloc is tracing.
+    """
+    def __init__(self):
+        self.results = {} # keys: stage name, values: (inputs key, result) of the last time the stage ran
+        self.report = [] # (stage name, ran, seconds, allocated bytes, peak bytes) of the last load
+        self.started_tracing = False
+
+    def start(self, trace_memory=False):
+        self.report = []
+        self.started_tracing = trace_memory and not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start()
+
+    def finish(self):
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def run(self, name, key, build):
+        """Result of build(), or of its last run if key is not None and equal to the key it ran with."""
+        if key != None and name in self.results:
+            last_key, result = self.results[name]
+            if last_key == key:
+                self.report.append((name, False, 0, None, None))
+                return result
+
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            memory_before = tracemalloc.get_traced_memory()[0]
+        start_time = time.perf_counter()
+        result = build()
+        seconds = time.perf_counter() - start_time
+        allocated, peak = None, None
+        if tracing:
+            memory_after, memory_peak = tracemalloc.get_traced_memory()
+            allocated, peak = memory_after - memory_before, memory_peak - memory_before
+
+        self.results[name] = (key, result)
+        self.report.append((name, True, seconds, allocated, peak))
+        return result
+
+    def total_time(self):
+        return sum(seconds for _, _, seconds, _, _ in self.report)
+
+    def format_report(self, title):
+        lines = [f"{title}: loaded in {self.total_time()*1000:.1f} ms"]
+        for name, ran, seconds, allocated, peak in self.report:
+            if not ran:
+                lines.append(f"  {name:<16} skipped (inputs unchanged)")
+            elif allocated == None:
+                lines.append(f"  {name:<16} {seconds*1000:8.1f} ms")
+            else:
+                lines.append(f"  {name:<16} {seconds*1000:8.1f} ms {allocated/1024:+10.0f} KB (peak {peak/1024:+.0f} KB)")
+        return '\n'.join(lines)
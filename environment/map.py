@@ -1,15 +1,79 @@
 from .walls import Wall
-from .mesh_loader import generate
+from .mesh_loader import generate, rasterize, merge_rectangles
+from .wall_index import WallIndex
+from .pvs import PotentiallyVisibleSet
+from .load_pipeline import LoadPipeline
+from utilities.visibility import outline_segments
+from utilities.geometry import overlapping_rect_pairs
 from utilities.mesh import NavMesh, VentMesh
-from entities import Player, Alien
-import pygame
+from utilities.vent_index import VentIndex
+from utilities.hpa import ClusterHierarchy
+from utilities.landmarks import Landmarks
+from utilities.graph import CSRGraph
+from utilities.vent_routes import VentRoutes
+from utilities.map_format import read_map_file, write_map_file, MapFormatError
+from entities import Player, Alien, Perception
 import os
 import math
 import pickle
+import hashlib
+import numpy as np
 
 DENSITY = 15
+NAV_MESH_CACHE_VERSION = 4 # bump whenever generate() or the stored nav mesh sections change
+
+def nav_mesh_sections(mesh, key):
+    """Map file sections of a generated nav mesh, with its hierarchy and landmarks when it has them."""
+    graph = mesh.graph
+    sections = {
+        'nav_mesh': {'key': key, 'width': mesh.width, 'height': mesh.height, 'density': mesh.density, 'edge_tolerance': mesh.edge_tolerance},
+        'nav_mesh_tile_state': graph.tile_state,
+        'nav_mesh_offsets': graph.offsets,
+        'nav_mesh_neighbors': graph.neighbors,
+        'nav_mesh_weights': graph.weights,
+        'nav_mesh_components': mesh.component_ids(),
+    }
+    hierarchy = mesh.hierarchy
+    if hierarchy != None:
+        sections['nav_mesh_hierarchy'] = {'cluster_size': hierarchy.cluster_size}
+        for name in ('nodes', 'offsets', 'neighbors', 'weights'):
+            sections[f'nav_mesh_hierarchy_{name}'] = getattr(hierarchy, name)
+    if mesh.landmarks != None:
+        sections['nav_mesh_landmarks'] = mesh.landmarks.landmarks
+        sections['nav_mesh_landmark_distances'] = mesh.landmarks.distances
+    return sections
+
+def nav_mesh_from_sections(size, sections, key):
+    """
+    The nav mesh stored in the sections if it was generated for the given cache key, else None.
+    The arrays are used as they are, so memory mapped sections stay memory mapped.
+    """
+    meta = sections.get('nav_mesh')
+    if meta == None or meta.get('key') != key:
+        return None
+    width, height = meta['width'], meta['height']
+    mesh = NavMesh(size, width, height, meta['density'], meta['edge_tolerance'])
+    mesh.set_graph(CSRGraph(width, height, sections['nav_mesh_tile_state'], sections['nav_mesh_offsets'],
+                            sections['nav_mesh_neighbors'], sections['nav_mesh_weights']))
+    mesh.components = sections['nav_mesh_components']
+    if 'nav_mesh_hierarchy' in sections:
+        mesh.hierarchy = ClusterHierarchy(width, height, sections['nav_mesh_hierarchy']['cluster_size'],
+                                          *(sections[f'nav_mesh_hierarchy_{name}'] for name in ('nodes', 'offsets', 'neighbors', 'weights')))
+    if 'nav_mesh_landmarks' in sections:
+        mesh.landmarks = Landmarks(sections['nav_mesh_landmarks'], sections['nav_mesh_landmark_distances'])
+    return mesh
+
 
 class Map():
+    """
+    Walls, vents, spawns and the structures load() derives from them. maps/<name>/settings.txt,
+    when present, is the authoritative source of the mesh settings and spawns: load() applies it
+    over the values read from the settings section of map.bin (which the map editor writes with
+    placeholder spawns), and save() then writes the applied values.
+    """
+    precomputed = None # optional nav_mesh*/pvs* sections of map.bin, used by load() instead of generating them
+    cache_folder = 'maps' # the navmesh.bin and pvs.bin caches are written to <cache_folder>/<name>/
+
     def __init__(self, map_name, width, height, density, edge_tolerance):
         self.name = map_name
         self.walls = []
@@ -23,18 +87,160 @@ class Map():
         self.vents_mesh = VentMesh(self.size, width//density, height//density, density)
         self.nav_mesh = None
         self.nav_mesh_walls = []
-        self.wall_corners = {}
+        self.wall_index = None
+        self.nav_mesh_wall_index = None
+        self.perception = None
+        self.visibility_segments = []
+        self.pvs = None # not built by load(), see generate_pvs
+        self.load_pipeline = LoadPipeline()
+
+    def __setstate__(self, state):
+        """
+        Maps pickled by older versions (see open) lack the attributes added since then:
+        they get the values a new Map starts with.
+        """
+        self.__dict__.update(state)
+        if getattr(self, 'mesh_density', None) == None:
+            self.mesh_density = state.get('density') # name of the attribute in the oldest pickles
+        width, height = self.size
+        defaults = Map(self.name, width, height, self.mesh_density, getattr(self, 'edge_tolerance', 0)).__dict__
+        for name, value in defaults.items():
+            if name not in self.__dict__:
+                setattr(self, name, value)
+        if self.vents_mesh.exits == None:
+            self.vents_mesh.exits = []
+
+    @classmethod
+    def open(cls, map_name):
+        """
+        Reads maps/<map_name>/map.bin (memory mapped, its precomputed sections are only paged in when
+        used), or the map.pkl pickle of maps saved before the binary format (which
+        utilities/convert_maps.py converts to map.bin).
+        """
+        path = f"maps/{map_name}/map.bin"
+        if os.path.exists(path):
+            return cls.from_sections(map_name, read_map_file(path, mmap=True))
+        with open(f"maps/{map_name}/map.pkl", 'rb') as f:
+            return pickle.load(f)
+
+    @classmethod
+    def from_sections(cls, map_name, sections):
+        """Builds the map from the sections of a map file (see utilities/map_format.py)."""
+        settings = sections['settings']
+        width, height = settings['size']
+        current_map = cls(map_name, width, height, settings['mesh_density'], settings['edge_tolerance'])
+        current_map.player_spawn = tuple(settings['player_spawn']) if settings['player_spawn'] != None else None
+        current_map.enemy_spawn = tuple(settings['enemy_spawn']) if settings['enemy_spawn'] != None else None
+        current_map.walls = [Wall(x, y, w, h) for x, y, w, h in sections['walls'].tolist()]
+
+        vent_density = settings['vent_density']
+        vents_mesh = VentMesh(current_map.size, width//vent_density, height//vent_density, vent_density)
+        nodes = [tuple(node) for node in sections['vent_nodes'].tolist()]
+        adjacency_map = {node: [] for node in nodes}
+        for (a, b), weight in zip(sections['vent_edges'].tolist(), sections['vent_weights'].tolist()):
+            adjacency_map[nodes[a]].append((nodes[b], weight))
+        vents_mesh.adjacency_map = adjacency_map
+        vents_mesh.exits = [tuple(exit_point) for exit_point in sections['vent_exits'].tolist()]
+        if 'vent_next_hop' in sections:
+            # the nodes are stored in node id order, the order of the table
+            graph = vents_mesh.graph
+            vents_mesh.routes = VentRoutes(np.flatnonzero(graph.tile_state).astype(np.int32), sections['vent_distance'],
+                                           sections['vent_next_hop'], (graph.offsets.copy(), graph.neighbors.copy(), graph.weights.copy()))
+        current_map.vents_mesh = vents_mesh
+
+        current_map.precomputed = {name: value for name, value in sections.items() if name.startswith(('nav_mesh', 'pvs'))}
+        return current_map
+
+    def save(self, path=None, precomputed=False):
+        """
+        Writes the map to path (maps/<name>/map.bin by default). With precomputed=True the nav mesh
+        and the PVS, when they have been generated, are stored too so that load() does not rebuild them.
+        """
+        vents_mesh = self.vents_mesh
+        graph = vents_mesh.graph
+        width = vents_mesh.width
+        node_ids = np.flatnonzero(graph.tile_state)
+        index = np.full(len(graph.tile_state), -1, dtype=np.int64)
+        index[node_ids] = np.arange(len(node_ids))
+        degrees = np.diff(graph.offsets)
+        sources = np.repeat(np.arange(len(degrees), dtype=np.int64), degrees)
+        routes = vents_mesh.routing_table()
+
+        sections = {
+            'settings': {
+                'name': self.name,
+                'size': list(self.size),
+                'mesh_density': self.mesh_density,
+                'edge_tolerance': self.edge_tolerance,
+                'player_spawn': list(self.player_spawn) if self.player_spawn != None else None,
+                'enemy_spawn': list(self.enemy_spawn) if self.enemy_spawn != None else None,
+                'vent_density': vents_mesh.density,
+            },
+            'walls': np.array([tuple(wall.rect) for wall in self.walls], dtype=np.int32).reshape(-1, 4),
+            'vent_nodes': np.stack((node_ids % width, node_ids // width), axis=1).astype(np.int32),
+            'vent_edges': np.stack((index[sources], index[graph.neighbors]), axis=1).astype(np.int32),
+            'vent_weights': graph.weights.astype(np.float64),
+            'vent_exits': np.array(vents_mesh.exits or [], dtype=np.int32).reshape(-1, 2),
+            'vent_distance': routes.distance,
+            'vent_next_hop': routes.next_hop,
+        }
+
+        if precomputed:
+            key = self.nav_mesh_cache_key(self.mesh_density, self.edge_tolerance)
+            if self.nav_mesh != None:
+                sections.update(nav_mesh_sections(self.nav_mesh, key))
+            if self.pvs != None:
+                sections.update(self.pvs.sections(key))
+
+        write_map_file(path or f"maps/{self.name}/map.bin", sections)
 
     def save_map(self):
         self.nav_mesh = self.generate_nav_mesh(self.mesh_density, self.edge_tolerance)
-        self.wall_corners = self.init_wall_corners()
 
-    def load(self):
-        self.parse_settings()
-        self.nav_mesh_walls = self.generate_nav_mesh_walls()
-        self.nav_mesh = self.generate_nav_mesh(self.mesh_density, self.edge_tolerance)
-        self.wall_corners = self.init_wall_corners()
-        self.nav_mesh_walls = self.generate_nav_mesh_walls()
+    def load(self, report=False):
+        """
+        Loads the map in stages: settings (from settings.txt, see Map), nav mesh, nav mesh walls,
+        wall index and vent indices. A stage is skipped when its inputs are unchanged since the map was last
+        loaded. The time of each stage is kept in self.load_pipeline.report; report=True also
+        measures the memory they allocate (with tracemalloc) and prints the report.
+        """
+        pipeline = self.load_pipeline
+        pipeline.start(trace_memory=report)
+        try:
+            pipeline.run('settings', self.settings_key(), self.parse_settings)
+            walls = (tuple(self.walls), tuple(tuple(wall.rect) for wall in self.walls)) # same objects, same rects
+            mesh_key = self.nav_mesh_cache_key(self.mesh_density, self.edge_tolerance) # walls, size and mesh settings
+
+            self.nav_mesh = pipeline.run('nav_mesh', mesh_key, lambda: self.generate_nav_mesh(self.mesh_density, self.edge_tolerance))
+            self.nav_mesh_walls, self.nav_mesh_wall_index = pipeline.run('nav_mesh_walls', mesh_key, self.index_nav_mesh_walls)
+            self.wall_index, self.visibility_segments = pipeline.run('wall_index', walls, self.index_walls)
+            vents_mesh = self.vents_mesh
+            pipeline.run('vents', (vents_mesh, vents_mesh.graph, tuple(vents_mesh.exits or [])), self.index_vents)
+            self.perception = Perception(self) # fresh line of sight cache and counters on every load
+        finally:
+            pipeline.finish()
+        if report:
+            print(pipeline.format_report(self.name))
+
+    def settings_key(self):
+        """None (always parsed, which does nothing) if the map has no settings.txt."""
+        path = f"maps/{self.name}/settings.txt"
+        if not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def index_nav_mesh_walls(self):
+        nav_mesh_walls = self.generate_nav_mesh_walls()
+        return nav_mesh_walls, WallIndex(nav_mesh_walls)
+
+    def index_walls(self):
+        wall_index = WallIndex(self.walls)
+        return wall_index, outline_segments(self.walls, wall_index)
+
+    def index_vents(self):
+        self.vents_mesh.search_engine(VentIndex).update() # nearest vent node and exit queries
+        self.vents_mesh.routing_table() # only built if the map file was saved without it
  
     def parse_walls(self):
         with open(f"maps/{self.name}/walls.txt") as file:
@@ -52,44 +258,40 @@ class Map():
                     continue
 
     def init_wall_corners(self):
-        wall_corners = {wall: [] for wall in self.walls}
-
-        # 1. Add real rectangle corners
+        """
+        Corners of every wall, followed by the corners of its intersections with the walls it
+        overlaps (in wall order, without duplicates). The overlapping pairs are found with a sweep.
+        Not run by load(): the view cone is cast against the merged wall outline (see index_walls).
+        """
+        wall_corners = {}
+        seen = {}
         for wall in self.walls:
             r = wall.rect
-            wall_corners[wall].extend([
-                r.topleft, r.topright, r.bottomleft, r.bottomright
-            ])
-
-        # Helper: rectangle intersection (pygame doesn't give its rect)
-        def rect_intersection(r1, r2):
-            x1 = max(r1.left,   r2.left)
-            y1 = max(r1.top,    r2.top)
-            x2 = min(r1.right,  r2.right)
-            y2 = min(r1.bottom, r2.bottom)
-            if x1 < x2 and y1 < y2:
-                return pygame.Rect(x1, y1, x2 - x1, y2 - y1)
-            return None
+            wall_corners[wall] = [r.topleft, r.topright, r.bottomleft, r.bottomright]
+            seen[wall] = set(wall_corners[wall])
 
-        # 2. Add corners of intersection rectangles between any overlapping walls
-        for i, A in enumerate(self.walls):
-            rA = A.rect
-            for B in self.walls[i+1:]:
-                rB = B.rect
-
-                if rA.colliderect(rB):
-                    inter = rect_intersection(rA, rB)
-                    if inter:  # intersection has positive area
-                        for pt in [inter.topleft, inter.topright, inter.bottomleft, inter.bottomright]:
-                            if pt not in wall_corners[A]:
-                                wall_corners[A].append(pt)
-                            if pt not in wall_corners[B]:
-                                wall_corners[B].append(pt)
+        rects = [wall.rect for wall in self.walls]
+        for i, j in overlapping_rect_pairs(rects):
+            rA, rB = rects[i], rects[j]
+            if not rA.colliderect(rB):
+                continue
+            x1, y1 = max(rA.left, rB.left), max(rA.top, rB.top)
+            x2, y2 = min(rA.right, rB.right), min(rA.bottom, rB.bottom)
+            for wall in (self.walls[i], self.walls[j]):
+                corners, wall_seen = wall_corners[wall], seen[wall]
+                for pt in [(x1, y1), (x2, y1), (x1, y2), (x2, y2)]:
+                    if pt not in wall_seen:
+                        wall_seen.add(pt)
+                        corners.append(pt)
 
         return wall_corners
 
     def parse_settings(self):
-        with open(f"maps/{self.name}/settings.txt") as file:
+        """Applies the settings in settings.txt over the current ones, keeping those it does not set."""
+        path = f"maps/{self.name}/settings.txt"
+        if not os.path.exists(path):
+            return
+        with open(path) as file:
             parsed_data = {}
             for line in file:
                 line = line.strip()
@@ -109,45 +311,98 @@ class Map():
                     print(f"Error parsing line : {line}")
                     continue
             
-            self.mesh_density = parsed_data["mesh_density"]
-            self.edge_tolerance = parsed_data["edge_tolerance"]
-            self.player_spawn = parsed_data["player_spawn"]
-            self.enemy_spawn = parsed_data["enemy_spawn"]
+            self.mesh_density = parsed_data.get("mesh_density", self.mesh_density)
+            self.edge_tolerance = parsed_data.get("edge_tolerance", self.edge_tolerance)
+            self.player_spawn = parsed_data.get("player_spawn", self.player_spawn)
+            self.enemy_spawn = parsed_data.get("enemy_spawn", self.enemy_spawn)
 
   
+    def nav_mesh_cache_key(self, density, edge_tolerance):
+        """
+        Hash of every input of the nav mesh generation: a cached mesh is reused only if
+        the walls, map size, density, edge tolerance and cache format are all the same.
+        """
+        walls = sorted(tuple(wall.rect) for wall in self.walls) # the mesh does not depend on the wall order
+        inputs = (NAV_MESH_CACHE_VERSION, tuple(self.size), density, edge_tolerance, walls)
+        return hashlib.sha256(repr(inputs).encode()).hexdigest()
+
+    def cache_path(self, file_name):
+        folder = f"{self.cache_folder}/{self.name}"
+        os.makedirs(folder, exist_ok=True)
+        return f"{folder}/{file_name}"
+
+    def load_cached_nav_mesh(self, path, key):
+        if not os.path.exists(path):
+            return None
+        try:
+            sections = read_map_file(path, mmap=True)
+        except (OSError, ValueError, MapFormatError) as e:
+            print(f"Ignoring unreadable nav mesh cache {path}: {e}")
+            return None
+        return nav_mesh_from_sections(self.size, sections, key)
+
     def generate_nav_mesh(self, density, edge_tolerance):
-        path = f"maps/{self.name}/navmesh.pkl"
-        #commented for debugging, caches mesh calculation
-        # if os.path.exists(path):
-        #     with open(path, 'rb') as file:
-        #         return pickle.load(file)
-            
-        # else:
-        #     mesh = generate(self.size, self.walls, DENSITY)
-        #     with open(path, 'wb') as f:
-        #         pickle.dump(mesh, f)
-        #     return mesh # density = distance in px between two nodes
+        """
+        Returns the nav mesh stored in map.bin or in the navmesh.bin cache (memory mapped)
+        when it was generated from the same inputs, otherwise generates it (density = distance in px
+        between two nodes) and caches it.
+        """
+        path = self.cache_path('navmesh.bin')
+        key = self.nav_mesh_cache_key(density, edge_tolerance)
+
+        mesh = nav_mesh_from_sections(self.size, self.precomputed or {}, key)
+        if mesh != None:
+            return mesh
+
+        mesh = self.load_cached_nav_mesh(path, key)
+        if mesh != None:
+            return mesh
+
         mesh = generate(self.size, self.walls, density, edge_tolerance)
-        with open(path, 'wb') as f:
-            pickle.dump(mesh, f)
+        mesh.hierarchy = ClusterHierarchy.build(mesh) # cached with the mesh for HPA* queries
+        mesh.landmarks = Landmarks.build(mesh) # and for ALT queries
+        mesh.components = mesh.graph.connected_components() # and to reject unreachable goals at once
+        write_map_file(path, nav_mesh_sections(mesh, key))
         return mesh 
+
+    def generate_pvs(self, density, edge_tolerance):
+        """
+        Returns the potentially visible set of the nav mesh tiles stored in map.bin or in the
+        pvs.bin cache (memory mapped) when it was built for the same mesh inputs,
+        otherwise builds it (slow, once per map change) and caches it. load() does not build it:
+        it is not conservative (see PotentiallyVisibleSet), so line of sight checks do not use it.
+        """
+        path = self.cache_path('pvs.bin')
+        key = self.nav_mesh_cache_key(density, edge_tolerance)
+
+        pvs = PotentiallyVisibleSet.from_sections(self.precomputed or {}, key)
+        if pvs != None:
+            return pvs
+
+        pvs = PotentiallyVisibleSet.load(path, key)
+        if pvs != None:
+            return pvs
+
+        pvs = PotentiallyVisibleSet.generate(self.nav_mesh, self.wall_index, self.visibility_segments)
+        pvs.save(path, key)
+        return pvs
         
+    def nav_mesh_wall_tiles(self):
+        """
+        (height, width) grid of the mesh tiles whose rect, grown by the edge tolerance, collides
+        with a wall. The walls are rasterized once instead of testing each tile.
+        """
+        mesh = self.nav_mesh
+        return rasterize(self.walls, mesh.width, mesh.height, mesh.density, mesh.edge_tolerance, clamp=False)
+
     def generate_nav_mesh_walls(self):
-        walls = []
-        mesh_width, mesh_height = self.nav_mesh.width, self.nav_mesh.height
+        """
+        Walls covering exactly the nav mesh wall tiles, merged into rectangles so the debug overlay
+        and segment tests (Entity.can_go_to_point, which the game itself does not call) check a few
+        large walls instead of one wall per tile.
+        """
         density = self.nav_mesh.density
-        for i in range(mesh_width):
-            for j in range(mesh_height):
-                eps = self.nav_mesh.edge_tolerance
-                r = pygame.Rect(i * density, j * density, density, density)
-                r_inf = pygame.Rect(i * density-eps, j * density-eps, density+2*eps, density+2*eps)
-                if r_inf.collidelist(self.walls) != -1:
-                    walls.append(Wall(i*density, j*density, density, density))
-        return walls
+        return [Wall(i*density, j*density, w*density, h*density) for i, j, w, h in merge_rectangles(self.nav_mesh_wall_tiles())]
 
     def point_collidelist(self, point):
-        for wall in self.walls:
-            if wall.rect.collidepoint(point):
-                return True
-            
-        return False
\ No newline at end of file
+        return self.wall_index.point_collides(point)
\ No newline at end of file
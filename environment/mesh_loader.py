@@ -1,9 +1,155 @@
 import pygame
+import numpy as np
 from math import sqrt
 from utilities.mesh import NavMesh, VentMesh
+from utilities.graph import CSRGraph, TILE_WALL, TILE_BLOCKED, TILE_FREE
 
+# Neighbor order of the adjacency lists: left, right, up, down, up-left, up-right, down-left, down-right
+DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (1, -1), (-1, 1), (1, 1)]
+WEIGHTS = [1, 1, 1, 1, sqrt(2), sqrt(2), sqrt(2), sqrt(2)]
+
+
+def tile_ranges(origins, tile_size, wall_start, wall_end):
+    """
+    For tiles spanning [origins[k], origins[k] + tile_size) along one axis (origins sorted),
+    returns for each wall interval [wall_start, wall_end) the range [lo, hi) of tiles it overlaps,
+    with the same strict inequalities as pygame.Rect.colliderect.
+    """
+    lo = np.searchsorted(origins, wall_start - tile_size, side='right')
+    hi = np.searchsorted(origins, wall_end, side='left')
+    return lo, hi
+
+def rasterize(walls, mesh_width, mesh_height, density, edge_tolerance, density_opt=None, clamp=True):
+    """
+    Returns a (mesh_height, mesh_width) boolean grid telling, for every tile, whether
+    mesh.rect(i, j, density_opt) collides with at least one wall. With clamp=False the tiles of
+    the first row and column are not moved inside the map as mesh.rect does.
+    Each wall is mapped to the block of tiles it overlaps and all blocks are summed
+    at once with a 2D difference array, instead of testing every tile against every wall.
+    """
+    density = density if density_opt == None else density_opt
+    tile_size = density + 2*edge_tolerance
+
+    grid = np.zeros((mesh_height, mesh_width), dtype=bool)
+    if not walls or tile_size <= 0:
+        return grid
+
+    rects = np.array([wall.rect for wall in walls], dtype=np.int64).reshape(-1, 4)
+    # pygame normalizes negative sizes and never reports collisions with empty rects
+    x = np.minimum(rects[:, 0], rects[:, 0] + rects[:, 2])
+    y = np.minimum(rects[:, 1], rects[:, 1] + rects[:, 3])
+    w, h = np.abs(rects[:, 2]), np.abs(rects[:, 3])
+    non_empty = (w > 0) & (h > 0)
+    x, y, w, h = x[non_empty], y[non_empty], w[non_empty], h[non_empty]
+
+    origins_x = np.arange(mesh_width)*density - edge_tolerance
+    origins_y = np.arange(mesh_height)*density - edge_tolerance
+    if clamp:
+        origins_x, origins_y = np.maximum(0, origins_x), np.maximum(0, origins_y)
+    lo_i, hi_i = tile_ranges(origins_x, tile_size, x, x + w)
+    lo_j, hi_j = tile_ranges(origins_y, tile_size, y, y + h)
+
+    overlaps = (lo_i < hi_i) & (lo_j < hi_j)
+    lo_i, hi_i, lo_j, hi_j = lo_i[overlaps], hi_i[overlaps], lo_j[overlaps], hi_j[overlaps]
+
+    counts = np.zeros((mesh_height + 1, mesh_width + 1), dtype=np.int32)
+    np.add.at(counts, (lo_j, lo_i), 1)
+    np.add.at(counts, (lo_j, hi_i), -1)
+    np.add.at(counts, (hi_j, lo_i), -1)
+    np.add.at(counts, (hi_j, hi_i), 1)
+    counts = counts.cumsum(axis=0).cumsum(axis=1)
+
+    return counts[:mesh_height, :mesh_width] > 0
+
+def merge_rectangles(grid):
+    """
+    Covers the True cells of a (height, width) boolean grid with non-overlapping rectangles,
+    returned as (i, j, width, height) in cells. Greedy: from the first uncovered cell in
+    row-major order, a run is grown to the right as far as the row allows, then down as long
+    as the whole run is True and uncovered below. Both the grid and its transpose are merged,
+    and the smaller set is kept. This is not a minimum partition (which takes a bipartite
+    matching over the concave corners), only a small one: the shipped maps go from thousands
+    of wall tiles to a few dozen rectangles.
+    """
+    def greedy(grid):
+        covered = ~grid
+        rectangles = []
+        height, width = grid.shape
+        for j, i in zip(*np.nonzero(grid)):
+            if covered[j, i]:
+                continue
+            run = covered[j, i:]
+            w = int(np.argmax(run)) if run.any() else width - i
+            h = 1
+            while j + h < height and not covered[j + h, i:i + w].any():
+                h += 1
+            covered[j:j + h, i:i + w] = True
+            rectangles.append((int(i), int(j), w, h))
+        return rectangles
+
+    rows = greedy(grid)
+    columns = [(i, j, w, h) for j, i, h, w in greedy(grid.T)]
+    return columns if len(columns) < len(rows) else rows
+
+def shifted(grid, di, dj):
+    """
+    shifted(grid, di, dj)[j, i] = grid[j+dj, i+di], tiles outside the mesh count as False.
+    """
+    mesh_height, mesh_width = grid.shape
+    out = np.zeros_like(grid)
+    out[max(0, -dj):mesh_height - max(0, dj), max(0, -di):mesh_width - max(0, di)] = \
+        grid[max(0, dj):mesh_height + min(0, dj), max(0, di):mesh_width + min(0, di)]
+    return out
 
 def generate(size, walls, density, edge_tolerance):
+    """
+    Builds the NavMesh with array operations: the walls are rasterized once onto the tile grid,
+    then the 8 neighbor masks are derived by shifting the blocked grid.
+    Produces exactly the same graph as generate_reference.
+    """
+    map_width, map_height = size
+
+    mesh_width = map_width//density +1 
+    mesh_height = map_height//density + 1
+
+    mesh_size = mesh_width*mesh_height
+
+    mesh = NavMesh(mesh_size, mesh_width, mesh_height, density, edge_tolerance)
+
+    is_wall = rasterize(walls, mesh_width, mesh_height, density, edge_tolerance, 0)
+    blocked = rasterize(walls, mesh_width, mesh_height, density, edge_tolerance)
+    clear = ~blocked
+
+    accessible = clear & ~is_wall
+    masks = []
+    for di, dj in DIRECTIONS:
+        mask = accessible & shifted(clear, di, dj)
+        if di and dj: # no corner cutting
+            mask &= shifted(clear, di, 0) & shifted(clear, 0, dj)
+        masks.append(mask.reshape(-1))
+    masks = np.stack(masks, axis=1) # (node, direction), node n = i + mesh_width*j
+
+    nodes, directions = np.nonzero(masks)
+    deltas = np.array([di + mesh_width*dj for di, dj in DIRECTIONS], dtype=np.int64)
+    neighbors = (nodes + deltas[directions]).astype(np.int32)
+    weights = np.array(WEIGHTS, dtype=np.float64)[directions]
+
+    degrees = masks.sum(axis=1)
+    offsets = np.zeros(mesh_size + 1, dtype=np.int32)
+    np.cumsum(degrees, out=offsets[1:])
+
+    tile_state = np.full(mesh_size, TILE_BLOCKED, dtype=np.uint8)
+    tile_state[degrees > 0] = TILE_FREE
+    tile_state[is_wall.reshape(-1)] = TILE_WALL
+
+    mesh.set_graph(CSRGraph(mesh_width, mesh_height, tile_state, offsets, neighbors, weights))
+    return mesh
+
+def generate_reference(size, walls, density, edge_tolerance):
+    """
+    Tile by tile version of generate, testing each tile rect against the wall list.
+    Kept as the reference the vectorized generator is checked against (see utilities/benchmark.py).
+    """
     map_width, map_height = size
 
     mesh_width = map_width//density +1 
@@ -12,14 +158,14 @@ def generate(size, walls, density, edge_tolerance):
     mesh_size = mesh_width*mesh_height
 
     mesh = NavMesh(mesh_size, mesh_width, mesh_height, density, edge_tolerance)
-    mesh.adjacency_map = {(i, j): [] for i in range(mesh_width) for j in range(mesh_height)}
+    adjacency_map = {(i, j): [] for i in range(mesh_width) for j in range(mesh_height)}
 
     for i in range(mesh_width):
         for j in range(mesh_height):
             current_rect = mesh.rect(i, j)
             
             if mesh.rect(i, j, 0).collidelist(walls) != -1:
-                mesh.adjacency_map[(i, j)] = None
+                adjacency_map[(i, j)] = None
                 continue
 
             if current_rect.collidelist(walls) != -1:
@@ -28,13 +174,13 @@ def generate(size, walls, density, edge_tolerance):
             # Cardinal directions (weight = 1)
             
             if i > 0 and mesh.rect(i-1, j).collidelist(walls) == -1:
-                mesh.adjacency_map[(i, j)].append(((i-1, j), 1))
+                adjacency_map[(i, j)].append(((i-1, j), 1))
             if i < mesh_width-1 and mesh.rect(i+1, j).collidelist(walls) == -1:
-                mesh.adjacency_map[(i, j)].append(((i+1, j), 1))
+                adjacency_map[(i, j)].append(((i+1, j), 1))
             if j > 0 and mesh.rect(i, j-1).collidelist(walls) == -1:
-                mesh.adjacency_map[(i, j)].append(((i, j-1), 1))
+                adjacency_map[(i, j)].append(((i, j-1), 1))
             if j < mesh_height-1 and mesh.rect(i, j+1).collidelist(walls) == -1:
-                mesh.adjacency_map[(i, j)].append(((i, j+1), 1))
+                adjacency_map[(i, j)].append(((i, j+1), 1))
             
             # Diagonals (weight = sqrt(2))
             # 1. UP-LEFT
@@ -43,27 +189,28 @@ def generate(size, walls, density, edge_tolerance):
                 mesh.rect(i-1, j).collidelist(walls) == -1 and   # Corner 1 (Left) clear
                 mesh.rect(i, j-1).collidelist(walls) == -1):     # Corner 2 (Up) clear
                     
-                mesh.adjacency_map[(i, j)].append(((i-1, j-1), sqrt(2)))
+                adjacency_map[(i, j)].append(((i-1, j-1), sqrt(2)))
             # 2. UP-RIGHT
             if (i < mesh_width-1 and j > 0 and 
                 mesh.rect(i+1, j-1).collidelist(walls) == -1 and  # Destination clear
                 mesh.rect(i+1, j).collidelist(walls) == -1 and   # Corner 1 (Right) clear
                 mesh.rect(i, j-1).collidelist(walls) == -1):     # Corner 2 (Up) clear
                     
-                mesh.adjacency_map[(i, j)].append(((i+1, j-1), sqrt(2)))
+                adjacency_map[(i, j)].append(((i+1, j-1), sqrt(2)))
             # 3. DOWN-LEFT
             if (i > 0 and j < mesh_height-1 and 
                 mesh.rect(i-1, j+1).collidelist(walls) == -1 and  # Destination clear
                 mesh.rect(i-1, j).collidelist(walls) == -1 and   # Corner 1 (Left) clear
                 mesh.rect(i, j+1).collidelist(walls) == -1):     # Corner 2 (Down) clear
                     
-                mesh.adjacency_map[(i, j)].append(((i-1, j+1), sqrt(2)))
+                adjacency_map[(i, j)].append(((i-1, j+1), sqrt(2)))
             # 4. DOWN-RIGHT
             if (i < mesh_width-1 and j < mesh_height-1 and 
                 mesh.rect(i+1, j+1).collidelist(walls) == -1 and  # Destination clear
                 mesh.rect(i+1, j).collidelist(walls) == -1 and   # Corner 1 (Right) clear
                 mesh.rect(i, j+1).collidelist(walls) == -1):     # Corner 2 (Down) clear
                     
-                mesh.adjacency_map[(i, j)].append(((i+1, j+1), sqrt(2)))
+                adjacency_map[(i, j)].append(((i+1, j+1), sqrt(2)))
 
+    mesh.adjacency_map = adjacency_map
     return mesh
\ No newline at end of file
@@ -0,0 +1,156 @@
+import numpy as np
+from utilities.graph import TILE_WALL
+from utilities.visibility import visibility_polygon
+from utilities.map_format import read_map_file, write_map_file, MapFormatError
+
+
+PVS_BLOCK_SIZE = 512 # rows (a multiple of 8) of the square blocks the bit matrix is transposed by
+
+
+class PotentiallyVisibleSet():
+    """
+    For every nav mesh tile, a bitset of the tiles that may be visible from it.
+
+    Built offline from the 360 degree visibility polygon of each tile center, then dilated by one
+    tile on both ends of every pair. A set bit means the precise test still has to be done. A cleared
+    bit is only a hint: the views are sampled at the tile centers, so two tiles can see each other
+    through an opening narrower than about a tile while the PVS says they cannot. It must not be used
+    to skip line of sight checks until it is computed conservatively, region to region.
+
+    Only the tiles whose 3x3 neighborhood has a view (no wall tile, no center inside a wall) get a
+    bitset, over those tiles only: the bitsets of the others would be full after the dilation.
+    """
+    def __init__(self, width, height, density, rows, bits):
+        self.width = width
+        self.height = height
+        self.density = density
+        self.rows = rows # (width*height,) int32, row (and column) of every tile in bits, -1 if it may see every tile
+        self.bits = bits # (R, ceil(R/8)) uint8, row r = packed bits of the r-th tile with a bitset
+
+    @classmethod
+    def generate(cls, nav_mesh, wall_index, segments):
+        width, height, density = nav_mesh.width, nav_mesh.height, nav_mesh.density
+        size = width*height
+
+        centers_x = (np.arange(size) % width) * density + density/2
+        centers_y = (np.arange(size) // width) * density + density/2
+
+        # no meaningful view from inside a wall: those tiles may see (and be seen by) every tile
+        viewable = np.array([nav_mesh.graph.tile_state[n] != TILE_WALL and not wall_index.point_collides((centers_x[n], centers_y[n]))
+                             for n in range(size)], dtype=bool)
+        view_tiles = np.flatnonzero(viewable)
+        view_rows = np.full(size, -1, dtype=np.int64)
+        view_rows[view_tiles] = np.arange(len(view_tiles))
+
+        # 1. raw visibility between the viewable tiles, one packed row at a time
+        visible = np.zeros((-(-len(view_tiles) // 8)*8, -(-len(view_tiles) // 8)), dtype=np.uint8)
+        for r, n in enumerate(view_tiles.tolist()):
+            visible[r] = np.packbits(cls.visible_from((centers_x[n], centers_y[n]), centers_x[view_tiles], centers_y[view_tiles], segments))
+
+        # 2. line of sight is symmetric
+        cls.symmetrize(visible)
+
+        # 3. dilation: the bitset of a tile is the OR of its neighbors' rows, each one dilated over the grid
+        tiles = np.flatnonzero(~cls.dilate(~viewable[None, :], width, height)[0])
+        rows = np.full(size, -1, dtype=np.int32)
+        rows[tiles] = np.arange(len(tiles))
+        bits = np.empty((len(tiles), -(-len(tiles) // 8)), dtype=np.uint8)
+        seen = np.ones(size, dtype=bool)
+        for r, n in enumerate(tiles.tolist()):
+            i, j = n % width, n // width
+            neighbors = [view_rows[(i + di) + width*(j + dj)] for dj in (-1, 0, 1) for di in (-1, 0, 1)
+                         if 0 <= i + di < width and 0 <= j + dj < height]
+            seen[view_tiles] = np.unpackbits(np.bitwise_or.reduce(visible[neighbors], axis=0), count=len(view_tiles)).astype(bool)
+            bits[r] = np.packbits(cls.dilate(seen[None, :], width, height)[0][tiles])
+
+        return cls(width, height, density, rows, bits)
+
+    @staticmethod
+    def symmetrize(bits):
+        """ORs the square packed bit matrix with its transpose in place, PVS_BLOCK_SIZE rows at a time."""
+        count = len(bits)
+        for a in range(0, count, PVS_BLOCK_SIZE):
+            for b in range(a, count, PVS_BLOCK_SIZE):
+                block_ab = np.unpackbits(bits[a:a + PVS_BLOCK_SIZE, b//8:(b + PVS_BLOCK_SIZE)//8], axis=1).astype(bool)
+                block_ba = np.unpackbits(bits[b:b + PVS_BLOCK_SIZE, a//8:(a + PVS_BLOCK_SIZE)//8], axis=1).astype(bool)
+                block = block_ab | block_ba.T
+                bits[a:a + PVS_BLOCK_SIZE, b//8:(b + PVS_BLOCK_SIZE)//8] = np.packbits(block, axis=1)
+                bits[b:b + PVS_BLOCK_SIZE, a//8:(a + PVS_BLOCK_SIZE)//8] = np.packbits(block.T, axis=1)
+
+    @staticmethod
+    def visible_from(center, xs, ys, segments):
+        """
+        Returns a boolean array telling which of the points (xs, ys) lie inside the visibility polygon of center.
+        """
+        triangles = visibility_polygon(center, 180, 360, segments) # fan starting at angle 0
+        if not triangles:
+            return np.zeros(len(xs), dtype=bool)
+
+        cx, cy = center
+        p1 = np.array([triangle[1] for triangle in triangles])
+        p2 = np.array([triangle[2] for triangle in triangles])
+        starts = np.arctan2(p1[:, 1] - cy, p1[:, 0] - cx) % (2*np.pi)
+        starts[0] = 0
+
+        dx, dy = xs - cx, ys - cy
+        angles = np.arctan2(dy, dx) % (2*np.pi)
+        k = np.clip(np.searchsorted(starts, angles, side='right') - 1, 0, len(triangles) - 1)
+
+        # Distance to the polygon border along the direction of each point
+        ex, ey = p2[k, 0] - p1[k, 0], p2[k, 1] - p1[k, 1]
+        distance = np.hypot(dx, dy)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ux, uy = dx/distance, dy/distance
+            border = ((p1[k, 0] - cx)*ey - (p1[k, 1] - cy)*ex) / (ux*ey - uy*ex)
+        border = np.where(np.isfinite(border), border, np.inf)
+
+        return (distance <= border + 1e-6) | (distance == 0)
+
+    @staticmethod
+    def dilate(visible, width, height):
+        """ORs every column with its 8 neighboring tiles (the grid is the last axis)."""
+        grid = visible.reshape(-1, height, width)
+        dilated = grid.copy()
+        for dj in (-1, 0, 1):
+            for di in (-1, 0, 1):
+                if di == 0 and dj == 0:
+                    continue
+                dilated[:, max(0, -dj):height - max(0, dj), max(0, -di):width - max(0, di)] |= \
+                    grid[:, max(0, dj):height + min(0, dj), max(0, di):width + min(0, di)]
+        return dilated.reshape(visible.shape)
+
+    def tile(self, x, y):
+        i = max(0, min(int(x // self.density), self.width - 1))
+        j = max(0, min(int(y // self.density), self.height - 1))
+        return i + self.width*j
+
+    def may_see(self, pos1, pos2):
+        """O(1): False only if no line of sight is possible between the tiles of pos1 and pos2."""
+        r = self.rows[self.tile(*pos1)]
+        s = self.rows[self.tile(*pos2)]
+        if r < 0 or s < 0:
+            return True
+        return bool(self.bits[r, s >> 3] & (0x80 >> (s & 7)))
+
+    def sections(self, key):
+        """Map file sections of the PVS (see utilities/map_format.py)."""
+        return {'pvs': {'key': key, 'width': self.width, 'height': self.height, 'density': self.density}, 'pvs_rows': self.rows, 'pvs_bits': self.bits}
+
+    @classmethod
+    def from_sections(cls, sections, key):
+        """The PVS stored in the sections if it was built for the given cache key, else None."""
+        meta = sections.get('pvs')
+        if meta == None or meta.get('key') != key or 'pvs_rows' not in sections: # files without rows hold the former dense matrix
+            return None
+        return cls(meta['width'], meta['height'], meta['density'], sections['pvs_rows'], sections['pvs_bits'])
+
+    def save(self, path, key):
+        write_map_file(path, self.sections(key))
+
+    @classmethod
+    def load(cls, path, key):
+        """Returns the stored PVS, memory mapped, if it was built for the given cache key, else None."""
+        try:
+            return cls.from_sections(read_map_file(path, mmap=True), key)
+        except (OSError, ValueError, MapFormatError):
+            return None
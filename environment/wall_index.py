@@ -0,0 +1,216 @@
+from math import floor, inf
+from utilities.geometry import intersects_rect, segment_enters_rect
+
+WALL_INDEX_CELL_SIZE = 64 # in px
+
+
+class WallIndex():
+    """
+    Uniform grid over the map: each cell lists the walls overlapping it, so collision and
+    visibility queries only look at the walls near the queried point, rect or segment.
+    Queries return walls in the order of the wall list, like a scan of the whole list would.
+    """
+    def __init__(self, walls, cell_size=WALL_INDEX_CELL_SIZE):
+        self.walls = walls
+        self.cell_size = cell_size
+        self.cells = {} # keys: (cell_x, cell_y), values: indices of the walls overlapping the cell
+
+        for index, wall in enumerate(walls):
+            # 1px margin so points on a wall border always fall in one of its cells
+            for cell in self.cells_in_rect(wall.rect.inflate(2, 2)):
+                self.cells.setdefault(cell, []).append(index)
+
+        # Range of occupied cells, rays leaving it cannot hit anything
+        if self.cells:
+            self.i_min = min(i for i, _ in self.cells)
+            self.i_max = max(i for i, _ in self.cells)
+            self.j_min = min(j for _, j in self.cells)
+            self.j_max = max(j for _, j in self.cells)
+
+    def cell(self, x, y=None):
+        if y == None:
+            x, y = x
+        return floor(x / self.cell_size), floor(y / self.cell_size)
+
+    def cells_in_rect(self, rect):
+        left, top = min(rect.left, rect.right), min(rect.top, rect.bottom)
+        right, bottom = max(rect.left, rect.right), max(rect.top, rect.bottom)
+        i_min, j_min = self.cell(left, top)
+        i_max, j_max = self.cell(right, bottom)
+        for i in range(i_min, i_max + 1):
+            for j in range(j_min, j_max + 1):
+                yield (i, j)
+
+    def cells_on_segment(self, p1, p2):
+        """
+        Walks the cells crossed by the segment [p1, p2] in order (Amanatides & Woo DDA).
+        """
+        cell_size = self.cell_size
+        x1, y1 = p1[0] / cell_size, p1[1] / cell_size
+        x2, y2 = p2[0] / cell_size, p2[1] / cell_size
+        i, j = floor(x1), floor(y1)
+        i_end, j_end = floor(x2), floor(y2)
+        dx, dy = x2 - x1, y2 - y1
+
+        step_i = 1 if dx > 0 else -1
+        step_j = 1 if dy > 0 else -1
+        t_delta_x = abs(1 / dx) if dx != 0 else inf
+        t_delta_y = abs(1 / dy) if dy != 0 else inf
+        t_max_x = ((i + 1 - x1) if dx > 0 else (x1 - i)) * t_delta_x if dx != 0 else inf
+        t_max_y = ((j + 1 - y1) if dy > 0 else (y1 - j)) * t_delta_y if dy != 0 else inf
+
+        yield (i, j)
+        for _ in range(abs(i_end - i) + abs(j_end - j)):
+            if t_max_x < t_max_y:
+                i += step_i
+                t_max_x += t_delta_x
+            else:
+                j += step_j
+                t_max_y += t_delta_y
+            yield (i, j)
+
+    def indices_in_cells(self, cells):
+        indices = set()
+        for cell in cells:
+            indices.update(self.cells.get(cell, ()))
+        return sorted(indices)
+
+    def candidates_rect(self, rect):
+        """Walls that may collide with the rect (superset, in wall list order)."""
+        return [self.walls[index] for index in self.indices_in_cells(self.cells_in_rect(rect))]
+
+    def query_rect(self, rect):
+        """Walls colliding with the rect."""
+        return [wall for wall in self.candidates_rect(rect) if wall.rect.colliderect(rect)]
+
+    def query_point(self, point):
+        """Walls containing the point."""
+        walls = self.walls
+        return [walls[index] for index in self.cells.get(self.cell(point), ()) if walls[index].rect.collidepoint(point)]
+
+    def point_collides(self, point):
+        walls = self.walls
+        for index in self.cells.get(self.cell(point), ()):
+            if walls[index].rect.collidepoint(point):
+                return True
+        return False
+
+    def point_inside(self, point):
+        """Whether the point lies strictly inside a wall, borders excluded (float points too)."""
+        x, y = point
+        walls = self.walls
+        for index in self.cells.get(self.cell(point), ()):
+            r = walls[index].rect
+            if r.left < x < r.right and r.top < y < r.bottom:
+                return True
+        return False
+
+    def candidates_segment(self, p1, p2):
+        """Walls that may be crossed by the segment [p1, p2] (superset, in wall list order)."""
+        return [self.walls[index] for index in self.indices_in_cells(self.cells_on_segment(p1, p2))]
+
+    def segment_blocked(self, p1, p2):
+        """
+        Returns True if the segment [p1, p2] crosses an edge of any wall.
+        Cells are tested in the order the segment crosses them, so blocked rays stop early.
+        """
+        walls = self.walls
+        tested = set()
+        for cell in self.cells_on_segment(p1, p2):
+            for index in self.cells.get(cell, ()):
+                if index in tested:
+                    continue
+                tested.add(index)
+                if intersects_rect((p1, p2), walls[index].rect):
+                    return True
+        return False
+
+    def segment_enters(self, p1, p2):
+        """
+        Returns True if the segment [p1, p2] meets the inside of any wall, borders excluded
+        (see segment_enters_rect). Cells are tested in the order the segment crosses them.
+        """
+        walls = self.walls
+        tested = set()
+        for cell in self.cells_on_segment(p1, p2):
+            for index in self.cells.get(cell, ()):
+                if index in tested:
+                    continue
+                tested.add(index)
+                if segment_enters_rect((p1, p2), walls[index].rect):
+                    return True
+        return False
+
+    @staticmethod
+    def ray_rect_intersection(origin, direction, rect):
+        """
+        Slab test: returns (t_enter, t_exit) for the ray origin + t*direction against the
+        closed rect, or None if the ray misses it or the rect lies entirely behind the origin.
+        """
+        t_enter, t_exit = -inf, inf
+        for o, d, low, high in ((origin[0], direction[0], rect.left, rect.right),
+                                (origin[1], direction[1], rect.top, rect.bottom)):
+            if d == 0:
+                if not low <= o <= high:
+                    return None
+                continue
+            t1, t2 = (low - o) / d, (high - o) / d
+            if t1 > t2:
+                t1, t2 = t2, t1
+            t_enter = max(t_enter, t1)
+            t_exit = min(t_exit, t2)
+
+        if t_enter > t_exit or t_exit <= 0:
+            return None
+        return t_enter, t_exit
+
+    def raycast(self, origin, direction):
+        """
+        Returns (t, wall) for the first wall entered by the ray origin + t*direction (t in units of
+        direction), walking the grid cells along the ray and stopping at the first cell that
+        contains a hit. t <= 0 means the origin is inside the wall or on its border facing the ray.
+        Returns None if the ray hits nothing.
+        """
+        if not self.cells:
+            return None
+
+        cell_size = self.cell_size
+        x, y = origin[0] / cell_size, origin[1] / cell_size
+        dx, dy = direction
+        i, j = floor(x), floor(y)
+
+        step_i = 1 if dx > 0 else -1
+        step_j = 1 if dy > 0 else -1
+        t_delta_x = abs(cell_size / dx) if dx != 0 else inf
+        t_delta_y = abs(cell_size / dy) if dy != 0 else inf
+        t_max_x = ((i + 1 - x) if dx > 0 else (x - i)) * t_delta_x if dx != 0 else inf
+        t_max_y = ((j + 1 - y) if dy > 0 else (y - j)) * t_delta_y if dy != 0 else inf
+
+        walls = self.walls
+        tested = set()
+        best = None
+        while True:
+            for index in self.cells.get((i, j), ()):
+                if index in tested:
+                    continue
+                tested.add(index)
+                hit = self.ray_rect_intersection(origin, direction, walls[index].rect)
+                if hit != None and (best == None or hit[0] < best[0]):
+                    best = (hit[0], walls[index])
+
+            # Any wall entered before the ray leaves this cell overlaps this cell, so it was tested
+            t_cell_exit = min(t_max_x, t_max_y)
+            if best != None and best[0] <= t_cell_exit:
+                return best
+
+            if t_max_x < t_max_y:
+                i += step_i
+                t_max_x += t_delta_x
+            else:
+                j += step_j
+                t_max_y += t_delta_y
+
+            if (step_i > 0 and i > self.i_max) or (step_i < 0 and i < self.i_min) \
+                    or (step_j > 0 and j > self.j_max) or (step_j < 0 and j < self.j_min):
+                return best
+
@@ -4,7 +4,6 @@ from entities import Player, Alien, Director
 from environment import Map
 from renderer import GameRenderer, MenuRenderer
 from sound import SoundManager
-import pickle
 
 pygame.init()
 resolution = (1920, 1080)
@@ -19,9 +18,7 @@ sound_manager = SoundManager()
 def initialize_new_game(screen):
     sound_manager.stop_music()
     current_map_name = "map5"
-    map_path = f'maps/{current_map_name}/map.pkl'
-    with open(map_path, 'rb') as f:
-        current_map = pickle.load(f)
+    current_map = Map.open(current_map_name)
 
     current_map.load()
 
@@ -99,6 +96,7 @@ while running:
 
     if game_state == 'GAME_RUNNING':
         is_pressed = pygame.key.get_pressed()
+        current_map.perception.new_tick()
 
         player.update(is_pressed, renderer.get_absolute_position(pygame.mouse.get_pos()), alien, current_map, sound_manager, dt)
         alien.update(player, current_map, sound_manager, dt)
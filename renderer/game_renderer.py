@@ -11,22 +11,12 @@ class GameRenderer():
         self.debug_mode = False
         self.camera = GameCamera()
 
-    # To be updated
-    # def render_dark_mode(self, player, alien):
-    #     light_surface = pygame.Surface(self.map.size, pygame.SRCALPHA)
-    #     light_surface.fill((0, 0, 0)) # Black color
-    #     light_surface.set_colorkey((0, 0, 0))
-    #     for triangle in player.cast_rays(player.look_orientation, player.fov, self.map):
-    #         pygame.draw.polygon(light_surface, (255, 255, 255, 90), triangle)
-            
-    #     fog_surface = pygame.Surface(self.map.size)
-    #     fog_surface.fill((0, 0, 0)) # Black color
-    #     fog_surface.set_alpha(255)
-    #     fog_surface.blit(light_surface, (0, 0),  special_flags=pygame.BLEND_RGBA_SUB)
-    #     fog_surface.set_alpha(200)
-    #     self.screen.blit(fog_surface, (0, 0))
-
-    #     self.screen.blit(light_surface, (0, 0))
+    def render_dark_mode(self, view_triangles):
+        fog_surface = pygame.Surface(self.camera.resolution, pygame.SRCALPHA)
+        fog_surface.fill((0, 0, 0, 230))
+        for triangle in view_triangles:
+            pygame.draw.polygon(fog_surface, (0, 0, 0, 0), [self.get_screen_position(vertex) for vertex in triangle])
+        self.screen.blit(fog_surface, (0, 0))
 
     def get_absolute_position(self, x, y=None):
         if y == None:
@@ -70,13 +60,18 @@ class GameRenderer():
 
         pygame.mouse.set_visible(False)
 
+        # the view cone is swept once per frame, for the fog and the debug overlay
+        view_triangles = player.cast_rays(player.look_orientation, player.fov, self.map) if self.dark_mode else None
+
         if self.debug_mode:
-            self.render_debug(player, alien, dt)
+            self.render_debug(player, alien, dt, view_triangles)
 
         self.camera.update()
 
         if not self.debug_mode: 
             self.render_walls()
+        if self.dark_mode:
+            self.render_dark_mode(view_triangles)
         self.render_player(player)
         self.render_crosshair(player)
         self.render_fov(player)
@@ -98,12 +93,11 @@ class GameRenderer():
             self.screen.blit(fps_surface, (0, 0))
 
     def render_walls(self):
-        for wall in self.map.walls:
-            if wall.rect.colliderect(self.camera.rect):
-                x, y = wall.rect.topleft
-                width, height = wall.rect.width, wall.rect.height
-                wall_rect = pygame.Rect(x-self.camera.offset_x, y-self.camera.offset_y, width, height)
-                pygame.draw.rect(self.screen, (77, 83, 85), wall_rect)
+        for wall in self.map.wall_index.query_rect(self.camera.rect):
+            x, y = wall.rect.topleft
+            width, height = wall.rect.width, wall.rect.height
+            wall_rect = pygame.Rect(x-self.camera.offset_x, y-self.camera.offset_y, width, height)
+            pygame.draw.rect(self.screen, (77, 83, 85), wall_rect)
 
     def render_player(self, player):
         render_pos_x, render_pos_y = self.camera.resolution
@@ -161,28 +155,25 @@ class GameRenderer():
         self.blit_rotate(entity, entity.body_texture_original, (body_center_screen_x, body_center_screen_y), entity.body_rect.center, -entity.orientation)
         # self.blit_rotate(entity, entity.head_texture_original, (body_center_screen_x, body_center_screen_y), entity.head_pivot, -entity.look_orientation)
 
-    def render_debug(self, player, alien, dt):
+    def render_debug(self, player, alien, dt, view_triangles=None):
         # Draw walls
         font = pygame.font.Font(None, 40)
         current_map = self.map
         screen = self.screen
         self.render_walls()
 
-        # Draw mesh grid
-        mesh_width, mesh_height = current_map.nav_mesh.width, current_map.nav_mesh.height
-        density = current_map.nav_mesh.density
-        for i in range(mesh_width):
-            for j in range(mesh_height):
-                    if pygame.rect.Rect(i * density, j * density, density, density).colliderect(self.camera.rect):
-                        eps = current_map.nav_mesh.edge_tolerance
-                        r = pygame.Rect(i * density, j * density, density, density)
-                        x_screen, y_screen = self.get_screen_position(i * density, j * density)
-                        r_screen = pygame.Rect(x_screen, y_screen, density, density)
-                        r_inf = pygame.Rect(i * density-eps, j * density-eps, density+2*eps, density+2*eps)
-                        # Check collision
-                        collides = r_inf.collidelist(current_map.walls) != -1
-                        color = (255, 50, 50) if collides else (50, 255, 50)
-                        pygame.draw.rect(screen, color, r_screen, 1)
+        # Draw mesh grid: the free tiles on screen in green, the merged nav mesh walls in red
+        mesh = current_map.nav_mesh
+        density = mesh.density
+        view = self.camera.rect
+        for i in range(max(0, view.left//density), min(mesh.width, view.right//density + 1)):
+            for j in range(max(0, view.top//density), min(mesh.height, view.bottom//density + 1)):
+                if not current_map.nav_mesh_wall_index.point_inside((i*density + density/2, j*density + density/2)):
+                    x_screen, y_screen = self.get_screen_position(i * density, j * density)
+                    pygame.draw.rect(screen, (50, 255, 50), pygame.Rect(x_screen, y_screen, density, density), 1)
+        for wall in current_map.nav_mesh_wall_index.query_rect(view):
+            x_screen, y_screen = self.get_screen_position(wall.rect.topleft)
+            pygame.draw.rect(screen, (255, 50, 50), pygame.Rect(x_screen, y_screen, wall.rect.width, wall.rect.height), 2)
 
         path = alien.current_path
         if path:
@@ -205,12 +196,19 @@ class GameRenderer():
         state_surface = font.render(state, True, (0, 0, 0))
         screen.blit(state_surface, (1500, 1040))
 
-        # To be updated
-        # if self.dark_mode:
-        #     # Debug: highlight triangle corners in cyan
-        #     for triangle in player.cast_rays(player.look_orientation, player.fov, current_map):
-        #         for vertex in triangle:  # triangle is (pos, corner1, corner2)
-        #             pygame.draw.circle(screen, (0, 255, 255), (int(vertex[0]), int(vertex[1])), 3)
-
-
-
+        perception = current_map.perception
+        perception_text = f"LOS raycasts: {perception.tick_raycasts} (saved {perception.tick_raycasts_saved}, total saved {perception.raycasts_saved})"
+        perception_surface = font.render(perception_text, True, (0, 0, 0))
+        screen.blit(perception_surface, (1000, 1000))
+
+        path_stats = current_map.nav_mesh.path_cache.stats()
+        path_text = f"Path cache: {path_stats['size']}/{path_stats['capacity']} paths, {path_stats['hits']} hits, {path_stats['splices']} splices, {path_stats['misses']} misses"
+        path_surface = font.render(path_text, True, (0, 0, 0))
+        screen.blit(path_surface, (1000, 1020))
+
+        if view_triangles != None:
+            # Debug: highlight triangle corners in cyan
+            for triangle in view_triangles:
+                for vertex in triangle:  # triangle is (pos, corner1, corner2)
+                    x_screen, y_screen = self.get_screen_position(vertex)
+                    pygame.draw.circle(screen, (0, 255, 255), (int(x_screen), int(y_screen)), 3)
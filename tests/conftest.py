@@ -0,0 +1,26 @@
+import os
+import sys
+import pytest
+
+# --- Path Setup ---
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+project_root = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.append(project_root)
+os.chdir(project_root) # maps are read from maps/<name>
+
+from environment.map import Map
+from reference import load_map
+
+
+@pytest.fixture(scope='session', autouse=True)
+def cache_folder(tmp_path_factory):
+    """The nav mesh and PVS caches the tests build are written to a temporary folder, not to maps/."""
+    folder = Map.cache_folder
+    Map.cache_folder = str(tmp_path_factory.mktemp('caches'))
+    yield Map.cache_folder
+    Map.cache_folder = folder
+
+@pytest.fixture(scope='session')
+def map4(cache_folder):
+    """The smallest shipped map, loaded once: tests must not modify it."""
+    return load_map('map4')
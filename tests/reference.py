@@ -0,0 +1,323 @@
+"""
+Former implementations the tests (and utilities/benchmark.py) compare the current code with,
+and the random inputs they are compared on.
+"""
+
+import os
+import math
+import bisect
+import random as rd
+import numpy as np
+import pygame
+
+from environment.map import Map
+from environment.walls import Wall
+from environment.mesh_loader import generate
+from utilities.mesh import VentMesh
+from utilities.geometry import intersects, angle, angle_entity
+from utilities.landmarks import single_source_distances
+
+
+def load_map(map_name):
+    """Loads a map the same way main.initialize_new_game does."""
+    current_map = Map.open(map_name)
+    current_map.load()
+    return current_map
+
+def fresh_nav_mesh(current_map):
+    """A new nav mesh of the map, that a test can modify without affecting the others."""
+    return generate(current_map.size, current_map.walls, current_map.mesh_density, current_map.edge_tolerance)
+
+def random_queries(mesh, n, seed=0):
+    """Returns n (start, goal) pairs of accessible tiles."""
+    rng = rd.Random(seed)
+    accessible = [node for node, neighbors in mesh.adjacency_map.items() if neighbors]
+    return [(rng.choice(accessible), rng.choice(accessible)) for _ in range(n)]
+
+def target_walk(mesh, start, n_steps, seed=0):
+    """Random walk of a target over the accessible tiles, moving 0 to 2 tiles per step."""
+    rng = rd.Random(seed)
+    walk = [start]
+    for _ in range(n_steps):
+        node = walk[-1]
+        for _ in range(rng.randint(0, 2)):
+            node = rng.choice([neighbor for neighbor, _ in mesh.adjacency_map[node]])
+        walk.append(node)
+    return walk
+
+def path_cost(path):
+    cost = 0
+    for (i1, j1), (i2, j2) in zip(path, path[1:]):
+        cost += ((i1-i2)**2 + (j1-j2)**2)**0.5
+    return cost
+
+def map_inputs(map_name):
+    """
+    Returns the (size, walls, density, edge_tolerance) mesh generation inputs stored in maps/<map_name>,
+    from the saved Map when there is one, else from walls.txt and settings.txt. None if the map is empty.
+    """
+    folder = f'maps/{map_name}'
+    pickle_path = f'{folder}/map.pkl'
+    if os.path.exists(f'{folder}/map.bin') or (os.path.exists(pickle_path) and os.path.getsize(pickle_path) > 0):
+        stored_map = Map.open(map_name)
+        density = getattr(stored_map, 'mesh_density', None) or getattr(stored_map, 'density')
+        return stored_map.size, stored_map.walls, density, stored_map.edge_tolerance
+
+    if os.path.exists(f'{folder}/walls.txt'):
+        settings = {}
+        with open(f'{folder}/settings.txt') as file:
+            for line in file:
+                if ':' in line:
+                    key, value = line.split(':')
+                    settings[key.strip()] = value.strip()
+        size = pygame.image.load(f'{folder}/background.png').get_size()
+        density = int(settings.get('mesh_density', settings.get('density')))
+        edge_tolerance = int(settings['edge_tolerance'])
+        current_map = Map(map_name, size[0], size[1], density, edge_tolerance)
+        current_map.parse_walls()
+        return size, current_map.walls, density, edge_tolerance
+
+    return None
+
+def random_free_point(current_map, rng):
+    while True:
+        point = (rng.uniform(0, current_map.size[0]), rng.uniform(0, current_map.size[1]))
+        if not current_map.point_collidelist(point):
+            return point
+
+def rejection_sample(mesh, x, y, band, rng):
+    """Former Mesh.random_tile: draws any tile until one is accessible and in the band. Returns (point, draws)."""
+    inf, sup = band
+    keys_list = list(mesh.adjacency_map.keys())
+    draws = 0
+    while True:
+        draws += 1
+        i, j = keys_list[rng.randint(0, len(keys_list) - 1)]
+        point = mesh.position(i, j)
+        if inf < ((point[0] - x)**2 + (point[1] - y)**2)**0.5 < sup and mesh.adjacency_map[(i, j)]:
+            return point, draws
+
+def scan_closest(points, point):
+    """Former VentMesh nearest queries: keeps the first strictly closer point of the list."""
+    best, min_dist_sq = None, float('inf')
+    for candidate in points:
+        dist_sq = (candidate[0] - point[0])**2 + (candidate[1] - point[1])**2
+        if dist_sq < min_dist_sq:
+            best, min_dist_sq = candidate, dist_sq
+    return best
+
+def random_vent_network(vents_mesh, n_nodes, rng):
+    """Connected random vent network: every new node is linked to one or two of the nodes already placed."""
+    mesh = VentMesh(vents_mesh.size, vents_mesh.width, vents_mesh.height, vents_mesh.density)
+    adjacency = {}
+    while len(adjacency) < n_nodes:
+        node = (rng.randrange(mesh.width), rng.randrange(mesh.height))
+        if node in adjacency:
+            continue
+        adjacency[node] = []
+        for other in rng.sample(list(adjacency)[:-1], min(len(adjacency) - 1, rng.randint(1, 2))):
+            weight = ((node[0] - other[0])**2 + (node[1] - other[1])**2)**0.5*mesh.density
+            adjacency[node].append((other, weight))
+            adjacency[other].append((node, weight))
+    mesh.adjacency_map = adjacency
+    return mesh
+
+def reference_nav_mesh_walls(current_map):
+    """Map.generate_nav_mesh_walls as it was written before, testing each tile against the wall list."""
+    mesh = current_map.nav_mesh
+    density, eps = mesh.density, mesh.edge_tolerance
+    walls = []
+    for i in range(mesh.width):
+        for j in range(mesh.height):
+            r_inf = pygame.Rect(i*density - eps, j*density - eps, density + 2*eps, density + 2*eps)
+            if r_inf.collidelist(current_map.walls) != -1:
+                walls.append(Wall(i*density, j*density, density, density))
+    return walls
+
+def reference_wall_corners(walls):
+    """Map.init_wall_corners as it was written before, comparing every pair of walls."""
+    wall_corners = {wall: [] for wall in walls}
+    for wall in walls:
+        r = wall.rect
+        wall_corners[wall].extend([r.topleft, r.topright, r.bottomleft, r.bottomright])
+
+    for i, A in enumerate(walls):
+        rA = A.rect
+        for B in walls[i+1:]:
+            rB = B.rect
+            if rA.colliderect(rB):
+                x1, y1 = max(rA.left, rB.left), max(rA.top, rB.top)
+                x2, y2 = min(rA.right, rB.right), min(rA.bottom, rB.bottom)
+                if x1 < x2 and y1 < y2:
+                    for pt in [(x1, y1), (x2, y1), (x1, y2), (x2, y2)]:
+                        if pt not in wall_corners[A]:
+                            wall_corners[A].append(pt)
+                        if pt not in wall_corners[B]:
+                            wall_corners[B].append(pt)
+    return wall_corners
+
+def random_walls(rng, n_walls, map_size, grid=20, max_size=8):
+    """Overlapping walls snapped to a grid, as drawn in the map editor."""
+    return [Wall(rng.randrange(0, map_size//grid)*grid, rng.randrange(0, map_size//grid)*grid,
+                 rng.randrange(1, max_size)*grid, rng.randrange(1, max_size)*grid) for _ in range(n_walls)]
+
+def scan_segment_blocked(walls, p1, p2):
+    """Entity.can_see_point before the wall index (negated): every edge of every wall is tested."""
+    ray = (p1, p2)
+    for wall in walls:
+        A = (wall.rect.left, wall.rect.top)
+        B = (wall.rect.right, wall.rect.top)
+        C = (wall.rect.right, wall.rect.bottom)
+        D = (wall.rect.left, wall.rect.bottom)
+
+        wall_edges = [(A, B), (B, C), (C, D), (D, A)]
+
+        for edge in wall_edges:
+            if intersects(ray, edge):
+                return True
+    return False
+
+def scan_resolve_collision_x(entity, walls, dx):
+    """Entity.resolve_collision_x before the wall index, scanning the whole wall list."""
+    for wall in walls:
+        if wall.rect.colliderect(entity.rect):
+            if dx < 0 and entity.rect.left < wall.rect.right:
+                entity.rect.left = wall.rect.right
+                entity.x_speed = 0
+            if dx > 0 and entity.rect.right > wall.rect.left:
+                entity.rect.right = wall.rect.left
+                entity.x_speed = 0
+
+            entity.x_pos, entity.y_pos = entity.rect.center
+
+def scan_resolve_collision_y(entity, walls, dy):
+    """Entity.resolve_collision_y before the wall index, scanning the whole wall list."""
+    for wall in walls:
+        if wall.rect.colliderect(entity.rect):
+            if dy < 0 and entity.rect.top < wall.rect.bottom:
+                entity.rect.top = wall.rect.bottom
+                entity.y_speed = 0
+
+            if dy > 0 and entity.rect.bottom > wall.rect.top:
+                entity.rect.bottom = wall.rect.top
+                entity.y_speed = 0
+
+            entity.x_pos, entity.y_pos = entity.rect.center
+
+def scan_move(entity, walls, dx, dy):
+    """Entity.move by (dx, dy) with the collisions resolved as before the wall index."""
+    old_x, old_y = entity.x_pos, entity.y_pos
+    entity.x_pos += dx
+    entity.rect.center = (entity.x_pos, entity.y_pos)
+    entity.x_speed = entity.x_pos - old_x
+    scan_resolve_collision_x(entity, walls, entity.x_speed)
+
+    entity.y_pos += dy
+    entity.rect.center = (entity.x_pos, entity.y_pos)
+    entity.y_speed = entity.y_pos - old_y
+    scan_resolve_collision_y(entity, walls, entity.y_speed)
+
+def scan_entity_in_fov(observer, target, walls):
+    """Entity.entity_in_fov before the perception cache: the angle test, then a scan of the walls."""
+    if not observer.is_in_frontstage:
+        return False
+    if not observer.in_fov(angle_entity(observer, target), observer.look_orientation, observer.fov):
+        return False
+    return not scan_segment_blocked(walls, observer.rect.center, target.rect.center)
+
+def march_furthest_point(point, angle, walls, max_steps=10000):
+    """
+    Entity.furthest_point_in_direction before the analytic raycast: marches along the ray 1 px at a time
+    until a point is inside a wall. Gives up (None) after max_steps, the former loop never ended.
+    """
+    x, y = point
+
+    step = 1
+    x += step*math.cos(angle*math.pi/180)
+    y += step*math.sin(angle*math.pi/180)
+
+    if any(wall.rect.collidepoint((x, y)) for wall in walls):
+        return None
+
+    for _ in range(max_steps):
+        if any(wall.rect.collidepoint((x, y)) for wall in walls):
+            return x, y
+        x += step*math.cos(angle*math.pi/180)
+        y += step*math.sin(angle*math.pi/180)
+    return None
+
+def reference_cast_rays(position, orientation, fov, walls, wall_corners):
+    """
+    Entity.cast_rays before the angular sweep: every wall corner in sight adds a ray, the rays
+    grazing a corner are extended with the 1 px march. Returns the triangles (position, point1, point2).
+    """
+    pos = position
+    corner_angles = []
+    triangles_list = []
+
+    pixel_eps = 1e-9
+    angle_eps = 1e-9
+
+    right_limit = (orientation-fov/2)%360
+    left_limit = (orientation+fov/2)%360
+
+    furthest_right = 0, right_limit, march_furthest_point(pos, right_limit, walls) # relative_angle, abs_angle, point
+    bisect.insort_left(corner_angles, furthest_right)
+    furthest_left = (left_limit-right_limit)%360, left_limit, march_furthest_point(pos, left_limit, walls)
+    bisect.insort_left(corner_angles, furthest_left)
+
+    for wall in wall_corners.keys():
+        corners = wall_corners[wall]
+
+        for corner in corners:
+            if not scan_segment_blocked(walls, pos, corner):
+                corner_angle = angle(pos, corner)%360
+                vision_angle = (corner_angle-right_limit)%360, corner_angle, corner
+
+                if not furthest_right[0] <= vision_angle[0] <= furthest_left[0]:
+                    continue
+
+                bisect.insort_left(corner_angles, vision_angle)
+
+                x = corner[0]-pos[0]
+                y = corner[1]-pos[1]
+                norm = math.sqrt(x**2 + y**2)
+                dx_orth, dy_orth = -y/norm*pixel_eps, x/norm*pixel_eps
+
+                ray_collides_right = wall.rect.collidepoint(corner[0]+dx_orth, corner[1]+dy_orth)
+                ray_collides_left = wall.rect.collidepoint(corner[0]-dx_orth, corner[1]-dy_orth)
+
+                if ray_collides_right and not ray_collides_left:
+                    furthest = march_furthest_point(corner, vision_angle[1], walls)
+                    if furthest == None:
+                        continue
+                    furthest_point = (vision_angle[0]-angle_eps)%360, (vision_angle[1]+angle_eps)%360, furthest
+                    bisect.insort_left(corner_angles, furthest_point)
+
+                elif ray_collides_left and not ray_collides_right:
+                    furthest = march_furthest_point(corner, vision_angle[1], walls)
+                    if furthest == None:
+                        continue
+                    furthest_point = (vision_angle[0]+angle_eps)%360, (vision_angle[1]+angle_eps)%360, furthest
+                    bisect.insort_left(corner_angles, furthest_point)
+
+    n = len(corner_angles)
+    for i in range(n-1):
+        triangles_list.append((pos, corner_angles[i][2], corner_angles[(i+1)%n][2]))
+
+    return triangles_list
+
+def edge_cost(mesh, path):
+    """Sum of the weights of the mesh edges joining the consecutive tiles of the path."""
+    return sum(dict(mesh.adjacency_map[a])[b] for a, b in zip(path, path[1:]))
+
+def check_shortest_path(mesh, start, goal, path):
+    """
+    Asserts that the path, ordered goal -> start as the backends return it, is a shortest path from
+    start to goal (Dijkstra), or None if goal cannot be reached.
+    """
+    distance = single_source_distances(mesh.graph, start[0] + mesh.width*start[1])[goal[0] + mesh.width*goal[1]]
+    assert (path == None) == (not np.isfinite(distance)), (start, goal)
+    if path != None:
+        assert path[0] == goal and path[-1] == start, (start, goal)
+        assert abs(edge_cost(mesh, path[::-1]) - distance) <= 1e-3*max(1, distance), (start, goal)
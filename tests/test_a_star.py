@@ -0,0 +1,29 @@
+import random as rd
+
+from environment.walls import Wall
+from environment.mesh_loader import generate
+from utilities.a_star import A_star, ArrayAStar
+from reference import random_queries, edge_cost
+
+
+def check_same_paths(mesh, queries):
+    engine = ArrayAStar(mesh) # reused across the searches, as mesh.search_engine does
+    for start, goal in queries:
+        reference, path = A_star(start, goal, mesh), engine.search(start, goal)
+        assert (path == None) == (reference == None), (start, goal)
+        if path != None:
+            assert path[0] == goal and path[-1] == start
+            # ties are broken on the node id instead of the (i, j) tuple, the cost is the same
+            assert abs(edge_cost(mesh, path) - edge_cost(mesh, reference)) < 1e-9, (start, goal)
+
+def test_array_a_star_matches_a_star(map4):
+    check_same_paths(map4.nav_mesh, random_queries(map4.nav_mesh, 300))
+
+def test_array_a_star_matches_a_star_on_random_maps():
+    rng = rd.Random(0)
+    for _ in range(20):
+        size = rng.randint(100, 400), rng.randint(100, 400)
+        walls = [Wall(rng.randint(0, size[0]), rng.randint(0, size[1]), rng.randint(10, 120), rng.randint(10, 120))
+                 for _ in range(rng.randint(0, 15))]
+        mesh = generate(size, walls, 10, 0)
+        check_same_paths(mesh, random_queries(mesh, 30, seed=rng.randrange(1000)))
@@ -0,0 +1,7 @@
+from reference import random_queries
+
+
+def test_components_tell_which_tiles_a_search_can_join(map4):
+    mesh = map4.nav_mesh
+    for start, goal in random_queries(mesh, 300):
+        assert mesh.reachable(start, goal) == (mesh.search_path(start, goal) != None), (start, goal)
@@ -0,0 +1,23 @@
+from utilities.a_star import A_star
+from utilities.d_star_lite import MovingTargetDStarLite
+from reference import fresh_nav_mesh, random_queries, target_walk, check_shortest_path
+
+
+def test_chase_paths_are_shortest_paths(map4):
+    mesh = fresh_nav_mesh(map4)
+    mesh.path_backend = 'D_STAR_LITE'
+    engine = mesh.search_engine(MovingTargetDStarLite)
+    for seed in range(3):
+        hunter, target = random_queries(mesh, 1, seed=seed)[0]
+        for step, target in enumerate(target_walk(mesh, target, 60, seed=seed)):
+            if step == 30:
+                # a door closes on the way: the edges around the hunter's next tiles get expensive
+                path = mesh.search_path(hunter, target) or []
+                edges = [(a, b, 5*weight) for a in path[-4:-1] for b, weight in mesh.adjacency_map[a]]
+                mesh.set_edge_costs(edges + [(b, a, weight) for a, b, weight in edges])
+            path = mesh.search_path(hunter, target)
+            check_shortest_path(mesh, hunter, target, path)
+            assert (path == None) == (A_star(hunter, target, mesh) == None)
+            if path != None:
+                hunter = path[max(0, len(path) - 2)] # one tile along the path
+    assert engine.resets == 3 # one per chase: the search tree is then reused between refreshes
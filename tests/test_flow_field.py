@@ -0,0 +1,34 @@
+from entities.entity import Entity
+from utilities.flow_field import FlowField, FLOW_FIELD_MIN_CHASERS
+from reference import fresh_nav_mesh, random_queries, check_shortest_path
+
+
+def test_flow_field_paths_are_shortest_paths(map4):
+    mesh = map4.nav_mesh
+    field = FlowField(mesh)
+    for start, goal in random_queries(mesh, 100, seed=4):
+        check_shortest_path(mesh, start, goal, field.search(start, goal))
+
+def path_searches(mesh):
+    """Paths asked to the path cache (and searched on a miss), not read from a flow field."""
+    stats = mesh.path_cache.stats()
+    return stats['hits'] + stats['splices'] + stats['misses']
+
+def test_compute_path_switches_to_the_field_at_the_threshold(map4):
+    mesh = fresh_nav_mesh(map4)
+    tiles = [node for node, neighbors in mesh.adjacency_map.items() if neighbors]
+    goal = mesh.position(tiles[-1])
+    chasers = [Entity(*mesh.position(tile)) for tile in tiles[:FLOW_FIELD_MIN_CHASERS]]
+    field = mesh.search_engine(FlowField)
+
+    for chaser in chasers[:-1]: # one chaser short of the threshold: one search each
+        mesh.compute_path(chaser, goal, chase=True)
+    assert field.updates == 0 and path_searches(mesh) == FLOW_FIELD_MIN_CHASERS - 1
+    mesh.compute_path(chasers[-1], goal, chase=True)
+    mesh.compute_path(chasers[0], goal, chase=True)
+    assert field.updates == 1 and path_searches(mesh) == FLOW_FIELD_MIN_CHASERS - 1 # one field serves them
+
+    mesh.compute_path(chasers[1], goal) # not chasing anymore: below the threshold again
+    assert len(mesh.chase_goals) == FLOW_FIELD_MIN_CHASERS - 1
+    mesh.compute_path(chasers[0], goal, chase=True)
+    assert field.updates == 1 and path_searches(mesh) == FLOW_FIELD_MIN_CHASERS + 1
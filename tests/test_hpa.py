@@ -0,0 +1,50 @@
+import random as rd
+
+from environment.walls import Wall
+from environment.mesh_loader import generate
+from utilities.a_star import A_star
+from utilities.hpa import HPAStar
+from utilities.landmarks import single_source_distances
+from reference import fresh_nav_mesh, random_queries, edge_cost
+
+
+def check_near_shortest_paths(mesh, queries):
+    """
+    HPA* paths are valid tile paths, slightly longer than the shortest ones (see HPAStar): a few
+    percent on average, up to about 1.5 times on small maps where most paths cross an entrance.
+    """
+    engine = HPAStar(mesh)
+    ratios = []
+    for start, goal in queries:
+        path = engine.search(start, goal)
+        assert (path == None) == (A_star(start, goal, mesh) == None), (start, goal)
+        if path != None and path[0] != path[-1]:
+            assert path[0] == goal and path[-1] == start
+            distance = single_source_distances(mesh.graph, start[0] + mesh.width*start[1])[goal[0] + mesh.width*goal[1]]
+            cost = edge_cost(mesh, path[::-1]) # fails if two consecutive tiles are not neighbors
+            assert distance - 1e-3 <= cost <= 1.6*distance, (start, goal)
+            ratios.append(cost/distance)
+    assert sum(ratios)/len(ratios) < 1.05
+
+def test_hpa_paths_on_map4(map4):
+    check_near_shortest_paths(map4.nav_mesh, random_queries(map4.nav_mesh, 300))
+
+def test_hpa_paths_on_random_maps():
+    rng = rd.Random(0)
+    for _ in range(3):
+        walls = [Wall(rng.randint(0, 1200), rng.randint(0, 1200), rng.randint(10, 300), rng.randint(10, 60)) for _ in range(40)]
+        mesh = generate((1200, 1200), walls, 20, 0) # 60x60 tiles, 36 clusters
+        check_near_shortest_paths(mesh, random_queries(mesh, 40, seed=rng.randrange(1000)))
+
+def test_hpa_hierarchy_follows_edited_costs(map4):
+    mesh = fresh_nav_mesh(map4)
+    queries = random_queries(mesh, 50, seed=3)
+    check_near_shortest_paths(mesh, queries)
+    edges = [(a, b, 4*weight) for a, _ in queries for b, weight in mesh.adjacency_map[a]]
+    mesh.set_edge_costs(edges + [(b, a, weight) for a, b, weight in edges])
+    assert mesh.hierarchy == None # rebuilt on the next search
+    for start, goal in queries:
+        path = HPAStar(mesh).search(start, goal)
+        assert (path == None) == (A_star(start, goal, mesh) == None), (start, goal)
+        if path != None:
+            edge_cost(mesh, path[::-1])
@@ -0,0 +1,52 @@
+import random as rd
+
+from environment.walls import Wall
+from environment.mesh_loader import generate
+from utilities.a_star import A_star
+from utilities.jps import JumpPointSearch
+from reference import fresh_nav_mesh, random_queries, check_shortest_path
+
+
+def tiles_between_jump_points(path):
+    """Every tile of a JPS path: consecutive jump points are joined by straight or diagonal lines."""
+    if path == None:
+        return None
+    tiles = [path[0]]
+    for (i1, j1), (i2, j2) in zip(path, path[1:]):
+        steps = max(abs(i2 - i1), abs(j2 - j1))
+        assert abs(i2 - i1) in (0, steps) and abs(j2 - j1) in (0, steps), ((i1, j1), (i2, j2))
+        tiles += [(i1 + (i2 - i1)//steps*k, j1 + (j2 - j1)//steps*k) for k in range(1, steps + 1)]
+    return tiles
+
+def check_jps(mesh, queries):
+    engine = JumpPointSearch(mesh)
+    for start, goal in queries:
+        path = engine.search(start, goal)
+        assert (path == None) == (A_star(start, goal, mesh) == None), (start, goal)
+        check_shortest_path(mesh, start, goal, tiles_between_jump_points(path))
+
+def test_jps_paths_are_shortest_paths(map4):
+    check_jps(map4.nav_mesh, random_queries(map4.nav_mesh, 300))
+
+def test_jps_paths_are_shortest_paths_on_random_maps():
+    rng = rd.Random(0)
+    for _ in range(20):
+        size = rng.randint(100, 400), rng.randint(100, 400)
+        walls = [Wall(rng.randint(0, size[0]), rng.randint(0, size[1]), rng.randint(10, 120), rng.randint(10, 120))
+                 for _ in range(rng.randint(0, 15))]
+        mesh = generate(size, walls, 10, rng.randint(0, 5))
+        check_jps(mesh, random_queries(mesh, 30, seed=rng.randrange(1000)))
+
+def test_jps_falls_back_to_a_star_on_edited_costs(map4):
+    mesh = fresh_nav_mesh(map4)
+    queries = random_queries(mesh, 50, seed=2)
+    edges = [(a, b, 3*weight) for a, _ in queries for b, weight in mesh.adjacency_map[a]]
+    mesh.set_edge_costs(edges + [(b, a, weight) for a, b, weight in edges])
+    engine = JumpPointSearch(mesh)
+    for start, goal in queries:
+        path = engine.search(start, goal)
+        assert (path == None) == (A_star(start, goal, mesh) == None), (start, goal)
+        if path != None:
+            assert path[0] == goal and path[-1] == start
+            edge_path = path[::-1]
+            assert all(any(node == b for node, _ in mesh.adjacency_map[a]) for a, b in zip(edge_path, edge_path[1:]))
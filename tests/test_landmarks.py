@@ -0,0 +1,59 @@
+import random as rd
+import numpy as np
+
+from environment.walls import Wall
+from environment.mesh_loader import generate
+from utilities.a_star import A_star
+from utilities.landmarks import Landmarks, ALTAStar, single_source_distances
+from reference import fresh_nav_mesh, random_queries, check_shortest_path
+
+
+def check_alt(mesh, queries):
+    engine = ALTAStar(mesh)
+    for start, goal in queries:
+        path = engine.search(start, goal)
+        assert (path == None) == (A_star(start, goal, mesh) == None), (start, goal)
+        check_shortest_path(mesh, start, goal, path)
+
+def test_alt_paths_are_shortest_paths(map4):
+    check_alt(map4.nav_mesh, random_queries(map4.nav_mesh, 300))
+
+def test_alt_paths_are_shortest_paths_on_random_maps():
+    rng = rd.Random(0)
+    for _ in range(10):
+        size = rng.randint(200, 600), rng.randint(200, 600)
+        walls = [Wall(rng.randint(0, size[0]), rng.randint(0, size[1]), rng.randint(10, 200), rng.randint(10, 60))
+                 for _ in range(rng.randint(0, 20))]
+        mesh = generate(size, walls, 10, 0)
+        check_alt(mesh, random_queries(mesh, 30, seed=rng.randrange(1000)))
+
+def test_landmark_bound_is_admissible(map4):
+    mesh = map4.nav_mesh
+    landmarks = Landmarks.build(mesh)
+    for _, goal in random_queries(mesh, 20):
+        goal_n = goal[0] + mesh.width*goal[1]
+        distance = single_source_distances(mesh.graph, goal_n)
+        reachable = np.isfinite(distance)
+        assert np.all(landmarks.heuristics(goal_n)[reachable] <= distance[reachable] + 1e-3)
+
+def test_landmarks_save_expansions(map4):
+    mesh = map4.nav_mesh
+    queries = random_queries(mesh, 100, seed=1)
+    expanded = {}
+    for use_landmarks in (True, False):
+        engine = ALTAStar(mesh)
+        engine.use_landmarks = use_landmarks
+        expanded[use_landmarks] = 0
+        for start, goal in queries:
+            engine.search(start, goal)
+            expanded[use_landmarks] += engine.expanded
+    assert expanded[True] < expanded[False]
+
+def test_landmarks_follow_edited_costs(map4):
+    mesh = fresh_nav_mesh(map4)
+    queries = random_queries(mesh, 50, seed=2)
+    check_alt(mesh, queries)
+    edges = [(a, b, 4*weight) for a, _ in queries for b, weight in mesh.adjacency_map[a]]
+    mesh.set_edge_costs(edges + [(b, a, weight) for a, b, weight in edges])
+    assert mesh.landmarks == None # rebuilt on the next search
+    check_alt(mesh, queries)
@@ -0,0 +1,20 @@
+import pickle
+
+from environment.map import Map
+
+
+def test_reloading_skips_every_stage():
+    current_map = Map.open('map4')
+    current_map.load()
+    current_map.load()
+    assert not any(ran for _, ran, _, _, _ in current_map.load_pipeline.report)
+
+def test_maps_pickled_by_older_versions_load(map4):
+    old_map = Map.__new__(Map) # only the attributes of the first pickled maps
+    old_map.__dict__.update(name='map4', size=map4.size, walls=map4.walls, density=map4.mesh_density,
+                            edge_tolerance=map4.edge_tolerance, vents_mesh=map4.vents_mesh)
+    current_map = pickle.loads(pickle.dumps(old_map))
+    current_map.load()
+    assert current_map.mesh_density == map4.mesh_density
+    assert (current_map.player_spawn, current_map.enemy_spawn) == (map4.player_spawn, map4.enemy_spawn) # from settings.txt
+    assert current_map.nav_mesh != None and current_map.perception != None
@@ -0,0 +1,57 @@
+import os
+import numpy as np
+import pytest
+
+from environment.map import Map, nav_mesh_from_sections
+from utilities.map_format import write_map_file, read_map_file
+
+
+def test_sections_round_trip(tmp_path):
+    path = str(tmp_path/'sections.bin')
+    sections = {
+        'json': {'name': 'map', 'size': [3, 4], 'spawn': None},
+        'int32': np.arange(12, dtype=np.int32).reshape(3, 4),
+        'float64': np.linspace(0, 1, 5),
+        'bytes': np.packbits(np.array([True, False, True])),
+        'empty': np.zeros((0, 2), dtype=np.int32),
+    }
+    write_map_file(path, sections)
+    for mmap in (False, True):
+        read = read_map_file(path, mmap=mmap)
+        assert read['json'] == sections['json']
+        for name in ('int32', 'float64', 'bytes', 'empty'):
+            assert read[name].dtype == sections[name].dtype and np.array_equal(read[name], sections[name])
+    assert list(read_map_file(path, names=['int32'])) == ['int32']
+
+def test_rewriting_a_file_keeps_memory_maps_of_it_valid(tmp_path):
+    path = str(tmp_path/'sections.bin')
+    write_map_file(path, {'array': np.arange(1 << 16, dtype=np.int64)})
+    mapped = read_map_file(path, mmap=True)['array']
+    write_map_file(path, {'array': np.zeros(4, dtype=np.int64)})
+    assert np.array_equal(mapped, np.arange(1 << 16))
+    assert np.array_equal(read_map_file(path)['array'], np.zeros(4))
+    assert [p.name for p in tmp_path.iterdir()] == ['sections.bin'] # no temporary file left
+
+@pytest.mark.parametrize('precomputed', [False, True])
+def test_map_round_trip(map4, tmp_path, precomputed):
+    path = str(tmp_path/'map.bin')
+    map4.save(path, precomputed=precomputed)
+    current_map = Map.from_sections('map4', read_map_file(path, mmap=True))
+    current_map.load()
+
+    assert [tuple(wall.rect) for wall in current_map.walls] == [tuple(wall.rect) for wall in map4.walls]
+    assert dict(current_map.vents_mesh.adjacency_map) == dict(map4.vents_mesh.adjacency_map)
+    assert current_map.vents_mesh.exits == map4.vents_mesh.exits
+    assert (current_map.player_spawn, current_map.enemy_spawn) == (map4.player_spawn, map4.enemy_spawn)
+    for name in ('tile_state', 'offsets', 'neighbors', 'weights'):
+        assert np.array_equal(getattr(current_map.nav_mesh.graph, name), getattr(map4.nav_mesh.graph, name))
+    assert np.array_equal(current_map.nav_mesh.component_ids(), map4.nav_mesh.component_ids())
+    assert ('nav_mesh' in read_map_file(path)) == precomputed
+    assert current_map.vents_mesh.routing_table() is current_map.vents_mesh.routes # stored, not rebuilt
+
+@pytest.mark.parametrize('map_name', [name for name in sorted(os.listdir('maps')) if os.path.exists(f'maps/{name}/map.bin')])
+def test_shipped_maps_store_their_nav_mesh(map_name):
+    current_map = Map.open(map_name)
+    current_map.parse_settings()
+    key = current_map.nav_mesh_cache_key(current_map.mesh_density, current_map.edge_tolerance)
+    assert nav_mesh_from_sections(current_map.size, current_map.precomputed, key) != None # not generated on first launch
@@ -0,0 +1,42 @@
+import os
+import random as rd
+import numpy as np
+import pytest
+
+from environment.walls import Wall
+from environment.mesh_loader import generate, generate_reference, merge_rectangles
+from reference import map_inputs
+
+
+def same_graph(mesh1, mesh2):
+    g1, g2 = mesh1.graph, mesh2.graph
+    return ((mesh1.width, mesh1.height) == (mesh2.width, mesh2.height)
+            and all(np.array_equal(getattr(g1, name), getattr(g2, name))
+                    for name in ('tile_state', 'offsets', 'neighbors', 'weights')))
+
+@pytest.mark.parametrize('map_name', sorted(os.listdir('maps')))
+def test_generate_matches_reference_on_shipped_maps(map_name):
+    inputs = map_inputs(map_name)
+    if inputs == None:
+        pytest.skip("no walls stored")
+    assert same_graph(generate_reference(*inputs), generate(*inputs))
+
+def test_generate_matches_reference_on_random_maps():
+    rng = rd.Random(0)
+    for _ in range(50):
+        size = rng.randint(50, 400), rng.randint(50, 400)
+        density = rng.randint(5, 40)
+        edge_tolerance = rng.randint(0, 12)
+        walls = [Wall(rng.randint(-30, size[0]), rng.randint(-30, size[1]), rng.randint(-5, 120), rng.randint(-5, 120))
+                 for _ in range(rng.randint(0, 25))]
+        assert same_graph(generate_reference(size, walls, density, edge_tolerance), generate(size, walls, density, edge_tolerance)), \
+            (size, density, edge_tolerance)
+
+def test_merge_rectangles_covers_each_cell_once():
+    rng = np.random.default_rng(0)
+    for _ in range(100):
+        grid = rng.random((rng.integers(1, 30), rng.integers(1, 30))) < rng.random()
+        count = np.zeros(grid.shape, dtype=np.int32)
+        for i, j, w, h in merge_rectangles(grid):
+            count[j:j + h, i:i + w] += 1
+        assert np.array_equal(count, grid.astype(np.int32))
@@ -0,0 +1,38 @@
+import random as rd
+import pygame
+
+from environment.wall_index import WallIndex
+from entities.entity import Entity
+from utilities.geometry import segment_enters_rect
+from reference import reference_nav_mesh_walls, random_free_point
+
+
+def covered_tiles(walls, density):
+    """Tiles (i, j) covered by the walls, once per wall covering them."""
+    return [(i, j) for wall in walls
+            for i in range(wall.rect.left//density, wall.rect.right//density)
+            for j in range(wall.rect.top//density, wall.rect.bottom//density)]
+
+def test_merged_walls_cover_the_wall_tiles_once(map4):
+    density = map4.nav_mesh.density
+    assert sorted(covered_tiles(map4.nav_mesh_walls, density)) == sorted(covered_tiles(reference_nav_mesh_walls(map4), density))
+
+def test_can_go_to_point_matches_one_wall_per_tile(map4):
+    tile_index = WallIndex(reference_nav_mesh_walls(map4))
+    rng = rd.Random(0)
+    entity = Entity(0, 0)
+    for _ in range(2000):
+        entity.rect.center = random_free_point(map4, rng)
+        point = random_free_point(map4, rng)
+        assert entity.can_go_to_point(point, map4) == (not tile_index.segment_enters(entity.rect.center, point))
+
+def test_segment_enters_rect():
+    rect = pygame.Rect(0, 0, 40, 40)
+    assert segment_enters_rect(((-10, 20), (50, 20)), rect) # through
+    assert segment_enters_rect(((-10, 20), (20, 20)), rect) # ending inside
+    assert segment_enters_rect(((0, 0), (40, 40)), rect) # corner to corner, crossing no edge
+    assert segment_enters_rect(((10, 10), (10, 10)), rect) # a point inside
+    assert not segment_enters_rect(((0, -10), (0, 50)), rect) # along a border
+    assert not segment_enters_rect(((-10, 20), (0, 20)), rect) # ending on a border
+    assert not segment_enters_rect(((-10, 10), (10, -10)), rect) # touching a corner
+    assert not segment_enters_rect(((50, 50), (60, 0)), rect)
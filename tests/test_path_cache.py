@@ -0,0 +1,50 @@
+from utilities.a_star import A_star
+from utilities.path_cache import PathCache
+from reference import fresh_nav_mesh, random_queries, check_shortest_path
+
+
+def test_cached_and_spliced_paths_are_shortest_paths(map4):
+    mesh = fresh_nav_mesh(map4)
+    mesh.path_backend = 'ALT_A_STAR' # optimal, so the parts of its paths are shortest paths too
+    mesh.path_cache = PathCache(capacity=64) # evicting paths along the way
+    for start, goal in random_queries(mesh, 200):
+        path = mesh.find_path(start, goal)
+        assert (path == None) == (A_star(start, goal, mesh) == None)
+        check_shortest_path(mesh, start, goal, path)
+        check_shortest_path(mesh, start, goal, mesh.find_path(start, goal)) # hit
+        if path != None:
+            middle = path[len(path)//2]
+            check_shortest_path(mesh, middle, goal, mesh.find_path(middle, goal)) # splice
+    stats = mesh.path_cache.stats()
+    assert stats['hits'] >= 200 and stats['splices'] > 0 and stats['evictions'] > 0
+
+def test_changed_edge_costs_invalidate_the_cached_paths(map4):
+    mesh = fresh_nav_mesh(map4)
+    mesh.path_backend = 'ALT_A_STAR'
+    for start, goal in random_queries(mesh, 50, seed=1):
+        path = mesh.find_path(start, goal)
+        if path == None or len(path) < 3:
+            continue
+        # make the cached path ten times as expensive, in both directions
+        edges = [(a, b, 10*weight) for a, b in zip(path, path[1:]) for node, weight in mesh.adjacency_map[a] if node == b]
+        mesh.set_edge_costs(edges + [(b, a, weight) for a, b, weight in edges])
+        check_shortest_path(mesh, start, goal, mesh.find_path(start, goal))
+        check_shortest_path(mesh, path[1], goal, mesh.find_path(path[1], goal))
+
+def test_changing_the_backend_clears_the_cache(map4):
+    mesh = fresh_nav_mesh(map4)
+    start, goal = random_queries(mesh, 1)[0]
+    mesh.find_path(start, goal)
+    mesh.path_backend = mesh.path_backend # unchanged: the cache is kept
+    assert mesh.path_cache.get(start, goal)[0]
+    mesh.path_backend = 'HPA_STAR'
+    assert mesh.path_cache.get(start, goal) == (False, None)
+
+def test_an_unreachable_result_stops_splicing_the_former_path():
+    cache = PathCache()
+    cache.put((0, 0), (3, 0), [(3, 0), (2, 0), (1, 0), (0, 0)])
+    assert cache.get((1, 0), (3, 0)) == (True, [(3, 0), (2, 0), (1, 0)])
+    cache.put((0, 0), (3, 0), None)
+    assert cache.get((0, 0), (3, 0)) == (True, None)
+    assert cache.get((1, 0), (3, 0)) == (False, None)
+    assert cache.by_goal == {}
@@ -0,0 +1,49 @@
+import random as rd
+
+from entities.entity import Entity
+from entities.perception import Perception
+from reference import scan_entity_in_fov, random_free_point
+
+
+def random_observer(current_map, rng):
+    entity = Entity(*random_free_point(current_map, rng))
+    entity.look_orientation = rng.uniform(0, 360)
+    entity.fov = rng.choice((60, 90, 360))
+    return entity
+
+def place(entity, point):
+    entity.x_pos, entity.y_pos = point
+    entity.rect.center = point
+
+def test_cached_results_match_the_uncached_check(map4):
+    rng = rd.Random(0)
+    perception = Perception(map4)
+    observers = [random_observer(map4, rng) for _ in range(5)]
+    targets = [Entity(*random_free_point(map4, rng)) for _ in range(3)]
+    for _ in range(200):
+        perception.new_tick()
+        for _ in range(3): # the observers turn and move, the targets move, within the tick
+            for _ in range(2): # asked twice: the second answer comes from the cache
+                for observer in observers:
+                    for target in targets:
+                        assert perception.entity_in_fov(observer, target) == scan_entity_in_fov(observer, target, map4.walls)
+            observer = rng.choice(observers)
+            observer.look_orientation = rng.uniform(0, 360)
+            observer.is_in_frontstage = rng.random() < 0.8
+            place(rng.choice(observers + targets), random_free_point(map4, rng))
+
+def test_raycasts_are_saved_within_a_tick_only(map4):
+    perception = Perception(map4)
+    observer, target = Entity(100, 100), Entity(100, 100)
+    observer.look_orientation, observer.fov = 0, 360
+    place(target, (101, 100))
+
+    perception.entity_in_fov(observer, target)
+    perception.entity_in_fov(observer, target)
+    assert (perception.raycasts, perception.raycasts_saved) == (1, 1)
+    observer.look_orientation = 90 # any change of the inputs is checked again
+    perception.entity_in_fov(observer, target)
+    assert (perception.raycasts, perception.raycasts_saved) == (2, 1)
+    perception.new_tick()
+    perception.entity_in_fov(observer, target)
+    assert (perception.raycasts, perception.raycasts_saved, perception.tick_raycasts) == (3, 1, 1)
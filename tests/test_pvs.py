@@ -0,0 +1,40 @@
+import random as rd
+import numpy as np
+
+from environment.map import Map
+from environment.walls import Wall
+from environment.pvs import PotentiallyVisibleSet
+from entities.entity import Entity
+from reference import random_free_point
+
+
+def test_line_of_sight_through_a_thin_slit():
+    # two rooms split by a wall with a 4 px slit, much narrower than a 40 px tile, away from the tile centers
+    current_map = Map('slit', 400, 200, 40, 0)
+    current_map.walls = [Wall(190, 0, 20, 116), Wall(190, 120, 20, 80)]
+    current_map.load()
+    current_map.pvs = current_map.generate_pvs(current_map.mesh_density, current_map.edge_tolerance) # not used by can_see_point
+
+    rng = rd.Random(0)
+    entity = Entity(0, 0)
+    visible = 0
+    for _ in range(50000):
+        entity.rect.center = (rng.uniform(0, 190), rng.uniform(0, 200))
+        point = (rng.uniform(210, 400), rng.uniform(0, 200))
+        if not current_map.wall_index.segment_blocked(entity.rect.center, point):
+            visible += 1
+            assert entity.can_see_point(point, current_map), (entity.rect.center, point)
+    assert visible > 100
+
+def test_pvs_is_symmetric(map4):
+    pvs = map4.generate_pvs(map4.mesh_density, map4.edge_tolerance)
+    rng = rd.Random(1)
+    for _ in range(2000):
+        p1, p2 = random_free_point(map4, rng), random_free_point(map4, rng)
+        assert pvs.may_see(p1, p2) == pvs.may_see(p2, p1)
+
+def test_pvs_sections_round_trip(map4):
+    pvs = map4.generate_pvs(map4.mesh_density, map4.edge_tolerance)
+    read = PotentiallyVisibleSet.from_sections(pvs.sections('key'), 'key')
+    assert np.array_equal(read.rows, pvs.rows) and np.array_equal(read.bits, pvs.bits)
+    assert PotentiallyVisibleSet.from_sections(pvs.sections('key'), 'other key') == None
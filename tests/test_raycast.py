@@ -0,0 +1,48 @@
+import math
+import random as rd
+import pygame
+
+from entities.entity import Entity
+from environment.walls import Wall
+from environment.wall_index import WallIndex
+from reference import march_furthest_point, random_free_point
+
+
+def test_raycast_hits_where_the_march_stops(map4):
+    rng = rd.Random(0)
+    rays = 0
+    while rays < 300:
+        point = random_free_point(map4, rng)
+        if map4.wall_index.query_rect(pygame.Rect(point[0] - 2, point[1] - 2, 5, 5)):
+            continue # the march steps 1 px before testing, it misses walls closer than that
+        rays += 1
+        angle = rng.uniform(0, 360)
+        direction = (math.cos(angle*math.pi/180), math.sin(angle*math.pi/180))
+        hit = Entity.furthest_point_in_direction(point, angle, map4)
+        marched = march_furthest_point(point, angle, map4.walls)
+        assert (hit == None) == (marched == None), (point, angle)
+        if hit == None:
+            continue
+        before = (hit[0] - 1e-6*direction[0], hit[1] - 1e-6*direction[1])
+        assert not map4.wall_index.segment_enters(point, before) # nothing is entered before the hit
+        distance, marched_distance = math.dist(point, hit), math.dist(point, marched)
+        assert distance <= marched_distance
+        if marched_distance >= distance + 2:
+            # the march stepped over a corner: the ray only clips the wall it hits
+            _, wall = map4.wall_index.raycast(point, direction)
+            t_enter, t_exit = WallIndex.ray_rect_intersection(point, direction, wall.rect)
+            assert t_exit - t_enter < 1.5, (point, angle)
+        # otherwise the march overshoots by less than a step, and pygame rects exclude their right and bottom sides
+
+def test_raycast_returns_the_first_wall_entered():
+    walls = [Wall(100, 0, 10, 200), Wall(150, 0, 10, 200), Wall(0, 300, 400, 10)]
+    wall_index = WallIndex(walls)
+    t, wall = wall_index.raycast((50, 100), (1, 0))
+    assert t == 50 and wall is walls[0]
+    t, wall = wall_index.raycast((130, 100), (-1, 0))
+    assert t == 20 and wall is walls[0]
+    assert wall_index.raycast((130, 100), (0, -1)) == None
+    t, wall = wall_index.raycast((130, 100), (0, 1))
+    assert t == 200 and wall is walls[2]
+    t, _ = wall_index.raycast((105, 100), (1, 0))
+    assert t <= 0 # starts inside
@@ -0,0 +1,17 @@
+from entities.entity import Entity
+from reference import random_queries
+
+
+def test_pulled_paths_are_clear_of_the_nav_mesh_walls(map4):
+    mesh = map4.nav_mesh
+    wall_index = map4.nav_mesh_wall_index
+    entity = Entity(0, 0)
+    for start, goal in random_queries(mesh, 300):
+        entity.x_pos, entity.y_pos = mesh.position(start)
+        _, path = mesh.compute_path(entity, mesh.position(goal))
+        if path == None:
+            continue
+        assert path[0] == mesh.position(goal) and path[-1] == (entity.x_pos, entity.y_pos)
+        assert len(path) <= len(mesh.find_path(start, goal))
+        for p, q in zip(path, path[1:]):
+            assert not wall_index.segment_blocked(p, q), (p, q)
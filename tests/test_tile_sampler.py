@@ -0,0 +1,16 @@
+from utilities.tile_sampler import TileSampler
+from reference import random_queries
+
+
+def test_sampler_draws_from_the_tiles_of_the_band(map4):
+    mesh = map4.nav_mesh
+    sampler = TileSampler(mesh)
+    for band in ((50, 250), (40, 250), (500, 1e9)):
+        for start, _ in random_queries(mesh, 50):
+            x, y = mesh.position(start)
+            expected = {mesh.position(node) for node, neighbors in mesh.adjacency_map.items()
+                        if neighbors and band[0] < ((mesh.position(node)[0] - x)**2 + (mesh.position(node)[1] - y)**2)**0.5 < band[1]}
+            found = {(int(sampler.x[k]), int(sampler.y[k])) for k in sampler.in_band(x, y, band)}
+            assert found == expected
+            if expected:
+                assert sampler.sample(x, y, band) in expected
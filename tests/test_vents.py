@@ -0,0 +1,50 @@
+import pickle
+import random as rd
+import numpy as np
+
+from utilities.mesh import VentMesh
+from utilities.vent_index import KDTree
+from utilities.landmarks import single_source_distances
+from reference import scan_closest, random_vent_network
+
+
+def test_kd_tree_matches_a_scan():
+    rng = rd.Random(0)
+    for n_points in (0, 1, 10, 47, 48, 200):
+        points = [(rng.randrange(30), rng.randrange(30)) for _ in range(n_points)] # with duplicates and ties
+        tree = KDTree(points)
+        for _ in range(200):
+            point = (rng.uniform(-5, 35), rng.uniform(-5, 35))
+            k = rng.choice((1, 3, 10))
+            distances = [((px - point[0])**2 + (py - point[1])**2, index) for index, (px, py) in enumerate(points)]
+            assert tree.k_nearest(point, k) == [index for _, index in sorted(distances)[:k]]
+
+def test_closest_vent_node_and_exit_match_a_scan(map4):
+    rng = rd.Random(0)
+    vents_mesh = map4.vents_mesh
+    for n_nodes in (20, 200):
+        mesh = VentMesh(vents_mesh.size, vents_mesh.width, vents_mesh.height, vents_mesh.density)
+        nodes = sorted({(rng.randrange(mesh.width), rng.randrange(mesh.height)) for _ in range(n_nodes)})
+        mesh.adjacency_map = {node: [] for node in nodes}
+        mesh.exits = rng.sample(nodes, max(1, len(nodes)//5))
+        nodes = list(mesh.adjacency_map.keys())
+        exits = [mesh.position(exit_point) for exit_point in mesh.exits]
+        for _ in range(300):
+            tile = (rng.randrange(mesh.width), rng.randrange(mesh.height))
+            position = (rng.uniform(0, mesh.size[0]), rng.uniform(0, mesh.size[1]))
+            assert mesh.get_closest_vent_node(tile) == scan_closest(nodes, tile)
+            assert mesh.get_closest_vent_access(position) == scan_closest(exits, position)
+
+def test_vent_routes_are_shortest_paths(map4):
+    rng = rd.Random(0)
+    for mesh in (map4.vents_mesh, random_vent_network(map4.vents_mesh, 50, rng)):
+        routes = pickle.loads(pickle.dumps(mesh.routing_table()))
+        nodes = list(mesh.adjacency_map.keys())
+        for _ in range(100):
+            start, goal = rng.choice(nodes), rng.choice(nodes)
+            path = routes.path(start, goal, mesh.width)
+            distance = single_source_distances(mesh.graph, start[0] + mesh.width*start[1])[goal[0] + mesh.width*goal[1]]
+            assert (path == None) == (not np.isfinite(distance))
+            if path != None:
+                cost = sum(weight for a, b in zip(path[::-1], path[-2::-1]) for node, weight in mesh.adjacency_map[a] if node == b)
+                assert abs(cost - distance) <= 1e-3*max(1, distance)
@@ -0,0 +1,27 @@
+import math
+import random as rd
+
+from utilities.visibility import visibility_polygon
+from reference import reference_cast_rays, reference_wall_corners, random_free_point
+
+
+def fan_area(triangles):
+    return sum(abs((b[0] - a[0])*(c[1] - a[1]) - (c[0] - a[0])*(b[1] - a[1]))/2 for a, b, c in triangles)
+
+def test_sweep_sees_what_the_corner_rays_saw(map4):
+    rng = rd.Random(0)
+    wall_corners = reference_wall_corners(map4.walls)
+    views = 0
+    while views < 200:
+        position, orientation, fov = random_free_point(map4, rng), rng.uniform(0, 360), rng.choice((60, 90, 120))
+        reference = reference_cast_rays(position, orientation, fov, map4.walls, wall_corners)
+        if any(None in triangle for triangle in reference):
+            continue # a ray of the former version started inside a wall
+        views += 1
+        triangles = visibility_polygon(position, orientation, fov, map4.visibility_segments)
+        assert all(triangle[0] == position for triangle in triangles)
+
+        # the 1 px march of the former rays stopped up to 2 px inside the walls
+        area, reference_area = fan_area(triangles), fan_area(reference)
+        outline = sum(math.dist(p1, p2) + math.dist(position, p1) for _, p1, p2 in triangles)
+        assert area <= reference_area*(1 + 1e-6) and reference_area - area <= 2*outline, (position, orientation, fov)
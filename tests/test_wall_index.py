@@ -0,0 +1,50 @@
+import random as rd
+import pygame
+
+from environment.wall_index import WallIndex
+from entities.entity import Entity
+from reference import scan_segment_blocked, scan_move, random_free_point, random_walls
+
+
+class WallsMap():
+    """The attributes of Map the wall queries of an entity use."""
+    def __init__(self, walls):
+        self.walls = walls
+        self.wall_index = WallIndex(walls)
+
+def test_queries_match_a_scan_of_the_walls(map4):
+    rng = rd.Random(0)
+    for walls in (map4.walls, random_walls(rng, 300, 2000)):
+        wall_index = WallIndex(walls)
+        for _ in range(1000):
+            p1 = (rng.uniform(-50, 2050), rng.uniform(-50, 2050))
+            p2 = (rng.uniform(-50, 2050), rng.uniform(-50, 2050))
+            assert wall_index.segment_blocked(p1, p2) == scan_segment_blocked(walls, p1, p2), (p1, p2)
+            assert wall_index.point_collides(p1) == any(wall.rect.collidepoint(p1) for wall in walls), p1
+            rect = pygame.Rect(p1, (rng.randint(0, 200), rng.randint(0, 200)))
+            assert wall_index.query_rect(rect) == [wall for wall in walls if wall.rect.colliderect(rect)], rect
+
+def test_can_see_point_matches_a_scan(map4):
+    rng = rd.Random(1)
+    entity = Entity(0, 0)
+    for _ in range(1000):
+        entity.rect.center = random_free_point(map4, rng)
+        point = random_free_point(map4, rng)
+        assert entity.can_see_point(point, map4) == (not scan_segment_blocked(map4.walls, entity.rect.center, point))
+
+def test_collisions_match_a_scan():
+    rng = rd.Random(2)
+    current_map = WallsMap(random_walls(rng, 300, 2000))
+    moves = 0
+    while moves < 2000:
+        rect = pygame.Rect(0, 0, rng.randint(10, 60), rng.randint(10, 60))
+        rect.center = rng.uniform(0, 2000), rng.uniform(0, 2000)
+        if current_map.wall_index.query_rect(rect):
+            continue # entities only move from free positions
+        moves += 1
+        dx, dy = rng.uniform(-5, 5), rng.uniform(-5, 5)
+        entity, reference = Entity(*rect.center), Entity(*rect.center)
+        entity.rect, reference.rect = rect.copy(), rect.copy()
+        entity.move(dx, dy, 1, entity.x_pos, entity.y_pos, current_map, 1) # moves by (dx, dy) at speed 1
+        scan_move(reference, current_map.walls, dx, dy)
+        assert entity.rect == reference.rect and (entity.x_speed, entity.y_speed) == (reference.x_speed, reference.y_speed)
@@ -0,0 +1,35 @@
+import random as rd
+
+from environment.map import Map
+from environment.wall_index import WallIndex
+from utilities.visibility import build_segments, outline_segments, visibility_polygon
+from reference import reference_wall_corners, random_walls
+
+
+def fan_area(triangles):
+    return sum(abs((b[0] - a[0])*(c[1] - a[1]) - (c[0] - a[0])*(b[1] - a[1]))/2 for a, b, c in triangles)
+
+def test_wall_corners_match_the_pairwise_reference():
+    current_map = Map.open('map4')
+    rng = rd.Random(0)
+    for walls in (current_map.walls, random_walls(rng, 500, 4000)):
+        current_map.walls = walls
+        assert current_map.init_wall_corners() == reference_wall_corners(walls)
+
+def test_outline_hides_what_every_wall_edge_hides():
+    rng = rd.Random(0)
+    walls = random_walls(rng, 300, 3000)
+    wall_index = WallIndex(walls)
+    segments = build_segments(walls, wall_index)
+    outline = outline_segments(walls, wall_index)
+    assert len(outline) < len(segments)
+    views = 0
+    while views < 50:
+        point = (rng.uniform(0, 3000), rng.uniform(0, 3000))
+        if wall_index.point_collides(point):
+            continue
+        views += 1
+        orientation = rng.uniform(0, 360)
+        area = fan_area(visibility_polygon(point, orientation, 90, segments))
+        outline_area = fan_area(visibility_polygon(point, orientation, 90, outline))
+        assert abs(area - outline_area) <= 1e-9*max(area, 1)
@@ -61,4 +61,86 @@ def A_star(start, goal, mesh):
                 if g_score[(i, j)] < inf:
                     heapq.heappush(open_set, (f_score[(i, j)], (i, j)))
 
-    return None
\ No newline at end of file
+    return None
+
+class ArrayAStar():
+    """
+    A* over integer node ids n = i + width*j instead of (i, j) tuples.
+
+    The score and parent arrays are allocated once for the whole mesh and reused
+    across searches: every entry carries the generation in which it was written,
+    so starting a new search only increments a counter instead of re-initialising
+    width*height entries.
+    """
+    def __init__(self, mesh):
+        self.mesh = mesh
+        self.width = mesh.width
+        self.density = mesh.density
+
+        size = mesh.width*mesh.height
+        self.g_score = [inf]*size
+        self.came_from = [-1]*size
+        self.seen = [0]*size # generation in which g_score/came_from were last written
+        self.closed = [0]*size # generation in which the node was expanded
+        self.generation = 0
+
+        self.expanded = 0 # nodes expanded during the last search
+
+    def reconstruct_path(self, current):
+        width = self.width
+        came_from = self.came_from
+        total_path = [index_to_coordinate(current, width)]
+        while came_from[current] != -1:
+            current = came_from[current]
+            total_path.append(index_to_coordinate(current, width))
+        return total_path
+
+    def search(self, start, goal):
+        """
+        Same contract as A_star: returns the list of (i, j) nodes from goal to start, or None.
+        """
+        self.generation += 1
+        generation = self.generation
+        width, density = self.width, self.density
+        g_score, came_from, seen, closed = self.g_score, self.came_from, self.seen, self.closed
+        offsets, neighbors, weights = self.mesh.graph.lists()
+
+        start_n = coordinate_to_index(start[0], start[1], width)
+        goal_n = coordinate_to_index(goal[0], goal[1], width)
+        goal_i, goal_j = goal
+
+        g_score[start_n] = 0
+        came_from[start_n] = -1
+        seen[start_n] = generation
+
+        open_set = [(math.hypot(start[0]-goal_i, start[1]-goal_j)*density, start_n)]
+        self.expanded = 0
+
+        while open_set:
+            _, current = heapq.heappop(open_set)
+            if current == goal_n:
+                return self.reconstruct_path(current)
+
+            if closed[current] == generation:
+                continue
+            closed[current] = generation
+            self.expanded += 1
+
+            current_g = g_score[current]
+            for k in range(offsets[current], offsets[current+1]):
+                neighbor = neighbors[k]
+                tentative_g_score = current_g + weights[k]
+                if seen[neighbor] != generation or tentative_g_score < g_score[neighbor]:
+                    seen[neighbor] = generation
+                    came_from[neighbor] = current
+                    g_score[neighbor] = tentative_g_score
+                    i, j = neighbor%width, neighbor//width
+                    f = tentative_g_score + math.hypot(i-goal_i, j-goal_j)*density
+                    heapq.heappush(open_set, (f, neighbor))
+
+        return None
+
+
+def array_A_star(start, goal, mesh):
+    return mesh.search_engine(ArrayAStar).search(start, goal)
+
@@ -0,0 +1,642 @@
+"""
+BENCHMARKS
+Compares the pathfinding backends on a shipped map (on random queries, on
+a long chase and on long queries over a map grown ten times) and in an open
+room, and times the landmark heuristic, the flow field shared by several
+hunters, the path cache, the string-pulled paths, the random tile sampler,
+the connected components, the vent KD-trees and routing table, the potentially
+visible set, the binary map format, the stages of the map loading, the wall
+corners and outline, the merged nav mesh walls and the mesh generation against
+what they replaced (kept in tests/reference.py). Their correctness is checked by
+the tests (tests/).
+
+Usage (from the project root):
+    python utilities/benchmark.py <benchmark> [map_name]
+"""
+
+import os
+import sys
+import time
+import random as rd
+import numpy as np
+
+# --- Path Setup ---
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.join(current_dir, '..')
+sys.path.append(project_root)
+
+from environment.map import Map
+from environment.walls import Wall
+from environment.mesh_loader import generate, generate_reference
+from environment.wall_index import WallIndex
+from utilities.mesh import Mesh, VentMesh
+from utilities.map_format import read_map_file
+from utilities.a_star import ArrayAStar
+from utilities.d_star_lite import MovingTargetDStarLite
+from utilities.jps import JumpPointSearch
+from utilities.hpa import ClusterHierarchy, HPAStar
+from utilities.landmarks import Landmarks, ALTAStar
+from utilities.flow_field import FlowField, FLOW_FIELD_MIN_CHASERS
+from utilities.string_pulling import StringPuller
+from utilities.tile_sampler import TileSampler
+from utilities.visibility import build_segments, outline_segments, visibility_polygon
+from entities.entity import Entity
+from tests.reference import (load_map, random_queries, target_walk, path_cost, map_inputs, random_free_point, random_walls,
+                             random_vent_network, rejection_sample, scan_closest, reference_nav_mesh_walls, reference_wall_corners)
+
+# backends whose paths are shortest paths (the A* backends scale their heuristic to pixels and search greedily)
+OPTIMAL_BACKENDS = {'D_STAR_LITE', 'JPS', 'ALT_A_STAR', 'FLOW_FIELD'}
+
+# backends counting their expansions
+SEARCH_ENGINES = {'ARRAY_A_STAR': ArrayAStar, 'D_STAR_LITE': MovingTargetDStarLite, 'JPS': JumpPointSearch, 'HPA_STAR': HPAStar, 'ALT_A_STAR': ALTAStar, 'FLOW_FIELD': FlowField}
+
+
+def time_backend(mesh, backend, queries):
+    """Returns the time taken by the queries, the paths found and the total number of expanded nodes (None if not counted)."""
+    mesh.path_backend = backend
+    engine = mesh.search_engine(SEARCH_ENGINES[backend]) if backend in SEARCH_ENGINES else None
+    paths = []
+    expanded = 0
+    start_time = time.perf_counter()
+    for start, goal in queries:
+        paths.append(mesh.search_path(start, goal))
+        if engine != None:
+            expanded += engine.expanded
+    elapsed = time.perf_counter() - start_time
+    return elapsed, paths, (expanded if engine != None else None)
+
+def compare_backends_on_mesh(name, mesh, backends, n_queries):
+    queries = random_queries(mesh, n_queries)
+
+    print(f"{name}: {mesh.width}x{mesh.height} tiles, {n_queries} queries")
+    reference = None
+    for backend in backends:
+        elapsed, paths, expanded = time_backend(mesh, backend, queries)
+        costs = [path_cost(path) if path != None else None for path in paths]
+        found = [cost for cost in costs if cost != None]
+        expansions = f"{expanded/n_queries:8.1f}" if expanded != None else "       -"
+        print(f"  {backend:<16} {elapsed*1000/n_queries:8.3f} ms/query, {expansions} expansions/query, "
+              f"mean path cost {sum(found)/max(1, len(found)):.1f}")
+        if reference == None:
+            reference = costs
+        elif any((a == None) != (b == None) for a, b in zip(reference, costs)):
+            print(f"  /!\\ {backend} disagrees with {backends[0]} on reachability")
+    mesh.path_backend = Mesh.default_path_backend
+
+def compare_backends(map_name='map5', backends=('A_STAR', 'ARRAY_A_STAR', 'JPS'), n_queries=200):
+    current_map = load_map(map_name)
+    compare_backends_on_mesh(map_name, current_map.nav_mesh, backends, n_queries)
+
+def compare_backends_open_room(size=1500, density=20, backends=('A_STAR', 'ARRAY_A_STAR', 'JPS'), n_queries=200):
+    """Same comparison on a mesh without any wall, the best case for JPS."""
+    size = int(size)
+    mesh = generate((size, size), [], density, 0)
+    compare_backends_on_mesh(f"open room {size}x{size} px", mesh, backends, n_queries)
+
+def long_queries(mesh, n, min_distance, seed=0):
+    """Returns n (start, goal) pairs of accessible tiles at least min_distance tiles apart on both axes combined."""
+    queries = []
+    for start, goal in random_queries(mesh, 20*n, seed):
+        if abs(start[0] - goal[0]) + abs(start[1] - goal[1]) >= min_distance:
+            queries.append((start, goal))
+            if len(queries) == n:
+                break
+    return queries
+
+def tiled_map_inputs(map_name, repeat):
+    """
+    Mesh generation inputs of map_name copied repeat x repeat times, to get a much larger station.
+    The walls framing the map are only kept around the whole, so that the copies open onto each other.
+    """
+    (width, height), walls, density, edge_tolerance = map_inputs(map_name)
+    inner_walls = [wall for wall in walls if wall.rect.width < width and wall.rect.height < height]
+    frame_walls = [wall for wall in walls if wall.rect.width >= width or wall.rect.height >= height]
+
+    tiled_walls = [Wall(wall.rect.x + width*x, wall.rect.y + height*y, wall.rect.width, wall.rect.height)
+                   for x in range(repeat) for y in range(repeat) for wall in inner_walls]
+    for wall in frame_walls:
+        r = wall.rect
+        spans_width, spans_height = r.width >= width, r.height >= height
+        x = r.x + width*(repeat - 1)*(not spans_width and r.centerx > width//2)
+        y = r.y + height*(repeat - 1)*(not spans_height and r.centery > height//2)
+        tiled_walls.append(Wall(x, y, r.width + width*(repeat - 1)*spans_width, r.height + height*(repeat - 1)*spans_height))
+    return (width*repeat, height*repeat), tiled_walls, density, edge_tolerance
+
+def compare_hpa(map_name='map5', repeat=10, n_queries=50, backends=('ARRAY_A_STAR', 'JPS', 'HPA_STAR')):
+    """
+    Times the construction of the cluster hierarchy and long queries (across at least half the map)
+    on map_name and on a copy of its walls repeated repeat x repeat times.
+    """
+    for repeat in (1, int(repeat)):
+        size, walls, density, edge_tolerance = tiled_map_inputs(map_name, repeat)
+        mesh = generate(size, walls, density, edge_tolerance)
+        start_time = time.perf_counter()
+        mesh.hierarchy = ClusterHierarchy.build(mesh)
+        build_time = time.perf_counter() - start_time
+
+        hierarchy = mesh.hierarchy
+        print(f"{map_name} x{repeat*repeat}: {mesh.width}x{mesh.height} tiles, hierarchy of {len(hierarchy.node_list)} nodes "
+              f"and {len(hierarchy.neighbors)} edges ({hierarchy.nbytes()/1024:.0f} KiB) built in {build_time:.2f} s")
+        queries = long_queries(mesh, n_queries, (mesh.width + mesh.height)//2)
+        reference = None
+        for backend in backends:
+            elapsed, paths, expanded = time_backend(mesh, backend, queries)
+            costs = [path_cost(path) for path in paths if path != None]
+            print(f"  {backend:<16} {elapsed*1000/len(queries):9.3f} ms/query, {expanded/len(queries):9.1f} expansions/query, "
+                  f"mean path cost {sum(costs)/max(1, len(costs)):.1f}{'' if backend in OPTIMAL_BACKENDS else ' (not optimal)'}")
+
+def compare_alt(map_name='map5', n_queries=200):
+    """
+    Node expansions of the optimal A* with the straight line heuristic alone and with the landmark
+    bound, on the same queries; the greedy ARRAY_A_STAR is shown for reference.
+    """
+    current_map = load_map(map_name)
+    mesh = current_map.nav_mesh
+    start_time = time.perf_counter()
+    mesh.landmarks = Landmarks.build(mesh)
+    build_time = time.perf_counter() - start_time
+    print(f"{map_name}: {len(mesh.landmarks.landmarks)} landmarks ({mesh.landmarks.nbytes()/1024:.0f} KiB) built in {build_time*1000:.0f} ms")
+
+    queries = random_queries(mesh, n_queries)
+    engine = mesh.search_engine(ALTAStar)
+    expansions = {}
+    for name, use_landmarks in (('straight line', False), ('landmarks', True)):
+        engine.use_landmarks = use_landmarks
+        elapsed, paths, expanded = time_backend(mesh, 'ALT_A_STAR', queries)
+        expansions[name] = expanded
+        costs = [path_cost(path) for path in paths if path != None]
+        print(f"  A* {name:<13} {elapsed*1000/n_queries:8.3f} ms/query, {expanded/n_queries:8.1f} expansions/query, "
+              f"mean path cost {sum(costs)/max(1, len(costs)):.2f}")
+    del engine.use_landmarks
+
+    elapsed, paths, expanded = time_backend(mesh, 'ARRAY_A_STAR', queries)
+    costs = [path_cost(path) for path in paths if path != None]
+    print(f"  ARRAY_A_STAR     {elapsed*1000/n_queries:8.3f} ms/query, {expanded/n_queries:8.1f} expansions/query, "
+          f"mean path cost {sum(costs)/max(1, len(costs)):.2f} (not optimal)")
+    print(f"  landmarks expand {1 - expansions['landmarks']/expansions['straight line']:.0%} fewer nodes than the straight line heuristic")
+    mesh.path_backend = Mesh.default_path_backend
+
+def compare_chase(map_name='map5', backends=('A_STAR', 'ARRAY_A_STAR', 'D_STAR_LITE'), n_refreshes=300, hunter_speed=1):
+    """
+    Replays a long chase: at every path refresh the target has moved a little and the hunter
+    has walked hunter_speed tiles along its previous path, then the path is recomputed.
+    Reports the cost of one refresh for every backend, and for D* Lite also without reusing its search.
+    D* Lite is slower per refresh than ARRAY_A_STAR, only cheaper than an optimal search restarted from
+    scratch: it pays for optimal (shorter) paths.
+    """
+    current_map = load_map(map_name)
+    mesh = current_map.nav_mesh
+    hunter_start, target_start = max(random_queries(mesh, 50, seed=1), key=lambda query: path_cost(mesh.search_path(*query) or []))
+    walk = target_walk(mesh, target_start, n_refreshes)
+
+    print(f"{map_name}: chase of {n_refreshes} refreshes, hunter moving {hunter_speed} tiles per refresh")
+    runs = [(backend, True) for backend in backends]
+    if 'D_STAR_LITE' in backends:
+        runs.append(('D_STAR_LITE', False)) # same search, restarted from scratch at every refresh
+    for backend, reuse in runs:
+        mesh.path_backend = backend
+        engine = mesh.search_engine(SEARCH_ENGINES[backend]) if backend in SEARCH_ENGINES else None
+        hunter, elapsed, expanded, length, refreshes = hunter_start, 0, 0, 0, 0
+        for target in walk:
+            if hunter == target:
+                break
+            start_time = time.perf_counter()
+            if not reuse:
+                engine.reset(engine.start)
+            path = mesh.search_path(hunter, target)
+            elapsed += time.perf_counter() - start_time
+            refreshes += 1
+            expanded += engine.expanded if engine != None else 0
+            length += path_cost(path)
+            hunter = path[max(0, len(path) - 1 - hunter_speed)]
+        expansions = f"{expanded/refreshes:8.1f}" if engine != None else "       -"
+        name = backend if reuse else backend + ' (no reuse)'
+        print(f"  {name:<24} {elapsed*1000/refreshes:8.3f} ms/refresh, {expansions} expansions/refresh, "
+              f"{refreshes} refreshes, mean path cost {length/refreshes:.1f}{'' if backend in OPTIMAL_BACKENDS else ' (not optimal)'}")
+    mesh.path_backend = Mesh.default_path_backend
+
+def compare_generate(map_name=None):
+    """Times generate() against generate_reference() on every shipped map (or only map_name)."""
+    map_names = [map_name] if map_name else sorted(os.listdir('maps'))
+    for name in map_names:
+        inputs = map_inputs(name)
+        if inputs == None:
+            print(f"{name}: no walls stored, skipped")
+            continue
+
+        start_time = time.perf_counter()
+        reference = generate_reference(*inputs)
+        reference_time = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        mesh = generate(*inputs)
+        vectorized_time = time.perf_counter() - start_time
+        print(f"{name}: {mesh.width}x{mesh.height} tiles, reference {reference_time*1000:.1f} ms, vectorized {vectorized_time*1000:.1f} ms")
+
+def compare_pvs(map_name='map5', n_pairs=20000):
+    """
+    Times a PVS lookup against the raycast it would save on random pairs of points outside the walls,
+    and reports how many pairs the PVS rejects and how many of them are in fact visible.
+    """
+    current_map = load_map(map_name)
+    pvs, wall_index = current_map.generate_pvs(current_map.mesh_density, current_map.edge_tolerance), current_map.wall_index
+    rng = rd.Random(0)
+    pairs = [(random_free_point(current_map, rng), random_free_point(current_map, rng)) for _ in range(n_pairs)]
+
+    start_time = time.perf_counter()
+    may_see = [pvs.may_see(p1, p2) for p1, p2 in pairs]
+    pvs_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    line_of_sight = [not wall_index.segment_blocked(p1, p2) for p1, p2 in pairs]
+    raycast_time = time.perf_counter() - start_time
+
+    rejected = may_see.count(False)
+    wrongly_rejected = sum(1 for may, visible in zip(may_see, line_of_sight) if visible and not may)
+    print(f"{map_name}: PVS {pvs.bits.nbytes/1024:.0f} KiB, {n_pairs} pairs, {rejected/n_pairs:.1%} rejected in O(1) "
+          f"({line_of_sight.count(False)/n_pairs:.1%} without line of sight, {wrongly_rejected} visible pairs rejected)")
+    print(f"  lookup {pvs_time*1e6/n_pairs:.2f} us/pair, raycast {raycast_time*1e6/n_pairs:.2f} us/pair")
+
+def compare_path_cache(map_name='map5', n_chases=200, chase_length=30, cache_size=None):
+    """
+    Replays chases: the chaser recomputes its path to the target after every couple of
+    steps along it, while the target sometimes moves to a neighboring tile. Reports the
+    cache statistics and the time spent with and without the cache.
+    """
+    current_map = load_map(map_name)
+    mesh = current_map.nav_mesh
+    if cache_size != None:
+        mesh.path_cache.capacity = int(cache_size)
+    rng = rd.Random(0)
+
+    queries = []
+    for start, goal in random_queries(mesh, n_chases):
+        path = mesh.search_path(start, goal)
+        if path == None:
+            continue
+        for _ in range(chase_length):
+            if len(path) < 3:
+                break
+            path = path[:-2] # the chaser moved two tiles along its path
+            if rng.random() < 0.3: # the target moved to a neighboring tile
+                goal = rng.choice([node for node, _ in mesh.adjacency_map[goal]])
+                path = mesh.search_path(path[-1], goal)
+            queries.append((path[-1], goal))
+
+    mesh.path_cache.clear()
+    start_time = time.perf_counter()
+    for start, goal in queries:
+        mesh.find_path(start, goal)
+    cached_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    for start, goal in queries:
+        mesh.search_path(start, goal)
+    uncached_time = time.perf_counter() - start_time
+
+    stats = mesh.path_cache.stats()
+    print(f"{map_name}: {len(queries)} path requests, cache of {stats['capacity']} paths")
+    print(f"  {stats['hits']} hits, {stats['splices']} splices, {stats['misses']} misses, "
+          f"{stats['evictions']} evictions, hit rate {stats['hit_rate']:.1%}")
+    print(f"  with cache {cached_time*1000:.1f} ms, without {uncached_time*1000:.1f} ms")
+
+def compare_flow_field(map_name='map5', hunter_counts=(1, 4, 8, 12, 16), n_ticks=300, backend='ARRAY_A_STAR'):
+    """
+    Several hunters chase one target: at every tick the target may have moved and every hunter
+    asks for its path to it, either with its own search or from the shared flow field.
+    NavMesh.compute_path only uses the field from FLOW_FIELD_MIN_CHASERS hunters on, where it
+    becomes the faster of the two.
+    """
+    current_map = load_map(map_name)
+    mesh = current_map.nav_mesh
+    field = mesh.search_engine(FlowField)
+    walk = target_walk(mesh, random_queries(mesh, 1, seed=2)[0][1], n_ticks)
+
+    print(f"{map_name}: {n_ticks} ticks, target moving 0 to 2 tiles per tick")
+    for n_hunters in hunter_counts:
+        hunters = [start for start, _ in random_queries(mesh, n_hunters, seed=5)]
+        field.goal = -1
+        updates = field.updates
+        times = {}
+        for name in (backend, 'FLOW_FIELD'):
+            start_time = time.perf_counter()
+            for target in walk:
+                for hunter in hunters:
+                    if name == 'FLOW_FIELD':
+                        field.search(hunter, target)
+                    else:
+                        mesh.search_path(hunter, target)
+            times[name] = time.perf_counter() - start_time
+        used = 'flow field' if n_hunters >= FLOW_FIELD_MIN_CHASERS else backend
+        print(f"  {n_hunters:3d} hunters: {backend} {times[backend]*1000/n_ticks:7.3f} ms/tick, "
+              f"flow field {times['FLOW_FIELD']*1000/n_ticks:7.3f} ms/tick ({field.updates - updates} field updates), "
+              f"compute_path uses {used}")
+
+def compare_string_pulling(map_name='map5', n_queries=300):
+    """
+    Compares the waypoints and wall queries of the string-pulled paths with the per-frame
+    smoothing they replace.
+    """
+    current_map = load_map(map_name)
+    mesh = current_map.nav_mesh
+    wall_index = current_map.nav_mesh_wall_index
+    puller = mesh.search_engine(StringPuller)
+    entity = Entity(0, 0)
+
+    tile_points, corners, pull_time, raycasts, raycast_time = 0, 0, 0, 0, 0
+    for start, goal in random_queries(mesh, n_queries):
+        entity.x_pos, entity.y_pos = mesh.position(start)
+        start_time = time.perf_counter()
+        _, path = mesh.compute_path(entity, mesh.position(goal))
+        pull_time += time.perf_counter() - start_time
+        if path == None:
+            continue
+        corners += len(path)
+        tile_points += len(mesh.find_path(start, goal))
+
+        # former Alien.follow_path: one raycast per waypoint skipped plus one failing, at every
+        # waypoint reached (and every frame in between)
+        tiles = [mesh.position(node) for node in mesh.find_path(start, goal)]
+        start_time = time.perf_counter()
+        position = tiles.pop()
+        while tiles:
+            raycasts += 1
+            while tiles and not wall_index.segment_blocked(position, tiles[-1]):
+                raycasts += 1
+                position = tiles.pop()
+            if tiles:
+                position = tiles.pop()
+        raycast_time += time.perf_counter() - start_time
+
+    print(f"{map_name}: {n_queries} paths, {tile_points} tile waypoints pulled to {corners} corners")
+    print(f"  pulling {pull_time*1000/n_queries:.3f} ms/path (search included), once per path")
+    print(f"  former smoothing {raycasts/n_queries:.1f} raycasts, {raycast_time*1000/n_queries:.3f} ms per path walked, "
+          f"repeated on every frame")
+
+def compare_tile_sampler(map_name='map5', n_samples=2000, bands=((50, 250), (40, 250), (500, 1e9))):
+    """Compares the time of the sampler with rejection sampling, worst draw included."""
+    current_map = load_map(map_name)
+    mesh = current_map.nav_mesh
+    sampler = mesh.search_engine(TileSampler)
+    rng = rd.Random(0)
+    centers = [mesh.position(start) for start, _ in random_queries(mesh, n_samples)]
+    print(f"{map_name}: {n_samples} samples per band")
+    for band in bands:
+        start_time = time.perf_counter()
+        for x, y in centers:
+            sampler.sample(x, y, band)
+        sampler_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        draws = [rejection_sample(mesh, x, y, band, rng)[1] for x, y in centers]
+        rejection_time = time.perf_counter() - start_time
+        print(f"  band {band}: sampler {sampler_time*1e6/n_samples:7.1f} us/sample, rejection sampling "
+              f"{rejection_time*1e6/n_samples:7.1f} us/sample ({sum(draws)/n_samples:.1f} draws on average, {max(draws)} at worst)")
+
+def compare_components(map_name='map5', n_queries=300):
+    """Compares the cost of the unreachable queries with and without the component check."""
+    current_map = load_map(map_name)
+    mesh = current_map.nav_mesh
+    components = mesh.component_ids()
+    sizes = np.bincount(components[components >= 0])
+    print(f"{map_name}: {len(sizes)} components of {', '.join(str(size) for size in sizes)} tiles")
+
+    queries = random_queries(mesh, n_queries)
+    unreachable, search_time, check_time = 0, 0, 0
+    for start, goal in queries:
+        start_time = time.perf_counter()
+        mesh.search_path(start, goal)
+        elapsed = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        reachable = mesh.reachable(start, goal)
+        elapsed_check = time.perf_counter() - start_time
+        if not reachable:
+            unreachable += 1
+            search_time += elapsed
+            check_time += elapsed_check
+
+    if unreachable:
+        print(f"  {unreachable} unreachable pairs: {mesh.path_backend} search {search_time*1000/unreachable:.3f} ms, "
+              f"component check {check_time*1e6/unreachable:.2f} us")
+
+def compare_vent_index(map_name='map5', node_counts=(20, 200, 1000), n_queries=2000):
+    """
+    Times the nearest vent node and exit queries through the KD-trees against a scan of every
+    node and exit, on the map's vents and on random vent networks of growing size.
+    The index scans its lists itself below KD_TREE_MIN_POINTS points, so on small networks it only
+    adds the cost of going through VentMesh and checking that its lists are up to date.
+    """
+    current_map = load_map(map_name)
+    meshes = [(f"{map_name} vents", current_map.vents_mesh)]
+    rng = rd.Random(0)
+    for n_nodes in node_counts:
+        mesh = VentMesh(current_map.size, current_map.vents_mesh.width, current_map.vents_mesh.height, current_map.vents_mesh.density)
+        nodes = {(rng.randrange(mesh.width), rng.randrange(mesh.height)) for _ in range(n_nodes)}
+        mesh.adjacency_map = {node: [] for node in nodes}
+        mesh.exits = rng.sample(sorted(nodes), max(1, len(nodes)//5))
+        meshes.append((f"{len(nodes)} random nodes", mesh))
+
+    for name, mesh in meshes:
+        nodes = list(mesh.adjacency_map.keys())
+        exits = [mesh.position(exit_point) for exit_point in (mesh.exits or [])]
+        tiles = [(rng.randrange(mesh.width), rng.randrange(mesh.height)) for _ in range(n_queries)]
+        positions = [(rng.uniform(0, mesh.size[0]), rng.uniform(0, mesh.size[1])) for _ in range(n_queries)]
+        mesh.get_closest_vent_node(0, 0) # builds the trees
+
+        start_time = time.perf_counter()
+        for tile in tiles:
+            mesh.get_closest_vent_node(tile)
+        for position in positions:
+            mesh.get_closest_vent_access(position)
+        index_time = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        for tile in tiles:
+            scan_closest(nodes, tile)
+        for position in positions:
+            scan_closest(exits, position)
+        scan_time = time.perf_counter() - start_time
+
+        print(f"{name}: {len(nodes)} nodes, {len(exits)} exits, "
+              f"index {index_time*1e6/(2*n_queries):.1f} us/query, scan {scan_time*1e6/(2*n_queries):.1f} us/query")
+
+def compare_vent_routes(map_name='map5', node_counts=(50, 200), n_queries=500):
+    """
+    Times building the vent routing table and compares a table walk with a search, on the
+    map's vents and on random vent networks.
+    """
+    current_map = load_map(map_name)
+    rng = rd.Random(0)
+    meshes = [(f"{map_name} vents", current_map.vents_mesh)]
+    meshes += [(f"{n_nodes} random nodes", random_vent_network(current_map.vents_mesh, n_nodes, rng)) for n_nodes in node_counts]
+
+    for name, mesh in meshes:
+        mesh.routes = None
+        start_time = time.perf_counter()
+        mesh.routing_table()
+        build_time = time.perf_counter() - start_time
+        nodes = list(mesh.adjacency_map.keys())
+        queries = [(rng.choice(nodes), rng.choice(nodes)) for _ in range(n_queries)]
+
+        start_time = time.perf_counter()
+        for start, goal in queries:
+            mesh.route(start, goal)
+        route_time = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        for start, goal in queries:
+            mesh.search_path(start, goal)
+        search_time = time.perf_counter() - start_time
+
+        print(f"{name}: {len(nodes)} nodes, table built in {build_time*1000:.1f} ms, "
+              f"table walk {route_time*1e6/n_queries:.1f} us, {mesh.path_backend} {search_time*1e6/n_queries:.1f} us")
+
+def compare_map_format(map_name='map5'):
+    """
+    Saves the map in the binary format, with and without its precomputed sections, and times
+    reading the file and the whole load.
+    """
+    reference = load_map(map_name)
+    for precomputed in (False, True):
+        path = f'maps/{map_name}/check_map_format.bin'
+        reference.save(path, precomputed=precomputed)
+        size = os.path.getsize(path)
+        try:
+            start_time = time.perf_counter()
+            sections = read_map_file(path, mmap=True) # as Map.open does
+            read_time = time.perf_counter() - start_time
+            current_map = Map.from_sections(map_name, sections)
+            start_time = time.perf_counter()
+            current_map.load()
+            load_time = time.perf_counter() - start_time
+        finally:
+            sections = current_map = None
+            os.remove(path)
+
+        print(f"{map_name} {'with' if precomputed else 'without'} precomputed sections: {size} bytes, "
+              f"read in {read_time*1000:.2f} ms, loaded in {load_time*1000:.1f} ms")
+
+def compare_load(map_name='map5'):
+    """
+    Prints the time and memory of each stage of Map.load (the first load of a map also fills its
+    nav mesh cache), the time of loading it again, and compares building the nav mesh
+    walls with the per-tile scan they replace.
+    """
+    current_map = Map.open(map_name)
+    current_map.load(report=True)
+    untraced_map = Map.open(map_name)
+    untraced_map.load()
+    print(f"{map_name}: loaded in {untraced_map.load_pipeline.total_time()*1000:.1f} ms without tracing memory")
+
+    current_map.load()
+    reload_time = current_map.load_pipeline.total_time()
+    start_time = time.perf_counter()
+    reference = reference_nav_mesh_walls(current_map)
+    reference_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    nav_mesh_walls = current_map.generate_nav_mesh_walls()
+    walls_time = time.perf_counter() - start_time
+
+    print(f"{map_name}: reloaded in {reload_time*1000:.2f} ms, {len(reference)} nav mesh wall tiles covered by "
+          f"{len(nav_mesh_walls)} walls, rasterized and merged in {walls_time*1000:.1f} ms vs {reference_time*1000:.1f} ms per tile")
+
+def compare_nav_mesh_walls(map_names=None, n_segments=5000):
+    """
+    Reports, for every shipped map (or the given one), how many walls the merged nav mesh walls
+    replace, and times Entity.can_go_to_point against the same test with one wall per tile on
+    random segments between free points.
+    """
+    if map_names == None:
+        map_names = sorted(name for name in os.listdir('maps') if os.path.exists(f'maps/{name}/map.bin'))
+    elif isinstance(map_names, str):
+        map_names = [map_names]
+
+    for map_name in map_names:
+        current_map = load_map(map_name)
+        tile_walls = reference_nav_mesh_walls(current_map)
+        merged_walls = current_map.nav_mesh_walls
+
+        rng = rd.Random(0)
+        entities = []
+        for _ in range(n_segments):
+            entity = Entity(0, 0)
+            entity.rect.center = random_free_point(current_map, rng)
+            entities.append((entity, random_free_point(current_map, rng)))
+        tile_index = WallIndex(tile_walls)
+        start_time = time.perf_counter()
+        for entity, point in entities:
+            tile_index.segment_enters(entity.rect.center, point) # one wall per tile
+        tile_time = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        for entity, point in entities:
+            entity.can_go_to_point(point, current_map)
+        merged_time = time.perf_counter() - start_time
+
+        print(f"{map_name}: {len(tile_walls)} tile walls -> {len(merged_walls)} merged walls "
+              f"({1 - len(merged_walls)/max(len(tile_walls), 1):.0%} fewer), "
+              f"can_go_to_point {tile_time*1e6/n_segments:.1f} -> {merged_time*1e6/n_segments:.1f} us")
+
+def compare_wall_corners(map_name='map5', wall_counts=(500, 2000, 5000), n_views=100):
+    """
+    Times Map.init_wall_corners against the pairwise reference on the map and on random maps of
+    many walls, and times visibility polygons from random points with the outline segments and
+    with the segments of every wall edge.
+    """
+    current_map = Map.open(map_name)
+    rng = rd.Random(0)
+    layouts = [(map_name, current_map.walls, current_map.size)]
+    for n in wall_counts:
+        map_size = 200*int(n**0.5)
+        layouts.append((f"{n} random walls", random_walls(rng, n, map_size), (map_size, map_size)))
+
+    for name, walls, size in layouts:
+        current_map.walls = walls
+        start_time = time.perf_counter()
+        current_map.init_wall_corners()
+        corners_time = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        reference_wall_corners(walls)
+        reference_time = time.perf_counter() - start_time
+
+        wall_index = WallIndex(walls)
+        segments = build_segments(walls, wall_index)
+        outline = outline_segments(walls, wall_index)
+        views = []
+        while len(views) < n_views:
+            point = (rng.uniform(0, size[0]), rng.uniform(0, size[1]))
+            if not wall_index.point_collides(point):
+                views.append((point, rng.uniform(0, 360)))
+        times = []
+        for view_segments in (segments, outline):
+            start_time = time.perf_counter()
+            for point, orientation in views:
+                visibility_polygon(point, orientation, 90, view_segments)
+            times.append(time.perf_counter() - start_time)
+
+        print(f"{name}: {len(walls)} walls, corners in {corners_time*1000:.1f} ms vs {reference_time*1000:.1f} ms pairwise, "
+              f"{len(segments)} segments -> {len(outline)} outline segments, "
+              f"view {times[0]*1000/n_views:.2f} -> {times[1]*1000/n_views:.2f} ms")
+
+
+BENCHMARKS = {
+    'backends': compare_backends,
+    'open_room': compare_backends_open_room,
+    'chase': compare_chase,
+    'hpa': compare_hpa,
+    'alt': compare_alt,
+    'generate': compare_generate,
+    'pvs': compare_pvs,
+    'path_cache': compare_path_cache,
+    'flow_field': compare_flow_field,
+    'string_pulling': compare_string_pulling,
+    'tile_sampler': compare_tile_sampler,
+    'components': compare_components,
+    'vent_index': compare_vent_index,
+    'vent_routes': compare_vent_routes,
+    'map_format': compare_map_format,
+    'load': compare_load,
+    'wall_corners': compare_wall_corners,
+    'nav_mesh_walls': compare_nav_mesh_walls,
+}
+
+if __name__ == '__main__':
+    benchmark = sys.argv[1] if len(sys.argv) > 1 else 'backends'
+    if len(sys.argv) > 2:
+        BENCHMARKS[benchmark](sys.argv[2])
+    else:
+        BENCHMARKS[benchmark]()
@@ -0,0 +1,72 @@
+"""
+CONVERT MAPS
+Converts the maps saved as whole-object pickles (maps/<name>/map.pkl) to the
+binary map format (maps/<name>/map.bin, see utilities/map_format.py).
+Maps pickled by older versions of Map are supported. Maps that already have a
+map.bin and no pickle are re-saved from it (to add or drop the nav mesh).
+
+Usage (from the project root):
+    python utilities/convert_maps.py [map_name ...] [--precompute]
+
+--precompute also stores the nav mesh, so that loading the map
+does not generate it (larger files).
+"""
+
+import os
+import sys
+import pickle
+
+# --- Path Setup ---
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.join(current_dir, '..')
+sys.path.append(project_root)
+
+from environment.map import Map
+
+
+def convert(map_name, precompute=False):
+    """Returns False if maps/<map_name> has no map to convert."""
+    pickle_path = f'maps/{map_name}/map.pkl'
+    path = f'maps/{map_name}/map.bin'
+    if not os.path.exists(pickle_path) or os.path.getsize(pickle_path) == 0:
+        if not os.path.exists(path):
+            print(f"{map_name}: no pickled map, skipped")
+            return False
+        return resave(map_name, precompute)
+    with open(pickle_path, 'rb') as f:
+        stored_map = pickle.load(f)
+
+    # copy what the old pickles hold into a Map built by the current constructor
+    density = getattr(stored_map, 'mesh_density', None) or getattr(stored_map, 'density')
+    current_map = Map(map_name, stored_map.size[0], stored_map.size[1], density, stored_map.edge_tolerance)
+    current_map.walls = stored_map.walls
+    current_map.player_spawn = getattr(stored_map, 'player_spawn', None)
+    current_map.enemy_spawn = getattr(stored_map, 'enemy_spawn', None)
+    if getattr(stored_map, 'vents_mesh', None) != None:
+        current_map.vents_mesh = stored_map.vents_mesh
+        current_map.vents_mesh.exits = current_map.vents_mesh.exits or []
+
+    if precompute:
+        current_map.load()
+    current_map.save(precomputed=precompute)
+
+    print(f"{map_name}: {os.path.getsize(pickle_path)} bytes pickled, {os.path.getsize(path)} bytes in {path}")
+    return True
+
+def resave(map_name, precompute=False):
+    """Rewrites maps/<map_name>/map.bin, with the nav mesh if precompute (generated if it is not stored yet)."""
+    path = f'maps/{map_name}/map.bin'
+    size = os.path.getsize(path)
+    current_map = Map.open(map_name)
+    if precompute:
+        current_map.load()
+    current_map.save(precomputed=precompute)
+    print(f"{map_name}: {size} bytes, {os.path.getsize(path)} bytes in {path}")
+    return True
+
+
+if __name__ == '__main__':
+    precompute = '--precompute' in sys.argv
+    names = [arg for arg in sys.argv[1:] if not arg.startswith('--')] or sorted(os.listdir('maps'))
+    for name in names:
+        convert(name, precompute)
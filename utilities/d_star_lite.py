@@ -0,0 +1,261 @@
+import heapq
+import math
+import numpy as np
+from .a_star import inf, coordinate_to_index, index_to_coordinate
+
+
+class MovingTargetDStarLite():
+    """
+    Incremental planner for a hunter chasing a moving target (Moving Target D* Lite).
+
+    The search tree is rooted at the start and grows toward the goal, as in A*, but the
+    g/rhs values and the open list are kept between calls:
+    - when the goal moves, the keys stay valid lower bounds by adding to km the heuristic
+      distance between the old and the new goal, so the open list needs no reordering;
+    - when the start moves along the previous path, the part of the tree hanging below the
+      new start is kept as is, and only the rest of the tree is thrown away and repaired;
+    - when edge costs change (change_edge_costs), only the heads of the changed edges are updated.
+    Each search then only expands the nodes whose value actually changed.
+
+    The heuristic is the euclidean distance in tiles, which never exceeds the edge weights of
+    the meshes (1 or sqrt(2) on the nav mesh, pixel lengths on the vents), so paths are optimal.
+
+    It is not a faster replacement for the default ARRAY_A_STAR backend: a refresh costs more than
+    that A*, which scales its heuristic to pixels and searches greedily. What it buys is optimal
+    (shorter) paths, for less than an optimal search restarted at every refresh
+    (see utilities/benchmark.py chase).
+    """
+    def __init__(self, mesh):
+        self.mesh = mesh
+        self.width = mesh.width
+        size = mesh.width*mesh.height
+
+        self.g = [inf]*size
+        self.rhs = [inf]*size
+        self.parent = [-1]*size
+        self.open_key = [None]*size # key of the node in the open list, None if it is not in it
+        self.open_set = [] # heap of (k1, k2, node), entries whose key differs from open_key are stale
+        self.touched = [] # nodes whose g/rhs have been written since the last reset
+        self.is_touched = [False]*size
+
+        self.graph = None
+        self.start = -1
+        self.goal = -1
+        self.km = 0
+
+        self.expanded = 0 # nodes expanded during the last search
+        self.resets = 0 # searches that could not reuse the previous tree
+
+    def bind_graph(self):
+        """(Re)reads the mesh graph, with the reverse adjacency used to find the predecessors of a node."""
+        graph = self.mesh.graph
+        self.graph = graph
+        self.offsets, self.neighbors, self.weights = graph.lists()
+
+        degrees = np.diff(graph.offsets)
+        sources = np.repeat(np.arange(len(degrees), dtype=np.int64), degrees)
+        order = np.argsort(graph.neighbors, kind='stable')
+        reverse_offsets = np.zeros(len(degrees) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(graph.neighbors, minlength=len(degrees)), out=reverse_offsets[1:])
+        self.reverse_offsets = reverse_offsets.tolist()
+        self.predecessors = sources[order].tolist()
+        self.reverse_edges = order.tolist() # index in neighbors/weights of each reverse edge
+
+    def reset(self, start):
+        self.resets += 1
+        g, rhs, parent, open_key, is_touched = self.g, self.rhs, self.parent, self.open_key, self.is_touched
+        for n in self.touched:
+            g[n] = rhs[n] = inf
+            parent[n] = -1
+            open_key[n] = None
+            is_touched[n] = False
+        self.touched = []
+        self.open_set = []
+        self.km = 0
+
+        self.start = start
+        self.touch(start)
+        rhs[start] = 0
+        self.update_state(start)
+
+    def touch(self, n):
+        if not self.is_touched[n]:
+            self.is_touched[n] = True
+            self.touched.append(n)
+
+    def heuristic(self, n):
+        width = self.width
+        goal = self.goal
+        return math.hypot(n%width - goal%width, n//width - goal//width)
+
+    def calculate_key(self, n):
+        k2 = min(self.g[n], self.rhs[n])
+        return (k2 + self.heuristic(n) + self.km, k2)
+
+    def update_state(self, n):
+        if self.g[n] != self.rhs[n]:
+            key = self.calculate_key(n)
+            self.open_key[n] = key
+            heapq.heappush(self.open_set, (key[0], key[1], n))
+        else:
+            self.open_key[n] = None
+
+    def top(self):
+        """Returns (key, node) of the best node of the open list, dropping the stale heap entries."""
+        open_set, open_key = self.open_set, self.open_key
+        while open_set:
+            k1, k2, n = open_set[0]
+            if open_key[n] == (k1, k2):
+                return (k1, k2), n
+            heapq.heappop(open_set)
+        return None, -1
+
+    def best_predecessor(self, n):
+        g, weights, predecessors, reverse_edges = self.g, self.weights, self.predecessors, self.reverse_edges
+        best, best_parent = inf, -1
+        for k in range(self.reverse_offsets[n], self.reverse_offsets[n+1]):
+            p = predecessors[k]
+            value = g[p] + weights[reverse_edges[k]]
+            if value < best:
+                best, best_parent = value, p
+        return best, best_parent
+
+    def compute_cost_minimal_path(self):
+        g, rhs, parent, open_key = self.g, self.rhs, self.parent, self.open_key
+        offsets, neighbors, weights = self.offsets, self.neighbors, self.weights
+        start, goal = self.start, self.goal
+
+        while True:
+            key, u = self.top()
+            if u == -1 or not (key < self.calculate_key(goal) or rhs[goal] > g[goal]):
+                return
+
+            new_key = self.calculate_key(u)
+            if key < new_key:
+                open_key[u] = new_key
+                heapq.heapreplace(self.open_set, (new_key[0], new_key[1], u))
+                continue
+
+            self.expanded += 1
+            heapq.heappop(self.open_set)
+            open_key[u] = None
+
+            if g[u] > rhs[u]: # overconsistent: u gets its final value, propagate the improvement
+                g[u] = rhs[u]
+                g_u = g[u]
+                for k in range(offsets[u], offsets[u+1]):
+                    s = neighbors[k]
+                    if s != start and rhs[s] > g_u + weights[k]:
+                        self.touch(s)
+                        parent[s] = u
+                        rhs[s] = g_u + weights[k]
+                        self.update_state(s)
+            else: # underconsistent: u got worse, its children have to look for another parent
+                g[u] = inf
+                self.update_state(u)
+                for k in range(offsets[u], offsets[u+1]):
+                    s = neighbors[k]
+                    if s != start and parent[s] == u:
+                        rhs[s], parent[s] = self.best_predecessor(s)
+                        self.update_state(s)
+
+    def move_start(self, start):
+        """
+        Keeps the subtree of the search tree rooted at the new start and clears every other node,
+        then gives the cleared nodes that border the kept subtree their new rhs.
+        Returns False if the new start is not in the tree, in which case nothing can be reused.
+        """
+        parent, g, rhs, open_key = self.parent, self.g, self.rhs, self.open_key
+        if rhs[start] == inf and g[start] == inf:
+            return False
+
+        children = {}
+        for n in self.touched:
+            if parent[n] != -1:
+                children.setdefault(parent[n], []).append(n)
+
+        kept = {start}
+        stack = [start]
+        while stack:
+            for child in children.get(stack.pop(), ()):
+                kept.add(child)
+                stack.append(child)
+
+        deleted = [n for n in self.touched if n not in kept]
+        for n in deleted:
+            parent[n] = -1
+            g[n] = rhs[n] = inf
+            open_key[n] = None
+        parent[start] = -1
+        self.start = start
+
+        # Only the kept subtree and the deleted nodes it can reach again stay touched
+        is_touched = self.is_touched
+        self.touched = list(kept)
+        for n in deleted:
+            rhs[n], parent[n] = self.best_predecessor(n)
+            if rhs[n] < inf:
+                self.touched.append(n)
+                self.update_state(n)
+            else:
+                is_touched[n] = False
+        return True
+
+    def change_edge_costs(self, nodes):
+        """
+        Repairs the search after the weights of edges ending in the given node ids have been
+        changed in the graph (see Mesh.set_edge_costs).
+        """
+        self.offsets, self.neighbors, self.weights = self.graph.lists()
+        for n in nodes:
+            if n != self.start and self.is_touched[n]:
+                self.rhs[n], self.parent[n] = self.best_predecessor(n)
+                self.update_state(n)
+
+    def reconstruct_path(self):
+        """Follows the parents from the goal to the start, None if they do not lead to it."""
+        width, parent = self.width, self.parent
+        current = self.goal
+        total_path = [index_to_coordinate(current, width)]
+        for _ in range(len(self.touched)):
+            if current == self.start:
+                return total_path
+            current = parent[current]
+            if current == -1:
+                return None
+            total_path.append(index_to_coordinate(current, width))
+        return total_path if current == self.start else None
+
+    def search(self, start, goal):
+        """
+        Same contract as A_star: returns the list of (i, j) nodes from goal to start, or None.
+        """
+        start_n = coordinate_to_index(start[0], start[1], self.width)
+        goal_n = coordinate_to_index(goal[0], goal[1], self.width)
+        self.expanded = 0
+
+        if self.graph is not self.mesh.graph:
+            self.bind_graph()
+            self.goal = goal_n
+            self.reset(start_n)
+        else:
+            if goal_n != self.goal:
+                self.km += self.heuristic(goal_n) # distance between the old (self.goal) and new goal
+                self.goal = goal_n
+            if start_n != self.start and not self.move_start(start_n):
+                self.reset(start_n)
+
+        self.compute_cost_minimal_path()
+        if self.rhs[goal_n] == inf:
+            return None
+
+        path = self.reconstruct_path()
+        if path == None: # should not happen, but never hand out a broken path
+            self.reset(start_n)
+            self.compute_cost_minimal_path()
+            path = self.reconstruct_path() if self.rhs[goal_n] < inf else None
+        return path
+
+
+def d_star_lite(start, goal, mesh):
+    return mesh.search_engine(MovingTargetDStarLite).search(start, goal)
@@ -0,0 +1,123 @@
+import heapq
+from .a_star import inf, coordinate_to_index, index_to_coordinate
+
+# A field update costs about as much as a search over the whole mesh, whatever the number of chasers,
+# while one A* search each grows with them. On map5 (open, short searches) the field only pays off from
+# about 12 chasers (7.4 vs 7.2 ms/tick with the benchmark's moving target); on map2 and map4 it already
+# wins with 4. 12 is the worst case, so the field is not slower than one search each on any shipped map.
+FLOW_FIELD_MIN_CHASERS = 12 # see benchmark.py flow_field
+
+class FlowField():
+    """
+    Distance field toward one goal tile (the player's), shared by every entity heading there.
+
+    It is a Dijkstra grown from the goal: since the mesh graphs are undirected, the distance from
+    the goal to a node is its distance to the goal, and the node it was reached from is its next
+    waypoint. The Dijkstra is lazy: it only runs until the node asked for is settled, and resumes
+    from where it stopped for the next one. Moving the goal to another tile starts a new field,
+    asking again for the same goal reuses it, so several hunters chasing one player cost one
+    field (grown up to the farthest of them) per player tile instead of one search each, and
+    reading a waypoint from an already settled node is O(1).
+
+    Growing a field costs more than one A* search, so it only pays off when many entities chase
+    the same tile: NavMesh.compute_path uses it from FLOW_FIELD_MIN_CHASERS chasers on.
+    """
+    def __init__(self, mesh):
+        self.mesh = mesh
+        self.width = mesh.width
+        size = mesh.width*mesh.height
+
+        self.distance = [inf]*size
+        self.next_node = [-1]*size # next node toward the goal, -1 on the goal and unreached nodes
+        self.settled = [0]*size # generation in which the node got its final distance
+        self.seen = [0]*size # generation in which distance/next_node were written
+        self.generation = 0
+
+        self.graph = None
+        self.goal = -1
+        self.open_set = []
+
+        self.expanded = 0 # nodes settled during the last call
+        self.updates = 0 # fields started, one per goal tile
+
+    def set_goal(self, goal):
+        """Moves the field to the goal tile (i, j), does nothing if it already points there."""
+        goal_n = coordinate_to_index(goal[0], goal[1], self.width)
+        if goal_n == self.goal and self.graph is self.mesh.graph:
+            return
+        self.graph = self.mesh.graph
+        self.offsets, self.neighbors, self.weights = self.graph.lists()
+
+        self.updates += 1
+        self.generation += 1
+        self.goal = goal_n
+        self.distance[goal_n] = 0
+        self.next_node[goal_n] = -1
+        self.seen[goal_n] = self.generation
+        self.open_set = [(0, goal_n)]
+
+    def change_edge_costs(self, nodes):
+        """The distances may all have changed (see Mesh.set_edge_costs): the next call starts a new field."""
+        self.goal = -1
+
+    def settle(self, n):
+        """Grows the field until the node id n has its final distance. Returns False if n cannot reach the goal."""
+        generation = self.generation
+        settled = self.settled
+        if settled[n] == generation:
+            return True
+
+        distance, next_node, seen = self.distance, self.next_node, self.seen
+        offsets, neighbors, weights = self.offsets, self.neighbors, self.weights
+        open_set = self.open_set
+        while open_set:
+            current_distance, current = heapq.heappop(open_set)
+            if settled[current] == generation:
+                continue
+            settled[current] = generation
+            self.expanded += 1
+
+            for k in range(offsets[current], offsets[current+1]):
+                neighbor = neighbors[k]
+                value = current_distance + weights[k]
+                if seen[neighbor] != generation or value < distance[neighbor]:
+                    seen[neighbor] = generation
+                    distance[neighbor] = value
+                    next_node[neighbor] = current
+                    heapq.heappush(open_set, (value, neighbor))
+
+            if current == n:
+                return True
+        return False
+
+    def next_waypoint(self, node):
+        """Next tile (i, j) from node toward the goal, None on the goal or if the goal cannot be reached."""
+        self.expanded = 0
+        n = coordinate_to_index(node[0], node[1], self.width)
+        if not self.settle(n) or self.next_node[n] == -1:
+            return None
+        return index_to_coordinate(self.next_node[n], self.width)
+
+    def search(self, start, goal):
+        """
+        Same contract as A_star: returns the list of (i, j) nodes from goal to start, or None.
+        The path follows the field, so only the first query toward a goal tile pays for the search.
+        """
+        self.expanded = 0
+        self.set_goal(goal)
+        start_n = coordinate_to_index(start[0], start[1], self.width)
+        if not self.settle(start_n):
+            return None
+
+        width, next_node = self.width, self.next_node
+        current = start_n
+        total_path = [index_to_coordinate(current, width)]
+        while current != self.goal:
+            current = next_node[current]
+            total_path.append(index_to_coordinate(current, width))
+        total_path.reverse()
+        return total_path
+
+
+def flow_field(start, goal, mesh):
+    return mesh.search_engine(FlowField).search(start, goal)
@@ -1,4 +1,5 @@
 from numpy import arctan2
+import heapq
 import math
 
 def is_parallel(p1, p2, q1, q2):
@@ -59,4 +60,64 @@ def angle_entity(entity1, entity2):
     x1, y1 = entity1.x_pos, entity1.y_pos
     x2, y2 = entity2.x_pos, entity2.y_pos
 
-    return (arctan2(y2-y1, x2-x1)*180/math.pi)%360 # in [0, 360)
\ No newline at end of file
+    return (arctan2(y2-y1, x2-x1)*180/math.pi)%360 # in [0, 360)
+
+def intersects_rect(segment, rect):
+    """
+    Returns True if the segment crosses one of the four edges of the rect (same test as intersects).
+    """
+    A = (rect.left, rect.top)
+    B = (rect.right, rect.top)
+    C = (rect.right, rect.bottom)
+    D = (rect.left, rect.bottom)
+
+    for edge in [(A, B), (B, C), (C, D), (D, A)]:
+        if intersects(segment, edge):
+            return True
+    return False
+
+def segment_enters_rect(segment, rect):
+    """
+    Returns True if the segment meets the inside of the rect, borders excluded. Unlike intersects_rect
+    this also holds for a segment that touches the borders only at its ends or at corners, such as
+    one ending inside the rect or crossing it from corner to corner: the segment is clipped to the
+    closed rect (Liang-Barsky) and the middle of the clipped part is tested.
+    """
+    (x1, y1), (x2, y2) = segment
+    dx, dy = x2 - x1, y2 - y1
+    t_enter, t_exit = 0, 1
+    for p, q in ((-dx, x1 - rect.left), (dx, rect.right - x1), (-dy, y1 - rect.top), (dy, rect.bottom - y1)):
+        if p == 0:
+            if q < 0: # parallel to this side and outside of it
+                return False
+        elif p < 0:
+            t_enter = max(t_enter, q/p)
+        else:
+            t_exit = min(t_exit, q/p)
+    if t_enter > t_exit:
+        return False
+    t = (t_enter + t_exit)/2
+    x, y = x1 + t*dx, y1 + t*dy
+    return rect.left < x < rect.right and rect.top < y < rect.bottom
+
+def overlapping_rect_pairs(rects):
+    """
+    Returns the pairs (i, j), i < j, of rects whose intersection has a positive area, sorted.
+    Sweep and prune along x: the rects are visited by increasing left side and only compared
+    with the rects still open at that abscissa, so the cost is O(n log n) plus the pairs that
+    overlap along x instead of all n² pairs.
+    """
+    order = sorted((r.left, k) for k, r in enumerate(rects) if r.left < r.right and r.top < r.bottom)
+    pairs = []
+    open_rects = [] # heap of (right side, index) of the rects the sweep line is inside of
+    for left, k in order:
+        while open_rects and open_rects[0][0] <= left:
+            heapq.heappop(open_rects)
+        r = rects[k]
+        for _, other in open_rects:
+            o = rects[other]
+            if o.top < r.bottom and r.top < o.bottom:
+                pairs.append((min(k, other), max(k, other)))
+        heapq.heappush(open_rects, (r.right, k))
+    pairs.sort()
+    return pairs
@@ -0,0 +1,187 @@
+from collections.abc import Mapping
+import numpy as np
+from math import inf
+
+# Tile states, one byte per tile
+TILE_ABSENT = 0 # not a node of the mesh (only used by sparse meshes such as the vents)
+TILE_WALL = 1 # adjacency_map value None
+TILE_BLOCKED = 2 # adjacency_map value []
+TILE_FREE = 3 # non-empty adjacency list
+
+
+class CSRGraph():
+    """
+    Compressed-sparse-row adjacency of a grid mesh.
+
+    Node n = i + width*j owns the edges offsets[n]:offsets[n+1] of the neighbors/weights arrays,
+    and tile_state[n] records whether it is absent, a wall, blocked or free.
+    """
+    def __init__(self, width, height, tile_state, offsets, neighbors, weights):
+        self.width = width
+        self.height = height
+        self.tile_state = tile_state
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.weights = weights
+        self._lists = None
+
+    @classmethod
+    def from_adjacency_map(cls, adjacency_map, width, height):
+        """
+        Builds the graph from a {(i, j): [((i, j), weight), ...] | [] | None} dict.
+        """
+        size = width*height
+        tile_state = np.zeros(size, dtype=np.uint8)
+        degrees = np.zeros(size, dtype=np.int64)
+        edges = {}
+
+        for (i, j), neighbors in adjacency_map.items():
+            n = i + width*j
+            if neighbors == None:
+                tile_state[n] = TILE_WALL
+            elif not neighbors:
+                tile_state[n] = TILE_BLOCKED
+            else:
+                tile_state[n] = TILE_FREE
+                degrees[n] = len(neighbors)
+                edges[n] = neighbors
+
+        offsets = np.zeros(size + 1, dtype=np.int32)
+        np.cumsum(degrees, out=offsets[1:])
+
+        neighbor_ids = np.empty(offsets[-1], dtype=np.int32)
+        weights = np.empty(offsets[-1], dtype=np.float64)
+        for n, neighbors in edges.items():
+            k = offsets[n]
+            for (i, j), w in neighbors:
+                neighbor_ids[k] = i + width*j
+                weights[k] = w
+                k += 1
+
+        return cls(width, height, tile_state, offsets, neighbor_ids, weights)
+
+    def __getstate__(self):
+        """
+        Pickles the edges as one byte each whenever possible: on a grid the pairs
+        (neighbor - node, weight) only take a handful of values, so every edge is stored
+        as an index into a small table of those pairs, and offsets as per-node degrees.
+        """
+        state = {'width': self.width, 'height': self.height, 'tile_state': self.tile_state}
+        degrees = np.diff(self.offsets)
+        sources = np.repeat(np.arange(len(degrees), dtype=np.int64), degrees)
+        pairs = np.stack((self.neighbors - sources, self.weights), axis=1)
+        table, codes = np.unique(pairs, axis=0, return_inverse=True)
+
+        if len(table) <= 256 and (len(degrees) == 0 or degrees.max() <= 255):
+            state['degrees'] = degrees.astype(np.uint8)
+            state['edge_table'] = table
+            state['edge_codes'] = codes.reshape(-1).astype(np.uint8)
+        else:
+            state['offsets'] = self.offsets
+            state['neighbors'] = self.neighbors
+            state['weights'] = self.weights
+        return state
+
+    def __setstate__(self, state):
+        self.width = state['width']
+        self.height = state['height']
+        self.tile_state = state['tile_state']
+        self._lists = None
+
+        if 'offsets' in state:
+            self.offsets = state['offsets']
+            self.neighbors = state['neighbors']
+            self.weights = state['weights']
+            return
+
+        degrees = state['degrees'].astype(np.int64)
+        table, codes = state['edge_table'], state['edge_codes']
+        self.offsets = np.zeros(len(degrees) + 1, dtype=np.int32)
+        np.cumsum(degrees, out=self.offsets[1:])
+        sources = np.repeat(np.arange(len(degrees), dtype=np.int64), degrees)
+        self.neighbors = (sources + table[codes, 0].astype(np.int64)).astype(np.int32)
+        self.weights = table[codes, 1].copy()
+
+    def set_weight(self, n, m, weight):
+        """Sets the weight of the edge n -> m, returns False if there is no such edge."""
+        for k in range(self.offsets[n], self.offsets[n+1]):
+            if self.neighbors[k] == m:
+                self.weights[k] = weight
+                if self._lists != None:
+                    self._lists[2][k] = weight
+                return True
+        return False
+
+    def lists(self):
+        """
+        Python list copies of (offsets, neighbors, weights), built once: indexing
+        a list is much cheaper than indexing a numpy array from pure Python loops.
+        """
+        if self._lists == None:
+            self._lists = (self.offsets.tolist(), self.neighbors.tolist(), self.weights.tolist())
+        return self._lists
+
+    def connected_components(self):
+        """
+        Component id of every node (int32), -1 for the nodes without edges. The graph is undirected,
+        so two free nodes are connected by a path exactly when they have the same id.
+        Edges of infinite weight do not connect their nodes.
+        """
+        offsets, neighbors, weights = self.lists()
+        labels = [-1]*(len(offsets) - 1)
+        n_components = 0
+        for source in np.flatnonzero(np.diff(self.offsets)).tolist():
+            if labels[source] != -1:
+                continue
+            labels[source] = n_components
+            stack = [source]
+            while stack:
+                current = stack.pop()
+                for k in range(offsets[current], offsets[current+1]):
+                    neighbor = neighbors[k]
+                    if labels[neighbor] == -1 and weights[k] != inf:
+                        labels[neighbor] = n_components
+                        stack.append(neighbor)
+            n_components += 1
+        return np.array(labels, dtype=np.int32)
+
+    def nbytes(self):
+        return self.tile_state.nbytes + self.offsets.nbytes + self.neighbors.nbytes + self.weights.nbytes
+
+
+class AdjacencyView(Mapping):
+    """
+    Read-only {(i, j): [((i, j), weight), ...] | [] | None} view of a CSRGraph,
+    so code written against the former adjacency_map dict keeps working.
+    """
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, node):
+        graph = self.graph
+        i, j = node
+        width = graph.width
+        if not (0 <= i < width and 0 <= j < graph.height):
+            raise KeyError(node)
+
+        n = i + width*j
+        state = graph.tile_state[n]
+        if state == TILE_ABSENT:
+            raise KeyError(node)
+        if state == TILE_WALL:
+            return None
+
+        offsets, neighbors, weights = graph.lists()
+        adjacency = []
+        for k in range(offsets[n], offsets[n+1]):
+            m = neighbors[k]
+            adjacency.append(((m%width, m//width), weights[k]))
+        return adjacency
+
+    def __iter__(self):
+        width = self.graph.width
+        for n in np.flatnonzero(self.graph.tile_state).tolist():
+            yield (n%width, n//width)
+
+    def __len__(self):
+        return int(np.count_nonzero(self.graph.tile_state))
@@ -0,0 +1,452 @@
+import heapq
+import math
+import numpy as np
+from .a_star import inf, ArrayAStar
+
+HPA_CLUSTER_SIZE = 10 # side of a cluster, in tiles
+HPA_MAX_ENTRANCE_WIDTH = 6 # entrances at least this wide get a transition at both ends instead of one in the middle
+HPA_BATCH_SIZE = 4096 # sources relaxed together when computing the intra-cluster distances
+HPA_SMOOTHING_WINDOW = 20 # tiles ahead a refined path is looked at for a cheaper straight walk
+
+SQRT2 = math.sqrt(2)
+DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (1, -1), (-1, 1), (1, 1)] # same order as mesh_loader
+WEIGHTS = [1, 1, 1, 1, SQRT2, SQRT2, SQRT2, SQRT2]
+MOVE_BITS = {direction: 1 << d for d, direction in enumerate(DIRECTIONS)}
+
+
+class ClusterHierarchy():
+    """
+    Abstract graph of a NavMesh for HPA*: the mesh is split into square clusters of cluster_size
+    tiles, and the abstract nodes are the tiles on both sides of every entrance between two
+    clusters. Abstract edges join the two sides of an entrance (weight 1) and every pair of nodes
+    of a cluster that can reach each other inside it (weight = their distance inside the cluster).
+
+    Built once when the nav mesh is generated and pickled with it. Assumes the graph is undirected,
+    as the nav mesh is.
+    """
+    def __init__(self, width, height, cluster_size, nodes, offsets, neighbors, weights):
+        self.width = width
+        self.height = height
+        self.cluster_size = cluster_size
+        self.clusters_width = -(-width // cluster_size)
+        self.clusters_height = -(-height // cluster_size)
+
+        self.nodes = nodes # (A,) int32, tile of each abstract node
+        self.offsets = offsets # (A+1,) int32, CSR of the abstract edges
+        self.neighbors = neighbors
+        self.weights = weights
+        self.init_lookups()
+
+    def init_lookups(self):
+        """Python lists used by the searches, rebuilt instead of pickled."""
+        self.node_list = self.nodes.tolist()
+        self.node_x = (self.nodes % self.width).tolist()
+        self.node_y = (self.nodes // self.width).tolist()
+        offsets, neighbors, weights = self.offsets.tolist(), self.neighbors.tolist(), self.weights.tolist()
+        self.adjacency = [list(zip(neighbors[offsets[a]:offsets[a+1]], weights[offsets[a]:offsets[a+1]]))
+                          for a in range(len(self.node_list))]
+        self.cluster_nodes = {} # keys: cluster, values: abstract nodes lying in it
+        for a, n in enumerate(self.node_list):
+            self.cluster_nodes.setdefault(self.cluster(n), []).append(a)
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in ('width', 'height', 'cluster_size', 'nodes', 'offsets', 'neighbors', 'weights')}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def cluster(self, n):
+        width, cluster_size = self.width, self.cluster_size
+        return (n // width // cluster_size)*self.clusters_width + (n % width) // cluster_size
+
+    def nbytes(self):
+        return self.nodes.nbytes + self.offsets.nbytes + self.neighbors.nbytes + self.weights.nbytes
+
+    @classmethod
+    def build(cls, mesh, cluster_size=HPA_CLUSTER_SIZE):
+        graph = mesh.graph
+        width, height = graph.width, graph.height
+        allowed = grid_edges(graph).reshape(height, width, len(DIRECTIONS))
+
+        nodes, inter_edges = find_entrances(allowed, cluster_size)
+        intra_edges = intra_cluster_distances(allowed, nodes, cluster_size)
+
+        edges = sorted(inter_edges + intra_edges)
+        offsets = np.zeros(len(nodes) + 1, dtype=np.int32)
+        np.cumsum(np.bincount([a for a, _, _ in edges], minlength=len(nodes)), out=offsets[1:])
+        neighbors = np.array([b for _, b, _ in edges], dtype=np.int32)
+        weights = np.array([w for _, _, w in edges], dtype=np.float64)
+        return cls(width, height, cluster_size, np.array(nodes, dtype=np.int32), offsets, neighbors, weights)
+
+
+def grid_edges(graph):
+    """(node, direction) boolean array of the edges toward each of the 8 grid DIRECTIONS."""
+    width = graph.width
+    degrees = np.diff(graph.offsets)
+    sources = np.repeat(np.arange(len(degrees), dtype=np.int64), degrees)
+    allowed = np.zeros((len(degrees), len(DIRECTIONS)), dtype=bool)
+    for d, (di, dj) in enumerate(DIRECTIONS):
+        edges = (graph.neighbors - sources == di + width*dj) & ((graph.neighbors % width) - (sources % width) == di)
+        allowed[sources[edges], d] = True
+    return allowed
+
+def find_entrances(allowed, cluster_size):
+    """
+    Scans the borders between neighboring clusters for runs of tiles connected across the border.
+    Returns the abstract nodes (tiles) and the (a, b, 1) edges crossing the borders, both ways.
+    """
+    height, width = allowed.shape[:2]
+    nodes = []
+    node_ids = {}
+    edges = []
+
+    def node(i, j):
+        n = i + width*j
+        if n not in node_ids:
+            node_ids[n] = len(nodes)
+            nodes.append(n)
+        return node_ids[n]
+
+    def add_run(run):
+        if len(run) < HPA_MAX_ENTRANCE_WIDTH:
+            transitions = [run[len(run)//2]]
+        else:
+            transitions = [run[0], run[-1]]
+        for (i1, j1), (i2, j2) in transitions:
+            a, b = node(i1, j1), node(i2, j2)
+            edges.append((a, b, 1.0))
+            edges.append((b, a, 1.0))
+
+    right, down = DIRECTIONS.index((1, 0)), DIRECTIONS.index((0, 1))
+    for border in range(cluster_size - 1, width - 1, cluster_size): # vertical borders, between columns border and border+1
+        for top in range(0, height, cluster_size):
+            run = []
+            for j in range(top, min(top + cluster_size, height)):
+                if allowed[j, border, right]:
+                    run.append(((border, j), (border + 1, j)))
+                elif run:
+                    add_run(run)
+                    run = []
+            if run:
+                add_run(run)
+
+    for border in range(cluster_size - 1, height - 1, cluster_size): # horizontal borders, between rows border and border+1
+        for left in range(0, width, cluster_size):
+            run = []
+            for i in range(left, min(left + cluster_size, width)):
+                if allowed[border, i, down]:
+                    run.append(((i, border), (i, border + 1)))
+                elif run:
+                    add_run(run)
+                    run = []
+            if run:
+                add_run(run)
+
+    return nodes, edges
+
+def intra_cluster_distances(allowed, nodes, cluster_size):
+    """
+    Distances inside their cluster between every pair of abstract nodes of the same cluster,
+    as (a, b, distance) edges. All the sources are relaxed together, as a stack of cluster
+    sized grids shifted in the 8 directions until no distance improves (Bellman-Ford).
+    """
+    height, width = allowed.shape[:2]
+    c = cluster_size
+    clusters_height, clusters_width = -(-height // c), -(-width // c)
+
+    # incoming[j, i, d]: tile (i, j) can be reached from (i - di, j - dj), in the same cluster
+    incoming = np.zeros((clusters_height*c, clusters_width*c, len(DIRECTIONS)), dtype=bool)
+    jj, ii = np.mgrid[0:height, 0:width]
+    for d, (di, dj) in enumerate(DIRECTIONS):
+        source_ok = (ii - di >= 0) & (ii - di < width) & (jj - dj >= 0) & (jj - dj < height)
+        from_edge = np.zeros((height, width), dtype=bool)
+        from_edge[source_ok] = allowed[(jj - dj)[source_ok], (ii - di)[source_ok], d]
+        same_cluster = ((ii - di) // c == ii // c) & ((jj - dj) // c == jj // c)
+        incoming[:height, :width, d] = from_edge & same_cluster
+    # (cluster, local j, local i, direction), cluster = cj*clusters_width + ci
+    incoming = incoming.reshape(clusters_height, c, clusters_width, c, len(DIRECTIONS)).transpose(0, 2, 1, 3, 4)
+    incoming = incoming.reshape(clusters_height*clusters_width, c, c, len(DIRECTIONS))
+
+    nodes = np.array(nodes, dtype=np.int64)
+    node_i, node_j = nodes % width, nodes // width
+    node_cluster = (node_j // c)*clusters_width + node_i // c
+    local_i, local_j = node_i % c, node_j % c
+
+    # every (a, b) pair of distinct abstract nodes sharing a cluster
+    order = np.argsort(node_cluster, kind='stable')
+    _, group_start, group_size = np.unique(node_cluster[order], return_index=True, return_counts=True)
+    size_of = np.repeat(group_size, group_size) # size of the group of each node, in sorted order
+    start_of = np.repeat(group_start, group_size)
+    pair_a = np.repeat(order, size_of)
+    first_pair = np.repeat(np.cumsum(size_of) - size_of, size_of)
+    pair_b = order[np.repeat(start_of, size_of) + np.arange(len(pair_a)) - first_pair]
+    distinct = pair_a != pair_b
+    pair_a, pair_b = pair_a[distinct], pair_b[distinct]
+
+    shifts = []
+    for di, dj in DIRECTIONS:
+        # distance[:, y, x] can be improved from distance[:, y - dj, x - di]
+        target = (slice(None), slice(max(0, dj), c + min(0, dj)), slice(max(0, di), c + min(0, di)))
+        source = (slice(None), slice(max(0, -dj), c - max(0, dj)), slice(max(0, -di), c - max(0, di)))
+        shifts.append((target, source))
+
+    edges = []
+    for batch_start in range(0, len(nodes), HPA_BATCH_SIZE):
+        batch = np.arange(batch_start, min(batch_start + HPA_BATCH_SIZE, len(nodes)))
+        masks = incoming[node_cluster[batch]]
+        # cost of entering each tile from each direction, infinite where there is no edge
+        costs = [np.where(masks[target + (d,)], WEIGHTS[d], np.inf) for d, (target, _) in enumerate(shifts)]
+        distance = np.full((len(batch), c, c), np.inf)
+        distance[np.arange(len(batch)), local_j[batch], local_i[batch]] = 0
+
+        while True:
+            relaxed = distance.copy()
+            for (target, source), cost in zip(shifts, costs):
+                np.minimum(relaxed[target], distance[source] + cost, out=relaxed[target])
+            if np.array_equal(relaxed, distance):
+                break
+            distance = relaxed
+
+        in_batch = (pair_a >= batch_start) & (pair_a < batch_start + len(batch))
+        a, b = pair_a[in_batch], pair_b[in_batch]
+        values = distance[a - batch_start, local_j[b], local_i[b]]
+        reachable = values < np.inf
+        edges.extend(zip(a[reachable].tolist(), b[reachable].tolist(), values[reachable].tolist()))
+    return edges
+
+
+class HPAStar():
+    """
+    Hierarchical pathfinding on a NavMesh through its ClusterHierarchy (mesh.hierarchy).
+
+    Queries between tiles less than a cluster apart are sent to ArrayAStar. Longer ones connect
+    the start and the goal to the abstract nodes of their clusters, search the small abstract
+    graph, then refine every abstract edge with a search restricted to one cluster. Refined
+    intra-cluster paths are cached. The tile path is then smoothed (see smooth), as routing
+    through the entrance transitions makes detours; paths stay slightly longer than optimal.
+    Without corner cutting, a diagonal move across a border always comes with a straight one
+    in the same entrance, so the abstract graph connects exactly the tiles the mesh connects:
+    when it finds no route, there is none.
+    """
+    def __init__(self, mesh):
+        self.mesh = mesh
+        self.width = mesh.width
+        self.hierarchy = None
+        self.expanded = 0 # abstract nodes and tiles expanded during the last search
+
+    def bind_hierarchy(self):
+        mesh = self.mesh
+        if mesh.hierarchy == None:
+            mesh.hierarchy = ClusterHierarchy.build(mesh)
+        self.hierarchy = mesh.hierarchy
+        self.graph = mesh.graph
+
+        size = len(self.hierarchy.node_list) + 1 # the last node stands for the goal
+        self.g_score = [inf]*size
+        self.came_from = [-1]*size
+        self.seen = [0]*size
+        self.closed = [0]*size
+        self.generation = 0
+        self.refined = {} # keys: (a, b) abstract nodes of a cluster, values: tiles from a to b
+        self.moves = None # bitmask of the DIRECTIONS each tile has an edge toward, built on the first smoothing
+
+    def cluster_search(self, source, target=-1):
+        """
+        Dijkstra from the tile source restricted to its cluster, stopped at target if given.
+        Returns the {tile: distance} and {tile: previous tile} dicts.
+        """
+        offsets, neighbors, weights = self.graph.lists()
+        cluster_of = self.hierarchy.cluster
+        cluster = cluster_of(source)
+        distance = {source: 0}
+        previous = {source: -1}
+        done = set()
+        open_set = [(0, source)]
+        while open_set:
+            current_distance, current = heapq.heappop(open_set)
+            if current in done:
+                continue
+            done.add(current)
+            self.expanded += 1
+            if current == target:
+                break
+            for k in range(offsets[current], offsets[current+1]):
+                neighbor = neighbors[k]
+                value = current_distance + weights[k]
+                if value < distance.get(neighbor, inf) and cluster_of(neighbor) == cluster:
+                    distance[neighbor] = value
+                    previous[neighbor] = current
+                    heapq.heappush(open_set, (value, neighbor))
+        return {n: distance[n] for n in done}, previous
+
+    def refine(self, a, b):
+        """Tiles from abstract node a to abstract node b (excluding a), both ends in the same cluster or across a border."""
+        hierarchy = self.hierarchy
+        n, m = hierarchy.node_list[a], hierarchy.node_list[b]
+        if hierarchy.cluster(n) != hierarchy.cluster(m):
+            return [m]
+        if (a, b) not in self.refined:
+            _, previous = self.cluster_search(n, m)
+            tiles = []
+            while m != n:
+                tiles.append(m)
+                m = previous[m]
+            self.refined[(a, b)] = tiles[::-1]
+        return self.refined[(a, b)]
+
+    def heuristic(self, n, goal):
+        width = self.width
+        dx, dy = abs(n%width - goal%width), abs(n//width - goal//width)
+        return max(dx, dy) + (SQRT2 - 1)*min(dx, dy)
+
+    def search(self, start, goal):
+        """
+        Same contract as A_star: returns the list of (i, j) nodes from goal to start, or None.
+        """
+        mesh = self.mesh
+        if self.hierarchy is not mesh.hierarchy or self.hierarchy == None or self.graph is not mesh.graph:
+            self.bind_hierarchy()
+        hierarchy = self.hierarchy
+        width = self.width
+        self.expanded = 0
+
+        if max(abs(start[0] - goal[0]), abs(start[1] - goal[1])) <= hierarchy.cluster_size:
+            return self.fallback(start, goal)
+
+        start_n = start[0] + width*start[1]
+        goal_n = goal[0] + width*goal[1]
+        start_distance, start_previous = self.cluster_search(start_n)
+        goal_distance, goal_previous = self.cluster_search(goal_n) # the graph is undirected
+
+        self.generation += 1
+        generation = self.generation
+        g_score, came_from, seen, closed = self.g_score, self.came_from, self.seen, self.closed
+        nodes, node_x, node_y, adjacency = hierarchy.node_list, hierarchy.node_x, hierarchy.node_y, hierarchy.adjacency
+        goal_node = len(nodes)
+        goal_x, goal_y = goal
+        diagonal_gain = SQRT2 - 2 # octile distance = dx + dy + (sqrt(2) - 2)*min(dx, dy)
+
+        open_set = []
+        for a in hierarchy.cluster_nodes.get(hierarchy.cluster(start_n), ()):
+            if nodes[a] in start_distance:
+                g_score[a], came_from[a], seen[a] = start_distance[nodes[a]], -1, generation
+                heapq.heappush(open_set, (g_score[a] + self.heuristic(nodes[a], goal_n), a))
+        goal_entries = {a: goal_distance[nodes[a]] for a in hierarchy.cluster_nodes.get(hierarchy.cluster(goal_n), ())
+                        if nodes[a] in goal_distance}
+
+        while open_set:
+            _, current = heapq.heappop(open_set)
+            if current == goal_node:
+                return self.refine_path(start_n, goal_n, start_previous, goal_previous)
+            if closed[current] == generation:
+                continue
+            closed[current] = generation
+            self.expanded += 1
+
+            current_g = g_score[current]
+            if current in goal_entries:
+                tentative_g_score = current_g + goal_entries[current]
+                if seen[goal_node] != generation or tentative_g_score < g_score[goal_node]:
+                    seen[goal_node], came_from[goal_node], g_score[goal_node] = generation, current, tentative_g_score
+                    heapq.heappush(open_set, (tentative_g_score, goal_node))
+            for neighbor, weight in adjacency[current]:
+                if closed[neighbor] == generation:
+                    continue
+                tentative_g_score = current_g + weight
+                if seen[neighbor] != generation or tentative_g_score < g_score[neighbor]:
+                    seen[neighbor] = generation
+                    came_from[neighbor] = current
+                    g_score[neighbor] = tentative_g_score
+                    dx, dy = abs(node_x[neighbor] - goal_x), abs(node_y[neighbor] - goal_y)
+                    h = dx + dy + diagonal_gain*(dx if dx < dy else dy)
+                    heapq.heappush(open_set, (tentative_g_score + h, neighbor))
+
+        return None
+
+    def refine_path(self, start_n, goal_n, start_previous, goal_previous):
+        nodes, came_from = self.hierarchy.node_list, self.came_from
+        chain = [] # abstract nodes from the goal side to the start side
+        a = came_from[len(nodes)]
+        while a != -1:
+            chain.append(a)
+            a = came_from[a]
+        chain.reverse()
+
+        tiles = [] # from start to goal
+        n = nodes[chain[0]]
+        while n != -1: # start_previous leads back to the start
+            tiles.append(n)
+            n = start_previous[n]
+        tiles.reverse()
+        for a, b in zip(chain, chain[1:]):
+            tiles.extend(self.refine(a, b))
+        n = goal_previous[nodes[chain[-1]]] # goal_previous leads to the goal
+        while n != -1:
+            tiles.append(n)
+            n = goal_previous[n]
+
+        tiles = self.smooth(tiles)
+        width = self.width
+        return [(n%width, n//width) for n in reversed(tiles)]
+
+    def straight_walk(self, n, m):
+        """
+        Tiles after n of the walk from tile n to tile m along the straight line between them (diagonal
+        moves spread among the straight ones, so it costs the octile distance), None if it leaves the mesh.
+        """
+        if self.moves == None:
+            self.moves = (grid_edges(self.graph) @ (1 << np.arange(len(DIRECTIONS)))).tolist()
+        moves, width = self.moves, self.width
+        x0, y0 = n % width, n // width
+        dx, dy = m % width - x0, m // width - y0
+        steps = max(abs(dx), abs(dy))
+        walk = []
+        x, y = x0, y0
+        for k in range(1, steps + 1):
+            next_x, next_y = x0 + round(k*dx/steps), y0 + round(k*dy/steps)
+            if not moves[x + width*y] & MOVE_BITS[next_x - x, next_y - y]:
+                return None
+            x, y = next_x, next_y
+            walk.append(x + width*y)
+        return walk
+
+    def smooth(self, tiles):
+        """
+        Refinement pass over a path of tiles (start to goal): abstract paths go through the entrance
+        transitions, so wherever the straight walk between two tiles at most HPA_SMOOTHING_WINDOW apart
+        is cheaper than the path between them, it replaces it. From each tile the walks toward the next
+        tiles are tried in order until one is blocked, and the farthest one that is not is kept.
+        """
+        width = self.width
+        cost = [0.0] # cost of the path up to each tile
+        for n, m in zip(tiles, tiles[1:]):
+            cost.append(cost[-1] + (1 if abs(n - m) in (1, width) else SQRT2))
+
+        smoothed = [tiles[0]]
+        i = 0
+        while i < len(tiles) - 1:
+            shortcut, end = None, i + 1
+            x0, y0 = tiles[i] % width, tiles[i] // width
+            for j in range(i + 2, min(len(tiles), i + HPA_SMOOTHING_WINDOW + 1)):
+                dx, dy = abs(tiles[j] % width - x0), abs(tiles[j] // width - y0)
+                if cost[j] - cost[i] - (max(dx, dy) + (SQRT2 - 1)*min(dx, dy)) > 1e-9:
+                    walk = self.straight_walk(tiles[i], tiles[j])
+                    if walk == None:
+                        break # the farther walks would mostly be blocked too
+                    shortcut, end = walk, j
+            if shortcut != None:
+                smoothed.extend(shortcut)
+            else:
+                smoothed.append(tiles[end])
+            i = end
+        return smoothed
+
+    def fallback(self, start, goal):
+        engine = self.mesh.search_engine(ArrayAStar)
+        path = engine.search(start, goal)
+        self.expanded += engine.expanded
+        return path
+
+
+def hpa_star(start, goal, mesh):
+    return mesh.search_engine(HPAStar).search(start, goal)
@@ -0,0 +1,262 @@
+import heapq
+import math
+import numpy as np
+from .a_star import inf, ArrayAStar
+from .graph import TILE_FREE
+
+SQRT2 = math.sqrt(2)
+DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (1, -1), (-1, 1), (1, 1)] # same order as mesh_loader
+
+
+class JumpPointSearch():
+    """
+    Jump Point Search on the 8-connected uniform-cost grid of a NavMesh (cardinal weight 1,
+    diagonal sqrt(2), no corner cutting).
+
+    Instead of pushing every neighbor, the search jumps along straight and diagonal lines
+    and only stops on the goal or on tiles where an obstacle forces a turn, so of all the
+    symmetric paths between two tiles only one is explored. The returned path is made of
+    those jump points: consecutive points are joined by a straight or diagonal line of free tiles.
+
+    The grid is padded with a border of blocked tiles so that jumps never need bounds checks,
+    and the straight jumps are precomputed for every tile and direction when the graph is bound
+    (as in JPS+), so scanning a line costs O(1) however long the room is. Meshes whose graph is not exactly such a grid (the vents, edited meshes) fall back to ArrayAStar.
+    """
+    def __init__(self, mesh):
+        self.mesh = mesh
+        self.width = mesh.width
+        self.padded_width = mesh.width + 2
+        size = self.padded_width*(mesh.height + 2)
+
+        self.g_score = [inf]*size
+        self.came_from = [-1]*size
+        self.seen = [0]*size
+        self.closed = [0]*size
+        self.generation = 0
+
+        self.graph = None
+        self.walkable = None
+        self.straight_jumps = {} # keys: padded step, values: per tile jump length (see compute_straight_jumps)
+        self.uniform = False
+
+        self.expanded = 0 # jump points expanded during the last search
+
+    def bind_graph(self):
+        """
+        Reads the free tiles of the mesh and checks that its edges are exactly those of the
+        uniform grid JPS assumes.
+        """
+        graph = self.mesh.graph
+        self.graph = graph
+        width, height = graph.width, graph.height
+
+        free = (graph.tile_state == TILE_FREE).reshape(height, width)
+        padded = np.zeros((height + 2, width + 2), dtype=bool)
+        padded[1:-1, 1:-1] = free
+        self.walkable = padded.reshape(-1).tolist()
+
+        expected = []
+        for di, dj in DIRECTIONS:
+            mask = free & padded[1+dj:height+1+dj, 1+di:width+1+di]
+            if di and dj:
+                mask &= padded[1:-1, 1+di:width+1+di] & padded[1+dj:height+1+dj, 1:-1]
+            expected.append(mask.reshape(-1))
+        expected = np.stack(expected, axis=1)
+
+        degrees = np.diff(graph.offsets)
+        sources = np.repeat(np.arange(len(degrees), dtype=np.int64), degrees)
+        deltas = graph.neighbors - sources
+        actual = np.zeros_like(expected)
+        self.uniform = len(degrees) == width*height
+        for d, (di, dj) in enumerate(DIRECTIONS):
+            edges = deltas == di + width*dj
+            # the delta alone is ambiguous at the mesh borders, check the neighbor's column too
+            edges &= (graph.neighbors % width) - (sources % width) == di
+            weight = SQRT2 if di and dj else 1
+            self.uniform &= bool(np.all(np.abs(graph.weights[edges] - weight) < 1e-9))
+            actual[sources[edges], d] = True
+        self.uniform &= int(degrees.sum()) == int(expected.sum()) and bool(np.array_equal(actual, expected))
+
+        pw = self.padded_width
+        self.straight_jumps = {step: self.compute_straight_jumps(step, side) for step, side in ((1, pw), (-1, pw), (pw, 1), (-pw, 1))}
+
+    def compute_straight_jumps(self, step, side):
+        """
+        For every padded tile p, walking from p by step: the number of steps to the first tile with
+        a forced neighbor if there is one before a blocked tile, else minus the number of free tiles
+        walked before being blocked.
+        """
+        walkable = self.walkable
+        size = len(walkable)
+        jumps = [0]*size
+        # each tile depends on the next one along step, so visit them backwards
+        order = range(size - 1, -1, -1) if step > 0 else range(size)
+        for p in order:
+            q = p + step
+            if not (0 <= q < size) or not walkable[q]:
+                continue
+            if (walkable[q - side] and not walkable[p - side]) or (walkable[q + side] and not walkable[p + side]):
+                jumps[p] = 1
+            else:
+                next_jump = jumps[q]
+                jumps[p] = next_jump + 1 if next_jump > 0 else next_jump - 1
+        return jumps
+
+    def octile(self, p, goal):
+        pw = self.padded_width
+        dx = abs(p%pw - goal%pw)
+        dy = abs(p//pw - goal//pw)
+        return max(dx, dy) + (SQRT2 - 1)*min(dx, dy)
+
+    def jump_straight(self, p, step, goal):
+        """
+        Walks from p by step (horizontal or vertical) until the goal, a blocked tile (-1),
+        or a tile with a forced neighbor on either side, using the precomputed jump lengths.
+        """
+        jump = self.straight_jumps[step][p]
+        length = jump if jump > 0 else -jump
+        offset = goal - p
+        # the walked tiles never wrap to another row since the padding border is blocked
+        if offset*step > 0 and offset % step == 0 and offset // step <= length:
+            return goal
+        return p + jump*step if jump > 0 else -1
+
+    def jump_diagonal(self, p, step_x, step_y, goal):
+        walkable = self.walkable
+        while True:
+            p += step_x + step_y
+            if not walkable[p]:
+                return -1
+            if p == goal:
+                return p
+            if self.jump_straight(p, step_x, goal) != -1 or self.jump_straight(p, step_y, goal) != -1:
+                return p
+            if not (walkable[p + step_x] and walkable[p + step_y]): # no corner cutting
+                return -1
+
+    def successors(self, p, goal):
+        """Jump points reachable from p, pruning the neighbors the parent already covers."""
+        walkable = self.walkable
+        pw = self.padded_width
+        parent = self.came_from[p]
+
+        if parent == -1:
+            directions = []
+            for di, dj in DIRECTIONS:
+                if walkable[p + di + pw*dj] and (not (di and dj) or (walkable[p + di] and walkable[p + pw*dj])):
+                    directions.append((di, dj))
+        else:
+            di = (p%pw > parent%pw) - (p%pw < parent%pw)
+            dj = (p//pw > parent//pw) - (p//pw < parent//pw)
+            directions = []
+            if di and dj:
+                vertical, horizontal = walkable[p + pw*dj], walkable[p + di]
+                if vertical:
+                    directions.append((0, dj))
+                if horizontal:
+                    directions.append((di, 0))
+                if vertical and horizontal:
+                    directions.append((di, dj))
+            elif di:
+                down, up = walkable[p + pw], walkable[p - pw]
+                if walkable[p + di]:
+                    directions.append((di, 0))
+                    if down:
+                        directions.append((di, 1))
+                    if up:
+                        directions.append((di, -1))
+                if down:
+                    directions.append((0, 1))
+                if up:
+                    directions.append((0, -1))
+            else:
+                right, left = walkable[p + 1], walkable[p - 1]
+                if walkable[p + pw*dj]:
+                    directions.append((0, dj))
+                    if right:
+                        directions.append((1, dj))
+                    if left:
+                        directions.append((-1, dj))
+                if right:
+                    directions.append((1, 0))
+                if left:
+                    directions.append((-1, 0))
+
+        jump_points = []
+        for di, dj in directions:
+            if di and dj:
+                q = self.jump_diagonal(p, di, pw*dj, goal)
+            elif di:
+                q = self.jump_straight(p, di, goal)
+            else:
+                q = self.jump_straight(p, pw*dj, goal)
+            if q != -1:
+                jump_points.append(q)
+        return jump_points
+
+    def reconstruct_path(self, current):
+        pw = self.padded_width
+        came_from = self.came_from
+        total_path = [(current%pw - 1, current//pw - 1)]
+        while came_from[current] != -1:
+            current = came_from[current]
+            total_path.append((current%pw - 1, current//pw - 1))
+        return total_path
+
+    def search(self, start, goal):
+        """
+        Same contract as A_star: returns the jump points from goal to start, or None.
+        """
+        if self.graph is not self.mesh.graph:
+            self.bind_graph()
+        if not self.uniform:
+            engine = self.mesh.search_engine(ArrayAStar)
+            path = engine.search(start, goal)
+            self.expanded = engine.expanded
+            return path
+
+        pw = self.padded_width
+        start_p = (start[0] + 1) + pw*(start[1] + 1)
+        goal_p = (goal[0] + 1) + pw*(goal[1] + 1)
+
+        self.generation += 1
+        generation = self.generation
+        g_score, came_from, seen, closed = self.g_score, self.came_from, self.seen, self.closed
+
+        g_score[start_p] = 0
+        came_from[start_p] = -1
+        seen[start_p] = generation
+        self.expanded = 0
+
+        if start_p == goal_p:
+            return [start]
+        if not (self.walkable[start_p] and self.walkable[goal_p]):
+            return None
+
+        open_set = [(self.octile(start_p, goal_p), start_p)]
+        while open_set:
+            _, current = heapq.heappop(open_set)
+            if current == goal_p:
+                return self.reconstruct_path(current)
+
+            if closed[current] == generation:
+                continue
+            closed[current] = generation
+            self.expanded += 1
+
+            current_g = g_score[current]
+            for jump_point in self.successors(current, goal_p):
+                if closed[jump_point] == generation:
+                    continue
+                tentative_g_score = current_g + self.octile(current, jump_point)
+                if seen[jump_point] != generation or tentative_g_score < g_score[jump_point]:
+                    seen[jump_point] = generation
+                    came_from[jump_point] = current
+                    g_score[jump_point] = tentative_g_score
+                    heapq.heappush(open_set, (tentative_g_score + self.octile(jump_point, goal_p), jump_point))
+
+        return None
+
+
+def jump_point_search(start, goal, mesh):
+    return mesh.search_engine(JumpPointSearch).search(start, goal)
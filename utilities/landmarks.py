@@ -0,0 +1,167 @@
+import heapq
+import math
+import numpy as np
+from .a_star import inf, coordinate_to_index, index_to_coordinate
+from .graph import TILE_FREE
+
+ALT_LANDMARKS = 8 # number of landmark tiles
+
+
+def single_source_distances(graph, source):
+    """Dijkstra from the node id source over the whole graph, as a float32 array (inf where unreachable)."""
+    offsets, neighbors, weights = graph.lists()
+    distance = [math.inf]*(len(offsets) - 1)
+    distance[source] = 0
+    open_set = [(0, source)]
+    while open_set:
+        current_distance, current = heapq.heappop(open_set)
+        if current_distance > distance[current]:
+            continue
+        for k in range(offsets[current], offsets[current+1]):
+            neighbor = neighbors[k]
+            value = current_distance + weights[k]
+            if value < distance[neighbor]:
+                distance[neighbor] = value
+                heapq.heappush(open_set, (value, neighbor))
+    return np.array(distance, dtype=np.float32)
+
+
+class Landmarks():
+    """
+    ALT (A*, Landmarks, Triangle inequality) data of a mesh: a few landmark tiles and the distance
+    from each of them to every tile. For any landmark L, |d(L, goal) - d(L, n)| <= d(n, goal)
+    on an undirected graph, so the largest of these bounds is an admissible heuristic that, unlike
+    the straight line distance, accounts for the walls the path has to go around.
+
+    Built once when the nav mesh is generated and pickled with it.
+    """
+    def __init__(self, landmarks, distances):
+        self.landmarks = landmarks # (L,) int32 node ids
+        self.distances = distances # (L, width*height) float32, inf where unreachable
+
+    @classmethod
+    def build(cls, mesh, n_landmarks=ALT_LANDMARKS):
+        """
+        Picks the landmarks far from each other: the first one is the tile farthest from an arbitrary
+        free tile, and every next one the tile farthest from all the landmarks already chosen.
+        """
+        graph = mesh.graph
+        free = np.flatnonzero(graph.tile_state == TILE_FREE)
+        if len(free) == 0:
+            return cls(np.zeros(0, dtype=np.int32), np.zeros((0, len(graph.tile_state)), dtype=np.float32))
+
+        def farthest(distance):
+            return int(np.argmax(np.where(np.isfinite(distance), distance, -1)))
+
+        landmarks = [farthest(single_source_distances(graph, int(free[0])))]
+        distances = [single_source_distances(graph, landmarks[0])]
+        closest = distances[0].copy() # distance to the nearest landmark
+        while len(landmarks) < n_landmarks:
+            candidate = farthest(closest)
+            if closest[candidate] <= 0: # every reachable tile already is a landmark
+                break
+            landmarks.append(candidate)
+            distances.append(single_source_distances(graph, candidate))
+            np.minimum(closest, distances[-1], out=closest)
+
+        return cls(np.array(landmarks, dtype=np.int32), np.stack(distances))
+
+    def heuristics(self, goal):
+        """Lower bound of the distance from every node to the node id goal (0 where no landmark tells)."""
+        to_goal = self.distances[:, goal:goal+1]
+        known = np.isfinite(to_goal) & np.isfinite(self.distances)
+        with np.errstate(invalid='ignore'): # inf - inf, masked right after
+            bounds = np.where(known, np.abs(to_goal - self.distances), 0)
+        return bounds.max(axis=0) if len(bounds) else np.zeros(self.distances.shape[1], dtype=np.float32)
+
+    def nbytes(self):
+        return self.landmarks.nbytes + self.distances.nbytes
+
+
+class ALTAStar():
+    """
+    A* guided by the landmark bound of mesh.landmarks, combined with the straight line distance.
+    Both are admissible, so paths are optimal. Same preallocated buffers as ArrayAStar.
+    use_landmarks=False keeps only the straight line distance, for comparison.
+    """
+    use_landmarks = True
+
+    def __init__(self, mesh):
+        self.mesh = mesh
+        self.width = mesh.width
+
+        size = mesh.width*mesh.height
+        self.g_score = [inf]*size
+        self.came_from = [-1]*size
+        self.seen = [0]*size
+        self.closed = [0]*size
+        self.generation = 0
+
+        self.expanded = 0 # nodes expanded during the last search
+
+    def reconstruct_path(self, current):
+        width = self.width
+        came_from = self.came_from
+        total_path = [index_to_coordinate(current, width)]
+        while came_from[current] != -1:
+            current = came_from[current]
+            total_path.append(index_to_coordinate(current, width))
+        return total_path
+
+    def search(self, start, goal):
+        """
+        Same contract as A_star: returns the list of (i, j) nodes from goal to start, or None.
+        """
+        mesh = self.mesh
+        if self.use_landmarks and mesh.landmarks == None:
+            mesh.landmarks = Landmarks.build(mesh)
+
+        self.generation += 1
+        generation = self.generation
+        width = self.width
+        g_score, came_from, seen, closed = self.g_score, self.came_from, self.seen, self.closed
+        offsets, neighbors, weights = mesh.graph.lists()
+
+        start_n = coordinate_to_index(start[0], start[1], width)
+        goal_n = coordinate_to_index(goal[0], goal[1], width)
+        goal_i, goal_j = goal
+        landmark_bound = mesh.landmarks.heuristics(goal_n).tolist() if self.use_landmarks else None
+
+        def heuristic(n):
+            straight = math.hypot(n%width - goal_i, n//width - goal_j)
+            if landmark_bound == None:
+                return straight
+            return max(straight, landmark_bound[n])
+
+        g_score[start_n] = 0
+        came_from[start_n] = -1
+        seen[start_n] = generation
+
+        open_set = [(heuristic(start_n), start_n)]
+        self.expanded = 0
+
+        while open_set:
+            _, current = heapq.heappop(open_set)
+            if current == goal_n:
+                return self.reconstruct_path(current)
+
+            if closed[current] == generation:
+                continue
+            closed[current] = generation
+            self.expanded += 1
+
+            current_g = g_score[current]
+            for k in range(offsets[current], offsets[current+1]):
+                neighbor = neighbors[k]
+                tentative_g_score = current_g + weights[k]
+                if seen[neighbor] != generation or tentative_g_score < g_score[neighbor]:
+                    seen[neighbor] = generation
+                    came_from[neighbor] = current
+                    g_score[neighbor] = tentative_g_score
+                    heapq.heappush(open_set, (tentative_g_score + heuristic(neighbor), neighbor))
+
+        return None
+
+
+def alt_A_star(start, goal, mesh):
+    return mesh.search_engine(ALTAStar).search(start, goal)
@@ -12,7 +12,6 @@ Features:
 import pygame
 import os
 import sys
-import pickle
 import math
 
 # --- Path Setup ---
@@ -24,7 +23,7 @@ sys.path.append(project_root)
 try:
     from environment.map import Map
     from environment.walls import Wall
-    from environment.mesh_loader import generate
+    from utilities.vent_index import VentIndex
 except ImportError as e:
     print(f"Import Error: {e}")
     sys.exit(1)
@@ -38,7 +37,7 @@ MAP_NAME = "map5"
 MAP_WIDTH, MAP_HEIGHT = 3000, 3000
 MESH_DENSITY = 40
 EDGE_TOLERANCE = 0
-OUTPUT_FILE = f"maps/{MAP_NAME}/map.pkl"
+OUTPUT_FILE = f"maps/{MAP_NAME}/map.bin" # see utilities/map_format.py
 
 # Ensure directory exists
 os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
@@ -72,7 +71,8 @@ max_zoom = 5.0
 editor_map = Map(MAP_NAME, MAP_WIDTH, MAP_HEIGHT, MESH_DENSITY, EDGE_TOLERANCE)
 
 # Ensure structures exist
-if editor_map.vents_mesh.adjacency_map is None: editor_map.vents_mesh.adjacency_map = {}
+# Vents are edited as a plain dict and written to the (read-only, CSR backed) vent mesh on save
+vent_adjacency = {}
 if editor_map.vents_mesh.exits is None: editor_map.vents_mesh.exits = []
 # Ensure spawn exists if not loaded
 if not hasattr(editor_map, 'enemy_spawn') or editor_map.enemy_spawn is None:
@@ -142,12 +142,16 @@ def save_map():
     for r in drawn_rects:
         new_walls.append(Wall(r.x, r.y, r.width, r.height))
     editor_map.walls = new_walls
+
+    # 1b. Vents
+    editor_map.vents_mesh.adjacency_map = vent_adjacency
+    editor_map.vents_mesh.search_engine(VentIndex).update() # rebuilt for the new nodes and exits
+    editor_map.vents_mesh.routing_table() # saved with the map
     
     # 2. Generate Nav Mesh
     print(f"Generating Mesh (Density: {MESH_DENSITY})...")
     try:
-        editor_map.nav_mesh = generate(editor_map.size, editor_map.walls, MESH_DENSITY, EDGE_TOLERANCE)
-        editor_map.wall_corners = editor_map.init_wall_corners()
+        editor_map.nav_mesh = editor_map.generate_nav_mesh(MESH_DENSITY, EDGE_TOLERANCE) # also refreshes the game's mesh cache
         print("Mesh generated successfully.")
     except Exception as e:
         print(f"Error generating mesh: {e}")
@@ -155,11 +159,10 @@ def save_map():
 
     # 3. Save
     try:
-        with open(OUTPUT_FILE, 'wb') as f:
-            pickle.dump(editor_map, f)
+        editor_map.save(OUTPUT_FILE, precomputed=True)
         print(f"Map saved to '{OUTPUT_FILE}'")
     except Exception as e:
-        print(f"Error saving pickle: {e}")
+        print(f"Error saving map: {e}")
 
 # --- Main Loop ---
 running = True
@@ -206,16 +209,16 @@ while running:
                     i, j = to_grid(wx, wy)
                     # Check bounds
                     if 0 <= i < (MAP_WIDTH // MESH_DENSITY) and 0 <= j < (MAP_HEIGHT // MESH_DENSITY):
-                        if (i, j) in editor_map.vents_mesh.adjacency_map:
+                        if (i, j) in vent_adjacency:
                             # Remove node and clean up connections to it
-                            del editor_map.vents_mesh.adjacency_map[(i, j)]
+                            del vent_adjacency[(i, j)]
                             
                             # FIX: Clean up connections from neighbors using list comprehension
                             target_node = (i, j)
-                            for key in editor_map.vents_mesh.adjacency_map:
-                                neighbors = editor_map.vents_mesh.adjacency_map[key]
+                            for key in vent_adjacency:
+                                neighbors = vent_adjacency[key]
                                 # Filter out any edge where the neighbor node is the deleted node
-                                editor_map.vents_mesh.adjacency_map[key] = [
+                                vent_adjacency[key] = [
                                     edge for edge in neighbors if edge[0] != target_node
                                 ]
                                 
@@ -223,7 +226,7 @@ while running:
                             if (i, j) in editor_map.vents_mesh.exits:
                                 editor_map.vents_mesh.exits.remove((i, j))
                         else:
-                            editor_map.vents_mesh.adjacency_map[(i, j)] = []
+                            vent_adjacency[(i, j)] = []
 
             # --- VENT CONNECT MODE ---
             elif current_mode == "VENT_CONNECT":
@@ -231,7 +234,7 @@ while running:
                     i, j = to_grid(wx, wy)
                     node2 = (i, j)
 
-                    if node2 in editor_map.vents_mesh.adjacency_map:
+                    if node2 in vent_adjacency:
                         
                         if selected_vent_node is None:
                             selected_vent_node = node2
@@ -257,13 +260,13 @@ while running:
                                 # Create bidirectional link, replacing existing link if present
                                 
                                 # 1. Update Node 1 -> Node 2
-                                if edge_to_2 not in editor_map.vents_mesh.adjacency_map[node1]:
+                                if edge_to_2 not in vent_adjacency[node1]:
                                     # Ensure we don't duplicate a link
-                                    editor_map.vents_mesh.adjacency_map[node1].append(edge_to_2)
+                                    vent_adjacency[node1].append(edge_to_2)
                                 
                                 # 2. Update Node 2 -> Node 1
-                                if edge_to_1 not in editor_map.vents_mesh.adjacency_map[node2]:
-                                    editor_map.vents_mesh.adjacency_map[node2].append(edge_to_1)
+                                if edge_to_1 not in vent_adjacency[node2]:
+                                    vent_adjacency[node2].append(edge_to_1)
 
                                 selected_vent_node = None # Reset after link
                     else:
@@ -361,9 +364,9 @@ while running:
     pygame.draw.lines(screen, COLOR_MAP_BORDER, True, [tl, tr, br, bl], 2)
 
     # -- Draw Vent Connections (White Lines) --
-    if editor_map.vents_mesh.adjacency_map:
+    if vent_adjacency:
             drawn_edges = set()
-            for (i, j), weighted_neighbors in editor_map.vents_mesh.adjacency_map.items():
+            for (i, j), weighted_neighbors in vent_adjacency.items():
                 start_node = (i, j)
                 start_center = get_tile_center_world(i, j)
                 start_screen = to_screen(*start_center)
@@ -386,8 +389,8 @@ while running:
                     drawn_edges.add((start_node, end_node))
 
     # -- Draw Vent Nodes (Blue) --
-    if editor_map.vents_mesh.adjacency_map:
-        for (i, j) in editor_map.vents_mesh.adjacency_map.keys():
+    if vent_adjacency:
+        for (i, j) in vent_adjacency.keys():
             world_x = i * MESH_DENSITY
             world_y = j * MESH_DENSITY
             screen_x, screen_y = to_screen(world_x, world_y)
@@ -447,7 +450,7 @@ while running:
 
     # -- UI Info --
     font = pygame.font.SysFont("Arial", 18)
-    info_text = f"Zoom: {camera_zoom:.2f} | Walls: {len(drawn_rects)} | Vents: {len(editor_map.vents_mesh.adjacency_map)} | Exits: {len(editor_map.vents_mesh.exits)}"
+    info_text = f"Zoom: {camera_zoom:.2f} | Walls: {len(drawn_rects)} | Vents: {len(vent_adjacency)} | Exits: {len(editor_map.vents_mesh.exits)}"
     text_surf = font.render(info_text, True, (255, 255, 255))
     screen.blit(text_surf, (20, 10))
     
@@ -0,0 +1,148 @@
+"""
+Binary map file (maps/<name>/map.bin), read without pickle, pygame or any game class.
+
+Layout, all integers little-endian:
+
+    header          8s magic (MAP_FILE_MAGIC), uint32 format version, uint32 number of sections
+    section table   one SECTION_ENTRY per section:
+                        32s name, 8s dtype (numpy dtype string, or 'json'), uint32 ndim,
+                        4 x uint64 shape (unused dimensions are 0), uint64 offset, uint64 size in bytes
+    data            the sections, each one starting at its offset (a multiple of SECTION_ALIGNMENT,
+                    so that arrays can be used in place from a memory map of the file)
+
+An array section holds the raw C-ordered bytes of the array, a 'json' section a UTF-8 JSON
+document. Readers skip the sections they do not know and can read a single section through
+its offset, so sections can be added without breaking older files.
+
+Sections written by Map.save (see environment/map.py):
+
+    settings            json: name, size, mesh_density, edge_tolerance, player_spawn, enemy_spawn, vent_density
+                        (settings.txt, when the map has one, overrides the mesh settings and spawns)
+    walls               int32 (W, 4): x, y, width, height of every wall
+    vent_nodes          int32 (V, 2): (i, j) of every vent node
+    vent_edges          int32 (E, 2): indices in vent_nodes of the ends of every directed vent edge
+    vent_weights        float64 (E,): length in pixels of every vent edge
+    vent_exits          int32 (X, 2): (i, j) of every vent exit
+    vent_distance       float64 (V, V), optional: VentRoutes distances
+    vent_next_hop       int32 (V, V), optional: VentRoutes next hops
+    nav_mesh            json, optional: nav mesh cache key, width, height, density, edge_tolerance
+    nav_mesh_tile_state, nav_mesh_offsets, nav_mesh_neighbors, nav_mesh_weights, nav_mesh_components
+                        optional: the CSRGraph arrays and component ids of the nav mesh
+    nav_mesh_hierarchy  json, optional: cluster size of the HPA* ClusterHierarchy
+    nav_mesh_hierarchy_nodes, nav_mesh_hierarchy_offsets, nav_mesh_hierarchy_neighbors, nav_mesh_hierarchy_weights
+                        optional: its abstract graph
+    nav_mesh_landmarks, nav_mesh_landmark_distances
+                        optional: the ALT Landmarks
+    pvs                 json, optional: cache key, width, height, density of the PVS
+    pvs_rows            int32, optional: PotentiallyVisibleSet bitset row of every tile, -1 for none
+    pvs_bits            uint8, optional: PotentiallyVisibleSet bitsets
+
+The nav mesh and PVS caches of a map (maps/<name>/navmesh.bin and pvs.bin) are files of the same
+format holding only the nav_mesh* or pvs* sections.
+"""
+
+import os
+import json
+import struct
+import tempfile
+import numpy as np
+
+MAP_FILE_MAGIC = b'A2DMAP\0\0'
+MAP_FORMAT_VERSION = 1 # bump on any change a reader of the previous version would misread
+HEADER = struct.Struct('<8sII')
+SECTION_ENTRY = struct.Struct('<32s8sI4QQQ')
+SECTION_ALIGNMENT = 8
+
+
+class MapFormatError(Exception):
+    pass
+
+
+def write_map_file(path, sections):
+    """
+    Writes the {name: numpy array | json-serializable object} sections to path, atomically: the
+    file at path is replaced, never modified in place.
+    """
+    entries, blobs = [], []
+    offset = HEADER.size + SECTION_ENTRY.size*len(sections)
+    for name, value in sections.items():
+        offset += -offset % SECTION_ALIGNMENT
+        if isinstance(value, np.ndarray):
+            array = np.ascontiguousarray(value)
+            dtype = array.dtype.newbyteorder('<') if array.dtype.byteorder == '>' else array.dtype
+            blob = array.astype(dtype, copy=False).tobytes()
+            shape = list(array.shape) + [0]*(4 - array.ndim)
+            entries.append(SECTION_ENTRY.pack(name.encode(), dtype.str.encode(), array.ndim, *shape, offset, len(blob)))
+        else:
+            blob = json.dumps(value).encode()
+            entries.append(SECTION_ENTRY.pack(name.encode(), b'json', 0, 0, 0, 0, 0, offset, len(blob)))
+        blobs.append((offset, blob))
+        offset += len(blob)
+
+    # Written next to the target then renamed over it: processes that memory mapped the previous
+    # file keep reading it (truncating it in place would crash them with SIGBUS)
+    directory, name = os.path.split(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f'.{name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(HEADER.pack(MAP_FILE_MAGIC, MAP_FORMAT_VERSION, len(sections)))
+            for entry in entries:
+                file.write(entry)
+            for offset, blob in blobs:
+                file.write(b'\0'*(offset - file.tell()))
+                file.write(blob)
+            file.flush()
+            os.fsync(file.fileno())
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(temp_path, 0o666 & ~umask) # mkstemp creates the file readable by its owner only
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def read_section_table(file):
+    """Returns {name: (dtype, shape, offset, size)} of the file opened in binary mode."""
+    magic, version, count = HEADER.unpack(file.read(HEADER.size))
+    if magic != MAP_FILE_MAGIC:
+        raise MapFormatError(f"not a map file (magic {magic!r})")
+    if version > MAP_FORMAT_VERSION:
+        raise MapFormatError(f"map file version {version} is newer than the supported version {MAP_FORMAT_VERSION}")
+
+    table = {}
+    for _ in range(count):
+        name, dtype, ndim, *rest = SECTION_ENTRY.unpack(file.read(SECTION_ENTRY.size))
+        shape, offset, size = tuple(rest[:ndim]), rest[4], rest[5]
+        table[name.rstrip(b'\0').decode()] = (dtype.rstrip(b'\0').decode(), shape, offset, size)
+    return table
+
+
+def read_map_file(path, names=None, mmap=False):
+    """
+    Returns the {name: numpy array | object} sections of the file, only those in names if given.
+
+    With mmap=True the arrays are views of one copy-on-write memory map of the file: nothing is
+    copied, pages are only read from disk when touched and are shared by every process mapping
+    the same file, and writing to an array only changes this process's copy.
+    """
+    sections = {}
+    with open(path, 'rb') as file:
+        table = read_section_table(file)
+        # plain ndarray views of the memmap: same memory, without the memmap subclass overhead on indexing
+        data = np.memmap(file, dtype=np.uint8, mode='c').view(np.ndarray) if mmap else None
+        for name, (dtype, shape, offset, size) in table.items():
+            if names != None and name not in names:
+                continue
+            if mmap:
+                blob = data[offset:offset+size]
+            else:
+                file.seek(offset)
+                blob = bytearray(file.read(size)) # writable, like the memory mapped arrays
+            if dtype == 'json':
+                sections[name] = json.loads(bytes(blob).decode())
+            elif mmap:
+                sections[name] = blob.view(np.dtype(dtype)).reshape(shape)
+            else:
+                sections[name] = np.frombuffer(blob, dtype=np.dtype(dtype)).reshape(shape)
+    return sections
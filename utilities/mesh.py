@@ -1,9 +1,20 @@
-from .a_star import A_star
-from .geometry import euclidian_distance
+from .path_backends import PATH_BACKENDS
+from .graph import CSRGraph, AdjacencyView
+from .path_cache import PathCache
+from .flow_field import FlowField, FLOW_FIELD_MIN_CHASERS
+from .string_pulling import StringPuller
+from .tile_sampler import TileSampler
+from .vent_index import VentIndex
+from .vent_routes import VentRoutes
 import pygame
 import random as rd
 
 class Mesh():
+    default_path_backend = 'ARRAY_A_STAR' # key of utilities.path_backends.PATH_BACKENDS, see path_backend
+    hierarchy = None # utilities.hpa.ClusterHierarchy of the graph, built with the nav mesh (or on first HPA* search)
+    landmarks = None # utilities.landmarks.Landmarks of the graph, built with the nav mesh (or on first ALT search)
+    components = None # connected component id of every node, built with the nav mesh (or on first use)
+
     def __init__(self, size, width, height, density):
         self.size = size
         self.width = width
@@ -11,22 +22,127 @@ class Mesh():
         self.density = density
         self.adjacency_map = {}
 
-    def random_tile(self, entity, range): # /!\ has to be optimized, especially for bigger maps
-        inf, sup = range
-        x, y = entity.x_pos, entity.y_pos
+    @property
+    def adjacency_map(self):
+        """
+        Read-only {(i, j): [((i, j), weight), ...] | [] | None} view of self.graph.
+        To modify the mesh, assign a whole dict: it is converted to a CSRGraph.
+        """
+        return self._adjacency_view
+
+    @adjacency_map.setter
+    def adjacency_map(self, adjacency_map):
+        self.set_graph(CSRGraph.from_adjacency_map(adjacency_map, self.width, self.height))
+        self.hierarchy = None
+        self.landmarks = None
+        self.components = None
+
+    @property
+    def path_backend(self):
+        """Key of utilities.path_backends.PATH_BACKENDS searching this mesh, default_path_backend unless set."""
+        return getattr(self, '_path_backend', self.default_path_backend)
+
+    @path_backend.setter
+    def path_backend(self, backend):
+        if backend != self.path_backend:
+            self.path_cache.clear() # the cached paths were found by the previous backend
+        self._path_backend = backend
+
+    def set_graph(self, graph):
+        self.graph = graph
+        self._adjacency_view = AdjacencyView(graph)
+        self._search_engines = {}
+        self.path_cache = PathCache() # paths of the previous graph are no longer valid
+        self.chase_goals = {} # keys: id of an entity chasing a tile, values: that tile (i, j)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_adjacency_view', None)
+        state.pop('_search_engines', None) # preallocated search buffers are rebuilt on demand
+        state.pop('path_cache', None)
+        state.pop('chase_goals', None)
+        return state
+
+    def __setstate__(self, state):
+        adjacency_map = state.pop('adjacency_map', None) # meshes pickled before the CSR graph
+        graph = state.pop('graph', None)
+        self.__dict__.update(state)
+        if graph == None:
+            graph = CSRGraph.from_adjacency_map(adjacency_map or {}, self.width, self.height)
+        self.set_graph(graph)
+
+    def search_engine(self, engine_class):
+        """
+        Returns the engine of the given class bound to this mesh, creating it on first use
+        so its preallocated buffers are shared by every search on the mesh.
+        """
+        engine = self._search_engines.get(engine_class)
+        if engine == None:
+            engine = engine_class(self)
+            self._search_engines[engine_class] = engine
+        return engine
 
-        n = len(self.adjacency_map)
+    def set_edge_costs(self, edges):
+        """
+        Changes the weight of existing edges, given as ((i, j), (i, j), weight) triples, and lets
+        the incremental search engines repair their state instead of starting over.
+        """
+        width = self.width
+        heads = []
+        for (i1, j1), (i2, j2), weight in edges:
+            head = i2 + width*j2
+            if self.graph.set_weight(i1 + width*j1, head, weight):
+                heads.append(head)
+
+        self.path_cache.clear()
+        self.hierarchy = None # intra-cluster and landmark distances may have changed
+        self.landmarks = None
+        self.components = None # an infinite weight may have cut the graph
+        for engine in self._search_engines.values():
+            if hasattr(engine, 'change_edge_costs'):
+                engine.change_edge_costs(heads)
+
+    def component_ids(self):
+        """Connected component id of every node (see CSRGraph.connected_components)."""
+        if self.components is None:
+            self.components = self.graph.connected_components()
+        return self.components
+
+    def component(self, i, j=None):
+        """Connected component id of the tile (i, j), -1 if it has no edges."""
+        if j == None:
+            i, j = i
+        return int(self.component_ids()[i + self.width*j])
 
-        keys_list = list(self.adjacency_map.keys())
+    def reachable(self, start, goal):
+        """O(1) check that a path exists between the tiles start and goal."""
+        return start == goal or self.component(start) == self.component(goal) != -1
 
-        rand_i, rand_j = keys_list[rd.randint(0, n-1)]
-        rand_x, rand_y = self.position(rand_i, rand_j)
+    def find_path(self, start, goal):
+        """
+        Path from start to goal ordered goal -> start (None if unreachable), served by
+        self.path_cache when possible, otherwise searched with the mesh's backend.
+        """
+        found, path = self.path_cache.get(start, goal)
+        if found:
+            return path
 
-        while (not inf < euclidian_distance((x, y), (rand_x, rand_y)) < sup) or not self.adjacency_map[(rand_i, rand_j)]:
-            rand_i, rand_j = keys_list[rd.randint(0, n-1)]
-            rand_x, rand_y = self.position(rand_i, rand_j)
+        path = self.search_path(start, goal)
+        self.path_cache.put(start, goal, list(path) if path != None else None)
+        return path
 
-        return rand_x, rand_y
+    def search_path(self, start, goal):
+        """Always runs the search, bypassing the path cache."""
+        return PATH_BACKENDS[self.path_backend](start, goal, self)
+
+    def random_tile(self, entity, range):
+        """
+        Center (x, y) of an accessible tile reachable from the entity, drawn uniformly among those whose
+        center is strictly between range[0] and range[1] pixels from it (any reachable tile if there is none).
+        """
+        tile = self.closest_accessible_tile(self.nearest_node(entity.x_pos, entity.y_pos))
+        component = self.component(tile) if tile != None else None
+        return self.search_engine(TileSampler).sample(entity.x_pos, entity.y_pos, range, component)
 
     def nearest_node(self, pos_x, pos_y=None):
         """
@@ -111,7 +227,15 @@ class NavMesh(Mesh):
         super().__init__(size, width, height, density)
         self.edge_tolerance = edge_tolerance
 
-    def compute_path(self, entity1, pos):
+    def compute_path(self, entity1, pos, chase=False):
+        """
+        Path from pos back to the entity (popped from the end), None if unreachable. The path is
+        string-pulled: it only keeps its corners, each one reachable in a straight line from the next,
+        and ends with the entity's own position unless it stands on an unaccessible tile.
+        With chase=True the entity is registered as chasing pos: when at least FLOW_FIELD_MIN_CHASERS
+        entities chase the same tile, the path is read from the FlowField toward it that they share,
+        otherwise it is searched for this entity like any other path (through the path cache).
+        """
         start = self.nearest_node((entity1.x_pos, entity1.y_pos))
         end = self.nearest_node(pos)
         is_on_unaccessible_tile = False
@@ -123,13 +247,29 @@ class NavMesh(Mesh):
         if not self.adjacency_map[end]:
             end = self.closest_accessible_tile(end)
 
-        path = A_star(start, end, self)
+        if chase and end != None:
+            self.chase_goals[id(entity1)] = end
+        else:
+            self.chase_goals.pop(id(entity1), None)
+
+        if start == None or end == None or not self.reachable(start, end): # no search could find a path
+            return is_on_unaccessible_tile, None
+
+        if chase and sum(goal == end for goal in self.chase_goals.values()) >= FLOW_FIELD_MIN_CHASERS:
+            path = self.search_engine(FlowField).search(start, end)
+        else:
+            path = self.find_path(start, end)
         if path != None: 
-            return is_on_unaccessible_tile, list(map(lambda node: self.position(node[0], node[1]), path))
+            path = list(map(lambda node: self.position(node[0], node[1]), path))
+            if not is_on_unaccessible_tile:
+                path[-1] = (entity1.x_pos, entity1.y_pos) # pull the string from the entity itself
+            return is_on_unaccessible_tile, self.search_engine(StringPuller).pull(path)
         else:
             return is_on_unaccessible_tile, None
 
 class VentMesh(Mesh):
+    routes = None # utilities.vent_routes.VentRoutes of the graph, built on map load and stored in the map file
+
     def __init__(self, size, width, height, density):
         super().__init__(size, width, height, density)
         self.nodes = {} # keys: coordinates of nodes, values: list of connected nodes (i, j)
@@ -137,18 +277,28 @@ class VentMesh(Mesh):
 
     def compute_path(self, entity1, point):
         """
-        Computes a path from the entity's current position to the target point using A* on the vent mesh.
+        Computes a path from the entity's current position to the target point by walking the vent routing table.
         Returns a list of continuous (x, y) positions representing the path, starting with the target point.
         """
         path_start = self.get_closest_vent_node(self.nearest_node(entity1.x_pos, entity1.y_pos))
         path_end = self.get_closest_vent_node(self.nearest_node(point))
 
-        path = A_star(path_start, path_end, self)
+        path = self.route(path_start, path_end) if path_start != None and path_end != None else None
         if path != None: 
             return [point] + list(map(lambda node: self.position(node[0], node[1]), path))
         else:
             return None
         
+    def routing_table(self):
+        """The VentRoutes of the current graph, (re)built if it is missing or was built for other vents."""
+        if self.routes == None or not self.routes.built_for(self.graph):
+            self.routes = VentRoutes.build(self.graph)
+        return self.routes
+
+    def route(self, start, goal):
+        """Same contract as find_path, read from the routing table without any search."""
+        return self.routing_table().path(start, goal, self.width)
+
     def get_closest_vent_node(self, i, j=None):
         """
         Finds the nearest valid vent node (key in adjacency_map) to the given 
@@ -157,24 +307,12 @@ class VentMesh(Mesh):
         if j == None:
             i, j = i
 
-        if not self.adjacency_map:
-            return None
-        
-        current_best_node = None
-        min_dist_sq = float('inf')
+        nodes = self.get_closest_vent_nodes((i, j), 1)
+        return nodes[0] if nodes else None
 
-        start_node = (i, j)
-        
-        # Iterate over all defined vent nodes
-        for node in self.adjacency_map.keys():
-            # Calculate squared Euclidean distance in grid space
-            dist_sq = (node[0] - start_node[0])**2 + (node[1] - start_node[1])**2
-            
-            if dist_sq < min_dist_sq:
-                min_dist_sq = dist_sq
-                current_best_node = node
-                
-        return current_best_node
+    def get_closest_vent_nodes(self, node, k):
+        """The k vent nodes nearest to the grid index node, nearest first (see utilities.vent_index)."""
+        return self.search_engine(VentIndex).closest_nodes(node, k)
 
     def get_closest_vent_access(self, pos_x, pos_y=None):
         """
@@ -183,23 +321,12 @@ class VentMesh(Mesh):
         if pos_y == None:
             pos_x, pos_y = pos_x
 
-        if not self.exits:
-            return None
-        
-        current_best_exit = None
-        min_dist_sq = float('inf')
-
-        # Iterate over all defined vent exits
-        for exit_point in self.exits:
-            # Calculate squared Euclidean distance
-            exit_point = self.position(exit_point)
-            dist_sq = (exit_point[0] - pos_x)**2 + (exit_point[1] - pos_y)**2
-            
-            if dist_sq < min_dist_sq:
-                min_dist_sq = dist_sq
-                current_best_exit = exit_point
-                
-        return (current_best_exit)
+        exits = self.get_closest_vent_accesses((pos_x, pos_y), 1)
+        return exits[0] if exits else None
+
+    def get_closest_vent_accesses(self, position, k):
+        """The (x, y) positions of the k vent exits nearest to position, nearest first."""
+        return self.search_engine(VentIndex).closest_exits(position, k)
 
     def random_point(self):
         """Returns a random coordinate (x, y) situated exactly on a vent line."""
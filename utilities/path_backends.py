@@ -0,0 +1,17 @@
+from .a_star import A_star, array_A_star
+from .d_star_lite import d_star_lite
+from .jps import jump_point_search
+from .hpa import hpa_star
+from .landmarks import alt_A_star
+from .flow_field import flow_field
+
+# Backends selectable through Mesh.path_backend
+PATH_BACKENDS = {
+    'A_STAR': A_star,
+    'ARRAY_A_STAR': array_A_star,
+    'D_STAR_LITE': d_star_lite,
+    'JPS': jump_point_search,
+    'HPA_STAR': hpa_star,
+    'ALT_A_STAR': alt_A_star,
+    'FLOW_FIELD': flow_field,
+}
@@ -0,0 +1,83 @@
+from collections import OrderedDict
+
+PATH_CACHE_SIZE = 256 # number of (start, goal) paths kept per mesh
+
+
+class PathCache():
+    """
+    LRU cache of the paths found on a mesh, keyed by (start tile, goal tile).
+
+    Paths are stored as returned by the search backends, ordered goal -> start. A query whose
+    start lies on a cached path to the same goal is answered by splicing that path: the part
+    from the goal up to the new start is itself a path between the two tiles.
+    The cache only holds results for one graph: the mesh clears it when its graph is replaced.
+    """
+    def __init__(self, capacity=PATH_CACHE_SIZE):
+        self.capacity = capacity
+        self.paths = OrderedDict() # keys: (start, goal), values: path or None, most recently used last
+        self.by_goal = {} # keys: goal, values: {start: {node: index in the path}} of the cached paths
+
+        self.hits = 0
+        self.splices = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def clear(self):
+        self.paths.clear()
+        self.by_goal.clear()
+
+    def get(self, start, goal):
+        """
+        Returns (True, path) if the path from start to goal can be answered from the cache, else (False, None).
+        The returned path is a new list, callers are free to modify it.
+        """
+        key = (start, goal)
+        if key in self.paths:
+            self.paths.move_to_end(key)
+            self.hits += 1
+            path = self.paths[key]
+            return True, (list(path) if path != None else None)
+
+        for cached_start, nodes in self.by_goal.get(goal, {}).items():
+            index = nodes.get(start)
+            if index != None:
+                self.paths.move_to_end((cached_start, goal))
+                self.splices += 1
+                return True, self.paths[(cached_start, goal)][:index+1]
+
+        self.misses += 1
+        return False, None
+
+    def put(self, start, goal, path):
+        key = (start, goal)
+        self.paths[key] = path
+        self.paths.move_to_end(key)
+        if path != None:
+            self.by_goal.setdefault(goal, {})[start] = {node: index for index, node in enumerate(path)}
+        else:
+            self.forget_splices(start, goal) # a path previously cached for the key must not be spliced anymore
+
+        while len(self.paths) > self.capacity:
+            (old_start, old_goal), _ = self.paths.popitem(last=False)
+            self.evictions += 1
+            self.forget_splices(old_start, old_goal)
+
+    def forget_splices(self, start, goal):
+        """Stops answering queries to goal by splicing the path cached for (start, goal)."""
+        starts = self.by_goal.get(goal)
+        if starts != None:
+            starts.pop(start, None)
+            if not starts:
+                del self.by_goal[goal]
+
+    def stats(self):
+        queries = self.hits + self.splices + self.misses
+        return {
+            'size': len(self.paths),
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'splices': self.splices,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': (self.hits + self.splices) / queries if queries else 0,
+        }
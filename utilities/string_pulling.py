@@ -0,0 +1,87 @@
+import math
+from .graph import TILE_FREE
+
+
+class StringPuller():
+    """
+    Straightens the paths of a grid mesh once, when they are computed, instead of checking every
+    frame which of the next waypoints can be reached in a straight line.
+
+    Line of sight is walked on the tile grid: a segment is clear when every tile it crosses is
+    free, and when it passes exactly through a tile corner both tiles beside the corner must be
+    free too, as the mesh edges never cut corners either.
+    """
+    def __init__(self, mesh):
+        self.mesh = mesh
+        self.graph = None
+        self.walkable = None
+        self.checks = 0 # segments walked during the last pull
+
+    def bind_graph(self):
+        self.graph = self.mesh.graph
+        self.walkable = (self.graph.tile_state == TILE_FREE).tolist()
+
+    def is_walkable(self, i, j):
+        mesh = self.mesh
+        return 0 <= i < mesh.width and 0 <= j < mesh.height and self.walkable[i + mesh.width*j]
+
+    def segment_clear(self, p, q):
+        """Whether the segment between the pixel positions p and q only crosses free tiles."""
+        density = self.mesh.density
+        x0, y0 = p[0]/density, p[1]/density
+        x1, y1 = q[0]/density, q[1]/density
+        i, j = math.floor(x0), math.floor(y0)
+        i_end, j_end = math.floor(x1), math.floor(y1)
+        if not self.is_walkable(i, j):
+            return False
+
+        dx, dy = x1 - x0, y1 - y0
+        step_i = 1 if dx > 0 else -1
+        step_j = 1 if dy > 0 else -1
+        # parameter t along the segment at which the next vertical/horizontal tile border is crossed
+        t_x = ((i + (dx > 0)) - x0)/dx if dx else math.inf
+        t_y = ((j + (dy > 0)) - y0)/dy if dy else math.inf
+        delta_x = abs(1/dx) if dx else math.inf
+        delta_y = abs(1/dy) if dy else math.inf
+
+        for _ in range(abs(i_end - i) + abs(j_end - j)):
+            if (i, j) == (i_end, j_end):
+                break
+            if abs(t_x - t_y) < 1e-9: # through a corner
+                if not (self.is_walkable(i + step_i, j) and self.is_walkable(i, j + step_j)):
+                    return False
+                i += step_i
+                j += step_j
+                t_x += delta_x
+                t_y += delta_y
+            elif t_x < t_y:
+                i += step_i
+                t_x += delta_x
+            else:
+                j += step_j
+                t_y += delta_y
+            if not self.is_walkable(i, j):
+                return False
+        return True
+
+    def pull(self, path):
+        """
+        Keeps only the corners of a path of pixel positions ordered goal -> start (as returned by
+        NavMesh.compute_path): every kept point can be walked to in a straight line from the previous one.
+        """
+        if self.graph is not self.mesh.graph:
+            self.bind_graph()
+        self.checks = 0
+        if len(path) <= 2:
+            return list(path)
+
+        corners = [path[-1]]
+        anchor = path[-1]
+        for k in range(len(path) - 2, 0, -1):
+            self.checks += 1
+            if not self.segment_clear(anchor, path[k-1]):
+                anchor = path[k]
+                corners.append(anchor)
+        corners.append(path[0])
+        corners.reverse()
+        return corners
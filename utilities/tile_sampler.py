@@ -0,0 +1,85 @@
+import random as rd
+import numpy as np
+from .graph import TILE_FREE
+
+SAMPLER_CELL_SIZE = 8 # side of the cells of the spatial index, in tiles
+
+
+class TileSampler():
+    """
+    Uniform sampling of the accessible tiles of a mesh whose center lies within a distance band
+    of a point, in bounded time.
+
+    The accessible tiles are listed once per graph and bucketed by square cells of
+    SAMPLER_CELL_SIZE tiles, sorted by cell row then column, so the tiles of the cells of a row
+    that overlap the band's bounding box are one contiguous slice. A query only filters those
+    candidates (with numpy) and picks one of the survivors.
+    """
+    def __init__(self, mesh):
+        self.mesh = mesh
+        self.graph = None
+
+    def bind_graph(self):
+        mesh = self.mesh
+        self.graph = mesh.graph
+        width, density = mesh.width, mesh.density
+
+        free = np.flatnonzero(self.graph.tile_state == TILE_FREE)
+        i, j = free % width, free // width
+        self.cells_x = -(-width // SAMPLER_CELL_SIZE)
+        self.cells_y = -(-mesh.height // SAMPLER_CELL_SIZE)
+        cells = (j // SAMPLER_CELL_SIZE)*self.cells_x + i // SAMPLER_CELL_SIZE
+        order = np.argsort(cells, kind='stable')
+
+        self.tiles = free[order] # node ids of the accessible tiles, grouped by cell
+        self.x = (density*i + density//2)[order].astype(np.float64) # tile centers, as in Mesh.position
+        self.y = (density*j + density//2)[order].astype(np.float64)
+        self.components = None # component id of each of those tiles, read from mesh.components on first use
+        self.components_source = None
+        self.cell_offsets = np.zeros(self.cells_x*self.cells_y + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cells, minlength=self.cells_x*self.cells_y), out=self.cell_offsets[1:])
+
+    def candidates(self, x, y, radius):
+        """Indices (into self.tiles) of the tiles of the cells overlapping the square of half side radius around (x, y)."""
+        cell_pixels = SAMPLER_CELL_SIZE*self.mesh.density
+        ci0 = max(0, int((x - radius) // cell_pixels))
+        ci1 = min(self.cells_x - 1, int((x + radius) // cell_pixels))
+        cj0 = max(0, int((y - radius) // cell_pixels))
+        cj1 = min(self.cells_y - 1, int((y + radius) // cell_pixels))
+        if ci0 > ci1 or cj0 > cj1:
+            return np.zeros(0, dtype=np.int64)
+
+        offsets = self.cell_offsets
+        rows = [np.arange(offsets[cj*self.cells_x + ci0], offsets[cj*self.cells_x + ci1 + 1]) for cj in range(cj0, cj1 + 1)]
+        return np.concatenate(rows)
+
+    def in_band(self, x, y, band):
+        """Indices (into self.tiles) of the tiles whose center is strictly between band[0] and band[1] from (x, y)."""
+        if self.graph is not self.mesh.graph:
+            self.bind_graph()
+        inf, sup = band
+        candidates = self.candidates(x, y, sup)
+        distances = np.hypot(self.x[candidates] - x, self.y[candidates] - y)
+        return candidates[(inf < distances) & (distances < sup)]
+
+    def sample(self, x, y, band, component=None):
+        """
+        Center (x, y) of an accessible tile drawn uniformly in the band, or of any accessible tile
+        if the band holds none. With a component id, only the tiles of that connected component
+        are drawn. None if there is no such tile at all.
+        """
+        indices = self.in_band(x, y, band)
+        if component != None:
+            components = self.mesh.component_ids()
+            if self.components_source is not components:
+                self.components_source = components
+                self.components = components[self.tiles]
+            indices = indices[self.components[indices] == component]
+        if len(indices) == 0:
+            indices = np.arange(len(self.tiles))
+            if component != None:
+                indices = indices[self.components == component]
+            if len(indices) == 0:
+                return None
+        k = int(indices[rd.randrange(len(indices))])
+        return int(self.x[k]), int(self.y[k])
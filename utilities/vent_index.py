@@ -0,0 +1,113 @@
+import heapq
+import numpy as np
+
+KD_TREE_MIN_POINTS = 48 # below this many points a scan of the list is faster than walking a tree (see benchmark.py vent_index)
+
+class KDTree():
+    """
+    2-d tree over a list of points, for exact nearest and k-nearest neighbor queries.
+    Ties are broken by the position of the points in the list, so the nearest point is the
+    one a scan of the list keeping the first strictly closer point would return.
+    Lists of fewer than KD_TREE_MIN_POINTS points get no tree and are scanned instead.
+    """
+    def __init__(self, points):
+        self.points = list(points)
+        self.root = None
+        if len(self.points) >= KD_TREE_MIN_POINTS:
+            self.root = self.build(list(range(len(self.points))), 0)
+
+    def build(self, indices, depth):
+        """Nodes are (index of the point, axis, left subtree, right subtree), None for an empty subtree."""
+        if not indices:
+            return None
+        axis = depth % 2
+        points = self.points
+        indices.sort(key=lambda k: (points[k][axis], k))
+        middle = len(indices) // 2
+        return (indices[middle], axis, self.build(indices[:middle], depth + 1), self.build(indices[middle+1:], depth + 1))
+
+    def k_nearest(self, point, k):
+        """Indices of the k points closest to point, closest first."""
+        if self.root == None:
+            return self.scan(point, k)
+        points = self.points
+        x, y = point
+        best = [] # heap of (-squared distance, -index): the worst of the k best on top
+
+        def visit(node):
+            if node == None:
+                return
+            index, axis, left, right = node
+            px, py = points[index]
+            entry = (-((px - x)**2 + (py - y)**2), -index)
+            if len(best) < k:
+                heapq.heappush(best, entry)
+            elif entry > best[0]:
+                heapq.heapreplace(best, entry)
+
+            difference = point[axis] - points[index][axis]
+            near, far = (left, right) if difference < 0 else (right, left)
+            visit(near)
+            # the far side can only hold closer points if the splitting line is within the current k-th distance
+            if len(best) < k or difference*difference <= -best[0][0]:
+                visit(far)
+
+        if k > 0:
+            visit(self.root)
+        return [-index for _, index in sorted(best, reverse=True)]
+
+    def scan(self, point, k):
+        """Same answer as the tree, by computing the distance to every point."""
+        points = self.points
+        x, y = point
+        if k != 1:
+            return heapq.nsmallest(k, range(len(points)), key=lambda index: ((points[index][0] - x)**2 + (points[index][1] - y)**2, index))
+        best, best_distance = None, float('inf')
+        for index, (px, py) in enumerate(points):
+            distance = (px - x)**2 + (py - y)**2
+            if distance < best_distance: # keeps the first of the closest points
+                best, best_distance = index, distance
+        return [] if best == None else [best]
+
+    def nearest(self, point):
+        """Index of the point closest to point, None if the tree is empty."""
+        indices = self.k_nearest(point, 1)
+        return indices[0] if indices else None
+
+
+class VentIndex():
+    """
+    KD-trees (scans for small lists, see KDTree) over the nodes (in grid coordinates) and the exits (in pixels) of a VentMesh.
+    The node tree is rebuilt when the mesh graph is replaced, and the exit tree when the exit
+    list no longer matches the one it was built from (the map editor edits it in place).
+    """
+    def __init__(self, mesh):
+        self.mesh = mesh
+        self.graph = None
+        self.nodes = []
+        self.node_tree = KDTree([])
+        self.exits = []
+        self.exit_positions = []
+        self.exit_tree = KDTree([])
+
+    def update(self):
+        mesh = self.mesh
+        if self.graph is not mesh.graph:
+            self.graph = mesh.graph
+            width = mesh.width
+            # same order as iterating adjacency_map
+            self.nodes = [(n%width, n//width) for n in np.flatnonzero(self.graph.tile_state).tolist()]
+            self.node_tree = KDTree(self.nodes)
+        exits = mesh.exits or []
+        if self.exits != exits:
+            self.exits = list(exits)
+            self.exit_positions = [mesh.position(exit_point) for exit_point in self.exits]
+            self.exit_tree = KDTree(self.exit_positions)
+
+    def closest_nodes(self, node, k=1):
+        self.update()
+        return [self.nodes[index] for index in self.node_tree.k_nearest(node, k)]
+
+    def closest_exits(self, position, k=1):
+        self.update()
+        return [self.exit_positions[index] for index in self.exit_tree.k_nearest(position, k)]
@@ -0,0 +1,87 @@
+import numpy as np
+
+
+class VentRoutes():
+    """
+    All-pairs routing table of the vent network: for every pair of vent nodes, the distance
+    and the next node to go to, computed once with Floyd-Warshall over the few vent nodes only
+    (not over the width*height grid the searches allocate). Paths are then a walk of the table.
+
+    Built when the map is loaded or saved by the editor, and stored in the map file.
+    """
+    def __init__(self, nodes, distance, next_hop, edges):
+        self.nodes = nodes # (V,) int32 node ids of the vent nodes
+        self.distance = distance # (V, V) float64, inf between unconnected nodes
+        self.next_hop = next_hop # (V, V) int32, index of the next node from a to b, -1 if unconnected
+        self.edges = edges # (offsets, neighbors, weights) of the graph the table was built from
+        self.init_lookups()
+
+    def init_lookups(self):
+        self.index = {n: k for k, n in enumerate(self.nodes.tolist())}
+        self.node_list = self.nodes.tolist()
+        self.next_hop_list = self.next_hop.tolist()
+        self.graph = None # last graph checked to be the one the table was built from
+
+    def __getstate__(self):
+        return {'nodes': self.nodes, 'distance': self.distance, 'next_hop': self.next_hop, 'edges': self.edges}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.init_lookups()
+
+    @classmethod
+    def build(cls, graph):
+        nodes = np.flatnonzero(graph.tile_state).astype(np.int32)
+        size = len(nodes)
+        index = np.full(len(graph.tile_state), -1, dtype=np.int64)
+        index[nodes] = np.arange(size)
+
+        distance = np.full((size, size), np.inf)
+        next_hop = np.full((size, size), -1, dtype=np.int32)
+        degrees = np.diff(graph.offsets)
+        sources = index[np.repeat(np.arange(len(degrees), dtype=np.int64), degrees)]
+        targets = index[graph.neighbors]
+        for a, b, weight in zip(sources.tolist(), targets.tolist(), graph.weights.tolist()):
+            if weight < distance[a, b]:
+                distance[a, b] = weight
+                next_hop[a, b] = b
+        distance[np.arange(size), np.arange(size)] = 0
+        next_hop[np.arange(size), np.arange(size)] = np.arange(size)
+
+        for k in range(size):
+            through_k = distance[:, k:k+1] + distance[k:k+1, :]
+            shorter = through_k < distance
+            distance = np.where(shorter, through_k, distance)
+            next_hop = np.where(shorter, next_hop[:, k:k+1], next_hop)
+
+        edges = (graph.offsets.copy(), graph.neighbors.copy(), graph.weights.copy())
+        return cls(nodes, distance, next_hop, edges)
+
+    def built_for(self, graph):
+        """Whether the table was built from this graph's edges (checked once per graph object)."""
+        if self.graph is graph:
+            return True
+        offsets, neighbors, weights = self.edges
+        if (len(graph.tile_state) == len(offsets) - 1 and np.array_equal(np.flatnonzero(graph.tile_state), self.nodes)
+                and np.array_equal(graph.offsets, offsets) and np.array_equal(graph.neighbors, neighbors)
+                and np.array_equal(graph.weights, weights)):
+            self.graph = graph
+            return True
+        return False
+
+    def path(self, start, goal, width):
+        """
+        Same contract as A_star: returns the list of (i, j) nodes from goal to start, or None.
+        """
+        a = self.index.get(start[0] + width*start[1])
+        b = self.index.get(goal[0] + width*goal[1])
+        if a == None or b == None or self.next_hop_list[a][b] == -1:
+            return None
+
+        node_list, next_hop = self.node_list, self.next_hop_list
+        total_path = [start]
+        while a != b:
+            a = next_hop[a][b]
+            total_path.append((node_list[a] % width, node_list[a] // width))
+        total_path.reverse()
+        return total_path
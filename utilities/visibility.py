@@ -0,0 +1,176 @@
+import bisect
+import math
+
+
+def build_segments(walls, wall_index):
+    """
+    Returns the wall edges as segments that never cross each other: edges are split where they
+    meet the edges of overlapping walls, and pieces lying inside another wall are dropped.
+    The visibility sweep relies on segments only touching at their endpoints.
+    """
+    segments = []
+
+    for wall in walls:
+        r = wall.rect
+        A, B, C, D = (r.left, r.top), (r.right, r.top), (r.right, r.bottom), (r.left, r.bottom)
+        others = [other.rect for other in wall_index.query_rect(r.inflate(2, 2)) if other is not wall]
+
+        for p1, p2 in [(A, B), (B, C), (C, D), (D, A)]:
+            # Edges are axis aligned, so the cut points are the other walls' borders crossing this edge
+            cuts = {0.0, 1.0}
+            horizontal = p1[1] == p2[1]
+            for o in others:
+                if horizontal and o.top <= p1[1] <= o.bottom:
+                    for x in (o.left, o.right):
+                        cuts.add((x - p1[0]) / (p2[0] - p1[0]))
+                elif not horizontal and o.left <= p1[0] <= o.right:
+                    for y in (o.top, o.bottom):
+                        cuts.add((y - p1[1]) / (p2[1] - p1[1]))
+
+            cuts = sorted(t for t in cuts if 0 <= t <= 1)
+            for t1, t2 in zip(cuts, cuts[1:]):
+                if t2 - t1 <= 0:
+                    continue
+                q1 = (p1[0] + t1*(p2[0] - p1[0]), p1[1] + t1*(p2[1] - p1[1]))
+                q2 = (p1[0] + t2*(p2[0] - p1[0]), p1[1] + t2*(p2[1] - p1[1]))
+                mx, my = (q1[0] + q2[0]) / 2, (q1[1] + q2[1]) / 2
+                if any(o.left < mx < o.right and o.top < my < o.bottom for o in others):
+                    continue # hidden inside another wall
+                segments.append((q1, q2))
+
+    return segments
+
+def outline_segments(walls, wall_index):
+    """
+    Returns the outline of the union of the walls, as segments that never cross each other:
+    the segments of build_segments without the pieces of the borders shared by two walls
+    (a wall lies on both of their sides) and without duplicates, and with the collinear pieces
+    that are the only two segments meeting at a point merged into one.
+    Walls hide the same things, with fewer segment ends for the visibility sweep to sort.
+    """
+    pieces = {}
+    for q1, q2 in build_segments(walls, wall_index):
+        # Edges go clockwise on screen, (dy, -dx) points out of their wall
+        dx, dy = q2[0] - q1[0], q2[1] - q1[1]
+        length = math.hypot(dx, dy)
+        outside = ((q1[0] + q2[0])/2 + 0.5*dy/length, (q1[1] + q2[1])/2 - 0.5*dx/length)
+        if not wall_index.point_inside(outside):
+            pieces.setdefault((min(q1, q2), max(q1, q2)), (q1, q2))
+
+    ends = {} # keys: points, values: keys of the pieces ending there
+    for key in pieces:
+        for point in key:
+            ends.setdefault(point, []).append(key)
+
+    def direction(key):
+        (x1, y1), (x2, y2) = key
+        return x1 == x2 # pieces are axis aligned, sorted keys run along x or y
+
+    segments = []
+    done = set()
+    for key in pieces:
+        if key in done:
+            continue
+        # Grow the piece both ways while the next piece is the only one at the junction and collinear
+        first, last = key
+        done.add(key)
+        for side in (0, 1):
+            point = key[side]
+            while len(ends[point]) == 2:
+                other = ends[point][0] if ends[point][1] in done else ends[point][1]
+                if other in done or direction(other) != direction(key):
+                    break
+                done.add(other)
+                point = other[side]
+            if side == 0:
+                first = point
+            else:
+                last = point
+        q1, q2 = pieces[key]
+        segments.append((first, last) if q1 <= q2 else (last, first))
+
+    return segments
+
+def ray_distance(pos, theta, segment):
+    """
+    Distance from pos to the segment's supporting line along the ray of absolute angle theta (radians).
+    """
+    (ax, ay), (bx, by) = segment
+    ox, oy = pos
+    dx, dy = math.cos(theta), math.sin(theta)
+    ex, ey = bx - ax, by - ay
+    denominator = dx*ey - dy*ex
+    if denominator == 0: # ray parallel to the segment
+        return min(math.hypot(ax - ox, ay - oy), math.hypot(bx - ox, by - oy))
+    return ((ax - ox)*ey - (ay - oy)*ex) / denominator
+
+def angular_spans(pos, segment, start, fov):
+    """
+    Angular intervals, relative to start (radians) and clipped to [0, fov], covered by the segment seen from pos.
+    """
+    two_pi = 2*math.pi
+    (ax, ay), (bx, by) = segment
+    ox, oy = pos
+    if (ax - ox)*(by - oy) - (ay - oy)*(bx - ox) == 0:
+        return [] # seen edge-on (or pos lies on it), covers no angle
+
+    phi_a = (math.atan2(ay - oy, ax - ox) - start) % two_pi
+    phi_b = (math.atan2(by - oy, bx - ox) - start) % two_pi
+    if (phi_b - phi_a) % two_pi > math.pi:
+        phi_a, phi_b = phi_b, phi_a
+
+    pieces = [(phi_a, phi_b)] if phi_a <= phi_b else [(phi_a, two_pi), (0, phi_b)]
+    spans = []
+    for begin, end in pieces:
+        begin, end = max(begin, 0), min(end, fov)
+        if begin < end:
+            spans.append((begin, end))
+    return spans
+
+def visibility_polygon(pos, orientation, fov, segments):
+    """
+    Returns the visible area of the cone [orientation - fov/2, orientation + fov/2] (degrees) seen from pos,
+    as a fan of (pos, point1, point2) triangles ordered by increasing angle.
+
+    Single angular sweep: segment endpoints are sorted by angle, and between two consecutive
+    event angles the set of segments crossed by the ray is kept sorted by distance, so the
+    visible segment is always the first one.
+    """
+    start = math.radians(orientation - fov/2)
+    fov = math.radians(min(fov, 360))
+
+    begins, ends = {}, {}
+    for segment in segments:
+        for begin, end in angular_spans(pos, segment, start, fov):
+            begins.setdefault(begin, []).append(segment)
+            ends.setdefault(end, []).append(segment)
+
+    angles = sorted(set(begins) | set(ends) | {0, fov})
+
+    def point(theta, segment):
+        t = ray_distance(pos, start + theta, segment)
+        return (pos[0] + t*math.cos(start + theta), pos[1] + t*math.sin(start + theta))
+
+    triangles = []
+    active = [] # segments crossed by the rays of the current interval, nearest first
+    visible, visible_since = None, None
+    for k in range(len(angles) - 1):
+        theta, next_theta = angles[k], angles[k+1]
+        for segment in ends.get(theta, ()):
+            active.remove(segment)
+
+        # Non-crossing segments keep the same order over the whole interval, compare them in its middle
+        middle = start + (theta + next_theta)/2
+        for segment in begins.get(theta, ()):
+            bisect.insort(active, segment, key=lambda s: ray_distance(pos, middle, s))
+
+        nearest = active[0] if active else None
+        if nearest is not visible:
+            if visible != None:
+                triangles.append((pos, point(visible_since, visible), point(theta, visible)))
+            visible, visible_since = nearest, theta
+
+    if visible != None:
+        triangles.append((pos, point(visible_since, visible), point(angles[-1], visible)))
+
+    return triangles